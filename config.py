@@ -20,11 +20,99 @@ os.makedirs(DATA_DIR, exist_ok=True)
 
 # === MODELOS IA ===
 WHISPER_MODEL = "small"  # tiny, base, small, medium, large
+STT_WORKER_THREADS = 1  # Hilos de torch por worker de transcripción (ForkedSpeechToText)
 OLLAMA_MODEL = "llama3.1:8b"
 
+# === CONFIGURACIÓN DEL CLIENTE OLLAMA ===
+OLLAMA_HOST = os.getenv("OLLAMA_HOST", "http://127.0.0.1:11434")
+OLLAMA_TIMEOUT = 120.0  # Segundos máximos esperando respuesta del modelo
+OLLAMA_CONNECT_TIMEOUT = 5.0  # Segundos máximos para establecer conexión
+OLLAMA_MAX_RETRIES = 3  # Reintentos ante errores de red o 5xx
+OLLAMA_RETRY_BACKOFF = 0.5  # Espera base (se duplica en cada reintento)
+OLLAMA_MAX_CONNECTIONS = 4  # Conexiones HTTP simultáneas en el pool
+OLLAMA_KEEPALIVE_EXPIRY = 300.0  # Segundos que una conexión ociosa sigue abierta
+OLLAMA_KEEP_ALIVE = "30m"  # Tiempo que Ollama mantiene el modelo en memoria
+OLLAMA_WARMUP = True  # Precargar el modelo en segundo plano al iniciar
+OLLAMA_PRIME_IDLE = 60.0  # Segundos sin usar Ollama tras los que se vuelve a precalentar en cada turno
+
+# === MEMORIA CONVERSACIONAL PERSISTENTE ===
+ENABLE_MEMORY_RESTORE = True  # Recuperar los últimos turnos al iniciar
+MEMORY_RESTORE_TURNS = 10  # Turnos máximos a recuperar al iniciar
+MEMORY_TOKEN_BUDGET = 1500  # Tokens aproximados máximos de memoria restaurada
+MEMORY_LOAD_MORE_TURNS = 10  # Turnos extra al pedir memoria más antigua
+
+# === ENRUTADO DE MODELOS ===
+ENABLE_MODEL_ROUTING = True  # Elegir modelo pequeño/grande según la consulta
+OLLAMA_MODEL_TIERS = {
+    "small": "llama3.2:3b",  # Charla corta y preguntas simples
+    "large": OLLAMA_MODEL,   # Explicaciones, razonamiento y contexto RAG
+}
+ROUTER_SHORT_INPUT_WORDS = 12  # Hasta aquí una frase se considera corta
+ROUTER_LONG_INPUT_WORDS = 40  # A partir de aquí siempre se usa el modelo grande
+ROUTER_ESCALATION_TURNS = 3  # Turnos con modelo grande tras una escalada
+
+# === GENERACIÓN ESPECULATIVA ===
+ENABLE_SPECULATION = False  # Arrancar el LLM sobre transcripciones parciales
+SPECULATION_PARTIAL_INTERVAL = 1.0  # Segundos entre transcripciones parciales
+SPECULATION_STABLE_PARTIALS = 2  # Parciales idénticos seguidos = texto estable
+SPECULATION_MIN_WORDS = 3  # No especular con frases más cortas
+SPECULATION_MATCH_THRESHOLD = 0.9  # Similitud mínima con la transcripción final
+
+# === BÚSQUEDA DE CONTEXTO (FTS5 Y PALABRAS CLAVE) ===
+SEARCH_CANDIDATES = 100  # Mejores resultados BM25 que se reordenan por importancia y antigüedad
+SEARCH_RECENCY_DAYS = 30.0  # Antigüedad (días) a la que un resultado pesa la mitad
+CONTEXT_MAX_KEYWORDS = 10  # Palabras clave (raíces) indexadas por contexto
+
+# === BÚSQUEDA SEMÁNTICA (EMBEDDINGS) ===
+ENABLE_VECTOR_SEARCH = True  # Embeddings del contexto RAG junto a la búsqueda por palabras
+EMBEDDING_MODEL = "nomic-embed-text"  # Modelo de embeddings de Ollama (ollama pull nomic-embed-text)
+VECTOR_DTYPE = "float32"  # float32 o float16 (mitad de disco y memoria; se busca por bloques)
+VECTOR_BATCH_SIZE = 32  # Contextos por llamada a embed
+VECTOR_MAX_CHARS = 2000  # Caracteres de cada contexto que se convierten en embedding
+VECTOR_FLUSH_INTERVAL = 2.0  # Segundos que se espera para agrupar contextos nuevos
+VECTOR_POLL_INTERVAL = 30.0  # Revisión periódica de contextos sin embedding
+VECTOR_RETRY_INTERVAL = 60.0  # Pausa de la búsqueda semántica tras un fallo de embeddings
+VECTOR_SEARCH_BLOCK = 65536  # Filas por bloque al buscar en float16
+VECTOR_MIN_SIMILARITY = 0.3  # Similitud coseno mínima de un resultado semántico
+SEARCH_RRF_K = 60  # Constante de la fusión por rangos (resultados léxicos + semánticos)
+
+# === BÚSQUEDA RAG CONCURRENTE ===
+ENABLE_CONCURRENT_RETRIEVAL = True  # Buscar contexto mientras se reconocen comandos
+RETRIEVAL_WORKERS = 2  # Búsquedas simultáneas (el pipeline asíncrono solapa turnos)
+
+# === PIPELINE ASÍNCRONO ===
+ENABLE_ASYNC_PIPELINE = False  # Etapas solapadas con asyncio (False: bucle síncrono clásico)
+PIPELINE_QUEUE_SIZE = 2  # Turnos máximos esperando entre dos etapas
+
+# === SERVIDOR MULTISESIÓN (server.py) ===
+SERVER_HOST = "127.0.0.1"  # Solo conexiones locales por defecto
+SERVER_PORT = 8765
+SERVER_MAX_SESSIONS = 32  # Sesiones abiertas a la vez (las ociosas caducan)
+SERVER_SESSION_IDLE_TIMEOUT = 1800.0  # Segundos sin turnos hasta cerrar una sesión
+SERVER_MAX_ACTIVE_TURNS = 8  # Turnos procesándose a la vez entre todas las sesiones
+SERVER_ADMISSION_TIMEOUT = 2.0  # Segundos de espera por un hueco antes de responder 503
+SERVER_SESSION_RATE = 20.0  # Turnos por minuto permitidos a cada sesión
+SERVER_SESSION_BURST = 5  # Turnos seguidos permitidos antes de limitar
+SERVER_STT_WORKERS = 2  # Transcripciones simultáneas entre todas las sesiones
+SERVER_STT_FORK = True  # Workers en procesos con un único modelo compartido (False: una copia por hilo)
+SERVER_MAX_BODY = 10 * 1024 * 1024  # Bytes máximos de un turno (audio WAV)
+SERVER_ALLOW_COMMANDS = False  # Los comandos actúan sobre la máquina del servidor
+
 # === CONFIGURACIÓN TTS ===
 TTS_RATE = 200  # Palabras por minuto
 TTS_VOLUME = 1.0  # 0.0 a 1.0
+TTS_CACHE_DIR = os.path.join(DATA_DIR, "tts_cache")  # Frases fijas ya sintetizadas
+
+# === PLAZO DE RESPUESTA ===
+ENABLE_RESPONSE_DEADLINE = True  # Degradar la respuesta si el LLM no llega a tiempo
+RESPONSE_DEADLINE = 2.5  # Segundos desde la transcripción hasta la primera frase
+RESPONSE_HARD_DEADLINE = 12.0  # Pasado esto se responde con el modelo pequeño (si hay)
+RESPONSE_CACHE_MAX_AGE = 6 * 3600  # Antigüedad máxima (s) de una respuesta reutilizada de respaldo
+DEADLINE_ACKNOWLEDGEMENTS = [  # Se dicen al incumplir el plazo (pre-sintetizadas)
+    "Un momento, lo estoy pensando.",
+    "Dame un segundo.",
+    "Déjame comprobarlo.",
+]
 
 # === ROL DEL ASISTENTE ===
 ASSISTANT_ROLE = """
@@ -39,6 +127,26 @@ ENABLE_AUTO_BACKUP = True
 BACKUP_INTERVAL_HOURS = 24  # Backup automático cada 24 horas
 MAX_BACKUPS = 7  # Mantener últimos 7 backups
 
+# Ajustes de SQLite al conectar. Durabilidad de cada modo de escritura:
+# ver DatabaseManager. WAL + NORMAL: un corte de luz puede perder las últimas
+# transacciones, nunca corromper la base; FULL hace fsync en cada commit
+DB_JOURNAL_MODE = "WAL"  # Los lectores no bloquean al escritor
+DB_SYNCHRONOUS = "NORMAL"  # NORMAL o FULL
+DB_MMAP_SIZE = 256 * 1024 * 1024  # Bytes del archivo leídos por mmap en lugar de read()
+DB_CACHE_SIZE_KB = 16 * 1024  # Caché de páginas por conexión
+DB_BUSY_TIMEOUT = 5.0  # Segundos esperando un bloqueo antes de fallar
+
+# Escritura en segundo plano: interacciones, contexto, registros y recordatorios
+ENABLE_BACKGROUND_PERSISTENCE = True
+PERSIST_QUEUE_SIZE = 256  # Tareas máximas en cola (si se llena, el bucle espera)
+PERSIST_BATCH_SIZE = 50  # Tareas máximas por transacción
+PERSIST_FLUSH_INTERVAL = 1.0  # Segundos máximos que una tarea espera a su lote
+
+# === RECORDATORIOS ===
+ENABLE_REMINDER_SCHEDULER = True  # Avisar por voz cuando vence un recordatorio
+REMINDER_DEFAULT_HOUR = 9  # Hora de "mañana" o "el lunes" sin hora concreta
+REMINDER_LOAD_HORIZON = 24 * 3600  # Segundos de recordatorios que se cargan en memoria
+
 # === CONFIGURACIÓN DE LOGGING ===
 import logging
 
@@ -48,6 +156,67 @@ LOG_TO_CONSOLE = True
 LOG_ROTATION_MAX_BYTES = 5 * 1024 * 1024  # 5 MB
 LOG_ROTATION_BACKUP_COUNT = 5
 
+# === TRAZAS DE LATENCIA POR ETAPA ===
+ENABLE_TRACING = True  # Guardar la duración de cada etapa en interaction_spans
+
+# === BÚSQUEDA APROXIMADA DE COMANDOS ===
+ENABLE_FUZZY_COMMANDS = True  # Tolerar errores de transcripción en comandos
+FUZZY_MATCH_THRESHOLD = 0.8  # Similitud mínima (0-1) para aceptar un comando
+FUZZY_MAX_CANDIDATES = 10  # Candidatos verificados por frase
+FUZZY_MAX_WORDS = 12  # Frases más largas no se consideran comandos
+FUZZY_EXCLUDED_ACTIONS = ("shutdown",)  # Acciones que exigen coincidencia exacta
+
+# === EJECUCIÓN DE COMANDOS ===
+COMMAND_WORKERS = 4  # Hilos para ejecutar acciones en segundo plano
+COMMAND_MAX_PENDING = 16  # Acciones en curso o en cola como máximo
+COMMAND_DEFAULT_TIMEOUT = 15.0  # Segundos antes de dar una acción por fallida
+COMMAND_TIMEOUTS = {  # Tiempo límite por tipo de acción
+    "open_browser": 10.0,
+    "open_url": 10.0,
+    "open_app": 30.0,
+    "lock_screen": 5.0,
+}
+# Acciones que se ejecutan en el bucle principal (su resultado es la respuesta
+# o no tiene sentido continuar sin ellas). Un comando puede forzarlo con "sync"
+SYNC_COMMAND_ACTIONS = ("get_time", "shutdown")
+
+# Registro de comandos en la base de datos (SYSTEM_COMMANDS solo lo inicializa)
+ENABLE_COMMAND_REGISTRY = True
+COMMAND_REGISTRY_POLL_INTERVAL = 2.0  # Segundos mínimos entre comprobaciones de cambios
+
+# Macros: {"action": "macro", "args": [pasos]}, cada paso con "id", "action",
+# "args" y opcionalmente "after" (ids que deben terminar bien antes)
+MACRO_RESULT_WAIT = 3.0  # Segundos máximos esperando resultados para la respuesta
+
+# === CLASIFICADOR LOCAL DE INTENCIONES ===
+ENABLE_INTENT_CLASSIFIER = True  # Reconocer paráfrasis de comandos sin llamar al LLM
+INTENT_HASH_DIM = 2 ** 14  # Tamaño del espacio de rasgos (hashing)
+INTENT_MIN_SCORE = 0.5  # Similitud coseno mínima antes de calibrar
+INTENT_MIN_MARGIN = 0.1  # Ventaja mínima sobre la segunda intención y sobre las frases negativas
+INTENT_MAX_WORDS = 10  # Frases más largas se tratan como conversación
+
+# Frases de ejemplo por comando (se suman a la propia palabra clave)
+COMMAND_INTENT_EXAMPLES = {
+    "abrir navegador": ["abre internet", "quiero navegar por internet", "abre el navegador web"],
+    "abrir youtube": ["quiero ver youtube", "pon youtube", "ponme videos de youtube"],
+    "abrir spotify": ["pon spotify", "quiero escuchar spotify", "abre la aplicación de spotify"],
+    "bloquear pantalla": ["bloquea el ordenador", "bloquea la sesión", "bloquea el equipo"],
+    "dame la hora": ["qué hora es", "me dices la hora", "qué hora tenemos"],
+    "reproduce música 1": ["pon algo de música", "pon música", "quiero escuchar música"],
+}
+
+# Frases que NO son comandos: calibran el umbral para no robar preguntas al LLM
+INTENT_NEGATIVE_EXAMPLES = [
+    "qué es la síntesis fm",
+    "cuéntame un chiste",
+    "cómo estás hoy",
+    "explícame qué es un compresor de audio",
+    "quién ganó el mundial de fútbol",
+    "qué me recomiendas para mezclar voces",
+    "resume lo que hablamos ayer",
+    "qué diferencia hay entre mp3 y wav",
+]
+
 # === COMANDOS DEL SISTEMA ===
 SYSTEM_COMMANDS = {
     # Navegador
@@ -75,5 +244,19 @@ SYSTEM_COMMANDS = {
     "abre mezclador": {
         "action": "open_app",
         "args": "D:\\Archivos de Programa\\rekordbox\\rekordbox 7.2.7\\rekordbox.exe"
+    },
+    
+    # Macros
+    "modo trabajo": {
+        "action": "macro",
+        "args": [
+            {"id": "ableton", "action": "open_app",
+             "args": "C:\\Program Files\\Ableton\\Ableton Live 12 Suite\\Ableton Live 12 Suite.exe"},
+            {"id": "rekordbox", "action": "open_app",
+             "args": "D:\\Archivos de Programa\\rekordbox\\rekordbox 7.2.7\\rekordbox.exe"},
+            {"id": "navegador", "action": "open_browser", "args": "chrome"},
+            {"id": "spotify", "action": "open_url", "args": "https://open.spotify.com", "after": ["navegador"]},
+            {"id": "youtube", "action": "open_url", "args": "https://www.youtube.com", "after": ["navegador"]},
+        ]
     }
 }
\ No newline at end of file
@@ -0,0 +1,243 @@
+"""
+Benchmark de latencia y throughput de AIEngine y process_user_input
+
+Arranca un servidor Ollama simulado (fake_ollama.py) en el propio proceso,
+de modo que los resultados son reproducibles sin GPU ni Ollama real.
+
+Uso:
+    python jarvis_tools/benchmark_ai.py --iterations 50 --concurrency 4
+    python jarvis_tools/benchmark_ai.py --token-rate 30 --ttft 0.5 --json resultados.json
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fake_ollama import FakeOllamaServer  # noqa: E402
+from modules import (  # noqa: E402
+    AIEngine, OllamaClient, CommandExecutor, DatabaseManager, JarvisLogger,
+    TextScriptRecorder, PassthroughSpeechToText, NullTextToSpeech
+)
+
+
+# Preguntas para la IA y comandos sin efectos secundarios
+AI_PROMPTS = [
+    "hola, ¿qué tal estás?",
+    "¿por qué el cielo es azul?",
+    "dime un dato curioso",
+    "explica cómo funciona la síntesis FM paso a paso",
+    "¿qué tiempo hace normalmente en primavera?",
+]
+COMMAND_PROMPTS = ["dame la hora"]
+
+
+# === ESTADÍSTICAS ===
+
+def percentile(values, pct):
+    """
+    Calcula un percentil con interpolación lineal
+
+    Args:
+        values (list): Muestras
+        pct (float): Percentil (0-100)
+
+    Returns:
+        float: Valor del percentil
+    """
+    if not values:
+        return 0.0
+
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * pct / 100.0
+    low = int(rank)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+def summarize(name, latencies, elapsed, errors=0):
+    """
+    Resume las latencias de un escenario
+
+    Args:
+        name (str): Nombre del escenario
+        latencies (list): Latencias en segundos
+        elapsed (float): Tiempo total del escenario
+        errors (int): Peticiones fallidas
+
+    Returns:
+        dict: Estadísticas del escenario
+    """
+    count = len(latencies)
+    return {
+        "scenario": name,
+        "count": count,
+        "errors": errors,
+        "mean": sum(latencies) / count if count else 0.0,
+        "p50": percentile(latencies, 50),
+        "p95": percentile(latencies, 95),
+        "p99": percentile(latencies, 99),
+        "max": max(latencies) if latencies else 0.0,
+        "throughput": count / elapsed if elapsed else 0.0
+    }
+
+
+def print_report(results):
+    """Imprime la tabla de resultados"""
+    print("\n" + "=" * 92)
+    print("📊 RESULTADOS DEL BENCHMARK (latencias en ms)")
+    print("=" * 92)
+    print(f"{'Escenario':32} {'n':>5} {'err':>4} {'media':>8} {'p50':>8} "
+          f"{'p95':>8} {'p99':>8} {'máx':>8} {'req/s':>7}")
+    print("-" * 92)
+    for r in results:
+        print(f"{r['scenario']:32} {r['count']:5} {r['errors']:4} "
+              f"{r['mean'] * 1000:8.1f} {r['p50'] * 1000:8.1f} {r['p95'] * 1000:8.1f} "
+              f"{r['p99'] * 1000:8.1f} {r['max'] * 1000:8.1f} {r['throughput']:7.2f}")
+    print("=" * 92 + "\n")
+
+
+# === ESCENARIOS ===
+
+def bench_ai_sequential(client, iterations):
+    """Turnos consecutivos de un único AIEngine (un usuario)"""
+    engine = AIEngine(client=client, warmup=False)
+    latencies = []
+    errors = 0
+
+    start = time.perf_counter()
+    for i in range(iterations):
+        # Reiniciar el historial cada 10 turnos para acotar el prompt
+        if i % 10 == 0:
+            engine.clear_history()
+
+        t0 = time.perf_counter()
+        try:
+            engine.generate_response(AI_PROMPTS[i % len(AI_PROMPTS)])
+            latencies.append(time.perf_counter() - t0)
+        except Exception:
+            errors += 1
+
+    return summarize("AIEngine secuencial", latencies, time.perf_counter() - start, errors)
+
+
+def bench_ai_concurrent(client, iterations, concurrency):
+    """Varios AIEngine en paralelo compartiendo un mismo cliente"""
+    latencies = []
+    errors = [0]
+    lock = threading.Lock()
+    per_worker = max(iterations // concurrency, 1)
+
+    def worker(worker_id):
+        engine = AIEngine(client=client, warmup=False)
+        for i in range(per_worker):
+            t0 = time.perf_counter()
+            try:
+                engine.generate_response(AI_PROMPTS[(worker_id + i) % len(AI_PROMPTS)])
+                elapsed = time.perf_counter() - t0
+                with lock:
+                    latencies.append(elapsed)
+            except Exception:
+                with lock:
+                    errors[0] += 1
+
+    threads = [threading.Thread(target=worker, args=(w,)) for w in range(concurrency)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    return summarize(f"AIEngine concurrente (x{concurrency})", latencies,
+                     time.perf_counter() - start, errors[0])
+
+
+def bench_process_user_input(client, iterations, work_dir):
+    """process_user_input completo (comando o RAG + IA) sin audio"""
+    from main import JarvisAssistant
+
+    logger = JarvisLogger(log_dir=os.path.join(work_dir, "logs"))
+    assistant = JarvisAssistant(
+        logger=logger,
+        db=DatabaseManager(db_path=os.path.join(work_dir, "bench.db"), logger=logger),
+        audio_recorder=TextScriptRecorder([]),
+        speech_to_text=PassthroughSpeechToText(),
+        text_to_speech=NullTextToSpeech(),
+        ai_engine=AIEngine(client=client, logger=logger, warmup=False),
+        command_executor=CommandExecutor(logger=logger)
+    )
+
+    prompts = AI_PROMPTS + COMMAND_PROMPTS
+    by_type = {"ai": [], "command": []}
+    all_latencies = []
+    errors = 0
+
+    start = time.perf_counter()
+    for i in range(iterations):
+        t0 = time.perf_counter()
+        try:
+            _, response_type = assistant.process_user_input(prompts[i % len(prompts)])
+            elapsed = time.perf_counter() - t0
+            by_type[response_type].append(elapsed)
+            all_latencies.append(elapsed)
+        except Exception:
+            errors += 1
+    total = time.perf_counter() - start
+
+    assistant.db.close()
+    return [
+        summarize("process_user_input (todo)", all_latencies, total, errors),
+        summarize("process_user_input (ai)", by_type["ai"], total),
+        summarize("process_user_input (command)", by_type["command"], total),
+    ]
+
+
+def main():
+    """Ejecuta todos los escenarios contra el Ollama simulado"""
+    parser = argparse.ArgumentParser(description="Benchmark de AIEngine con Ollama simulado")
+    parser.add_argument("--iterations", type=int, default=30)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--token-rate", type=float, default=200.0)
+    parser.add_argument("--ttft", type=float, default=0.05)
+    parser.add_argument("--tokens", type=int, default=30)
+    parser.add_argument("--failure-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--json", help="guardar resultados en un archivo JSON")
+    args = parser.parse_args()
+
+    server = FakeOllamaServer(
+        token_rate=args.token_rate, ttft=args.ttft, response_tokens=args.tokens,
+        failure_rate=args.failure_rate, seed=args.seed
+    ).start()
+    client = OllamaClient(host=server.url, retry_backoff=0.05)
+
+    print(f"🧪 Ollama simulado en {server.url} "
+          f"({args.token_rate} tok/s, TTFT {args.ttft}s, fallos {args.failure_rate:.0%})\n")
+
+    results = []
+    try:
+        with tempfile.TemporaryDirectory() as work_dir:
+            results.append(bench_ai_sequential(client, args.iterations))
+            results.append(bench_ai_concurrent(client, args.iterations, args.concurrency))
+            results.extend(bench_process_user_input(client, args.iterations, work_dir))
+    finally:
+        client.close()
+        server.stop()
+
+    print_report(results)
+    print(f"🔌 Actividad del servidor: {server.counters}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"settings": vars(args), "results": results}, f, indent=2)
+        print(f"💾 Resultados guardados en {args.json}")
+
+
+if __name__ == "__main__":
+    main()
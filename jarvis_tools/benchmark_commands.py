@@ -0,0 +1,137 @@
+"""
+Benchmark de búsqueda de comandos: recorrido lineal vs. autómata Aho-Corasick,
+búsqueda aproximada y clasificador de intenciones
+
+Genera miles de comandos sintéticos por aplicación y por URL (como los que
+se registran por máquina) y mide el coste por frase de cada estrategia.
+
+Uso:
+    python jarvis_tools/benchmark_commands.py --commands 10000 --queries 2000
+"""
+import argparse
+import os
+import random
+import string
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modules import CommandMatcher, FuzzyCommandMatcher, IntentClassifier  # noqa: E402
+
+
+VERBS = ["abrir", "abre", "lanza", "inicia", "cierra", "reproduce"]
+TARGETS = ["app", "web", "proyecto", "carpeta", "lista"]
+
+
+def random_word(rng, length=6):
+    return "".join(rng.choice(string.ascii_lowercase) for _ in range(length))
+
+
+def generate_commands(count, rng):
+    """Genera `count` palabras clave únicas con prefijos compartidos"""
+    keywords = set()
+    while len(keywords) < count:
+        keywords.add(f"{rng.choice(VERBS)} {rng.choice(TARGETS)} {random_word(rng)}")
+    return sorted(keywords)
+
+
+def generate_queries(keywords, count, rng):
+    """Mezcla frases que contienen un comando con frases de conversación"""
+    queries = []
+    for i in range(count):
+        if i % 2 == 0:
+            queries.append(f"oye jarvis por favor {rng.choice(keywords)} ahora mismo")
+        else:
+            queries.append(" ".join(random_word(rng, rng.randint(3, 8)) for _ in range(12)))
+    return queries
+
+
+def naive_match(commands, text):
+    """Estrategia anterior: primer `keyword in text` en orden del diccionario"""
+    for keyword in commands:
+        if keyword in text:
+            return keyword
+    return None
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de búsqueda de comandos")
+    parser.add_argument("--commands", type=int, default=10000)
+    parser.add_argument("--queries", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    keywords = generate_commands(args.commands, rng)
+    queries = generate_queries(keywords, args.queries, rng)
+    commands = {k: {"action": "open_app", "args": k} for k in keywords}
+
+    print("=" * 70)
+    print(f"⚙️  BENCHMARK DE COMANDOS ({args.commands} comandos, {args.queries} frases)")
+    print("=" * 70)
+
+    # Construcción inicial (incluye el cálculo perezoso de enlaces)
+    matcher, build_time = timed(CommandMatcher, keywords)
+    _, link_time = timed(matcher.find_all, "")
+    print(f"\n🏗️  Construcción del autómata: {(build_time + link_time) * 1000:.1f} ms")
+
+    # Búsqueda
+    _, naive_time = timed(lambda: [naive_match(commands, q) for q in queries])
+    _, ac_time = timed(lambda: [matcher.match(q) for q in queries])
+
+    print(f"\n🐢 Recorrido lineal:   {naive_time / len(queries) * 1e6:10.1f} µs/frase")
+    print(f"⚡ Aho-Corasick:       {ac_time / len(queries) * 1e6:10.1f} µs/frase")
+    print(f"   Aceleración:        {naive_time / ac_time:10.1f}x")
+
+    # Búsqueda aproximada sobre frases con una letra cambiada
+    fuzzy, fuzzy_build = timed(FuzzyCommandMatcher, keywords)
+    typo_queries = [q[:len(q) // 2] + "x" + q[len(q) // 2 + 1:] for q in queries[::2]]
+    fuzzy_results, fuzzy_time = timed(lambda: [fuzzy.match(q) for q in typo_queries])
+    resolved = sum(1 for r in fuzzy_results if r)
+
+    print(f"\n🔎 Índice de trigramas:  {fuzzy_build * 1000:8.1f} ms de construcción")
+    print(f"🔎 Búsqueda aproximada: {fuzzy_time / len(typo_queries) * 1e6:10.1f} µs/frase "
+          f"({resolved}/{len(typo_queries)} frases con errata resueltas)")
+
+    # Clasificador de intenciones: una intención por comando (espacio amplio
+    # para que miles de palabras aleatorias no colisionen en el hashing)
+    classifier = IntentClassifier({k: [k] for k in keywords}, negatives=[], dimensions=2 ** 20)
+    _, intent_build = timed(classifier.scores, keywords[0])
+    intent_queries = [
+        "pon " + " ".join(k.split()[1:]) + " ahora" for k in keywords[:len(typo_queries)]
+    ]
+    intent_results, intent_time = timed(lambda: [classifier.classify(q) for q in intent_queries])
+    classified = sum(1 for r in intent_results if r)
+
+    print(f"\n🧭 Matriz de intenciones: {intent_build * 1000:8.1f} ms de entrenamiento")
+    print(f"🧭 Clasificación:        {intent_time / len(intent_queries) * 1e6:10.1f} µs/frase "
+          f"({classified}/{len(intent_queries)} paráfrasis clasificadas)")
+
+    # Cambios incrementales: alta/baja + primera búsqueda tras el cambio
+    extra = generate_commands(100, random.Random(args.seed + 1))
+    start = time.perf_counter()
+    for keyword in extra:
+        matcher.add(keyword)
+    matcher.match(queries[0])
+    add_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for keyword in extra:
+        matcher.remove(keyword)
+    matcher.match(queries[0])
+    remove_time = time.perf_counter() - start
+
+    print(f"\n➕ 100 altas + búsqueda: {add_time * 1000:8.1f} ms")
+    print(f"➖ 100 bajas + búsqueda: {remove_time * 1000:8.1f} ms")
+    print("\n" + "=" * 70)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+"""
+Benchmark de escritura en la base de datos de JARVIS
+
+Mide cuántas interacciones por segundo se persisten con cada modo de
+escritura. Cada interacción escribe lo mismo que un turno de IA real:
+la interacción, las estadísticas de uso, el contexto RAG, las etapas
+medidas y el plazo de respuesta.
+
+Escenarios:
+    antes         diario clásico (DELETE) + synchronous=FULL, un commit por escritura
+    wal           WAL + synchronous=NORMAL, un commit por escritura
+    transaccion   WAL, una transacción por interacción (db.transaction())
+    grupo         WAL, PersistenceWriter (un commit por lote)
+    importacion   WAL, import_interactions (executemany, una transacción)
+
+Uso:
+    python jarvis_tools/benchmark_db.py
+    python jarvis_tools/benchmark_db.py --turns 2000 --json resultados_db.json
+    python jarvis_tools/benchmark_db.py --scenarios antes grupo --dir /ruta/en/disco/real
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modules import DatabaseManager, PersistenceWriter  # noqa: E402
+
+
+SPANS = [("record", 0.0, 1.2), ("transcribe", 1.2, 0.4), ("llm", 1.6, 0.9), ("speak", 2.5, 1.1)]
+DEADLINE = {'budget': 2.5, 'first_sentence': 0.8, 'missed': False, 'outcome': 'on_time'}
+
+
+def write_turn(db, session_id, i, commit):
+    """Las escrituras de un turno de IA (como JarvisAssistant._persist_turn)"""
+    user_text = f"pregunta de prueba número {i} sobre el tiempo de mañana"
+    response = "Respuesta de prueba del asistente. " * 4
+    interaction_id = db.save_interaction(session_id, user_text, response, 'ai',
+                                         duration=1.5, model_used="llama3.2:3b", commit=commit)
+    db.save_context(interaction_id, f"Usuario: {user_text}\nAsistente: {response}",
+                    importance=0.7, commit=commit)
+    db.save_spans(interaction_id, SPANS, commit=commit)
+    db.save_deadline(interaction_id, DEADLINE, commit=commit)
+
+
+def bench_per_write(db, session_id, turns):
+    for i in range(turns):
+        write_turn(db, session_id, i, commit=True)
+
+
+def bench_transaction(db, session_id, turns):
+    for i in range(turns):
+        with db.transaction():
+            write_turn(db, session_id, i, commit=False)
+
+
+def bench_group(db, session_id, turns):
+    writer = PersistenceWriter(db)
+    for i in range(turns):
+        writer.submit(write_turn, db, session_id, i, False)
+    writer.close()
+
+
+def bench_import(db, session_id, turns):
+    db.import_interactions(session_id, [
+        {'user_input': f"pregunta de prueba número {i}", 'response': "Respuesta de prueba. " * 4,
+         'duration': 1.5, 'model_used': "llama3.2:3b"}
+        for i in range(turns)
+    ], save_context=True)
+
+
+SCENARIOS = {
+    "antes": ("DELETE + FULL, commit por escritura", "DELETE", "FULL", bench_per_write),
+    "wal": ("WAL + NORMAL, commit por escritura", "WAL", "NORMAL", bench_per_write),
+    "transaccion": ("WAL, transacción por interacción", "WAL", "NORMAL", bench_transaction),
+    "grupo": ("WAL, PersistenceWriter (por lote)", "WAL", "NORMAL", bench_group),
+    "importacion": ("WAL, import_interactions", "WAL", "NORMAL", bench_import),
+}
+
+
+def run_scenario(key, turns, work_dir):
+    name, journal_mode, synchronous, bench = SCENARIOS[key]
+    db = DatabaseManager(db_path=os.path.join(work_dir, f"bench_{key}.db"),
+                         journal_mode=journal_mode, synchronous=synchronous)
+    session_id = db.create_session()
+
+    start = time.perf_counter()
+    bench(db, session_id, turns)
+    elapsed = time.perf_counter() - start
+
+    stored = db.conn.execute("SELECT COUNT(*) FROM interactions").fetchone()[0]
+    db.close()
+    return {
+        "scenario": key,
+        "name": name,
+        "turns": stored,
+        "elapsed": elapsed,
+        "turns_per_sec": stored / elapsed if elapsed else 0.0
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de escritura en SQLite")
+    parser.add_argument("--turns", type=int, default=500, help="interacciones por escenario")
+    parser.add_argument("--scenarios", nargs="+", choices=list(SCENARIOS), default=list(SCENARIOS))
+    parser.add_argument("--dir", help="directorio de las bases de prueba (por defecto, uno temporal)")
+    parser.add_argument("--json", help="guardar resultados en un archivo JSON")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(dir=args.dir) as work_dir:
+        results = [run_scenario(key, args.turns, work_dir) for key in args.scenarios]
+
+    baseline = next((r for r in results if r["scenario"] == "antes"), results[0])
+    print("\n" + "=" * 78)
+    print(f"💾 ESCRITURA EN SQLITE ({args.turns} interacciones por escenario)")
+    print("=" * 78)
+    print(f"{'Escenario':40} {'n':>6} {'tiempo':>9} {'turnos/s':>10} {'vs antes':>9}")
+    print("-" * 78)
+    for r in results:
+        speedup = r["turns_per_sec"] / baseline["turns_per_sec"] if baseline["turns_per_sec"] else 0.0
+        print(f"{r['name']:40} {r['turns']:6} {r['elapsed']:8.2f}s "
+              f"{r['turns_per_sec']:10.1f} {speedup:8.1f}x")
+    print("=" * 78 + "\n")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"settings": vars(args), "results": results}, f, indent=2)
+        print(f"💾 Resultados guardados en {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""
+Gestión del registro de comandos en la base de datos
+
+JARVIS recarga los cambios en caliente (sin reiniciar) en cuanto detecta
+una versión nueva del registro.
+
+Uso:
+    python jarvis_tools/command_registry.py list
+    python jarvis_tools/command_registry.py add "abre reaper" open_app "C:\\REAPER\\reaper.exe" --timeout 20
+    python jarvis_tools/command_registry.py remove "abre reaper"
+"""
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import DATABASE_PATH, SYSTEM_COMMANDS  # noqa: E402
+from modules.database_manager import DatabaseManager  # noqa: E402
+
+
+def list_commands(db):
+    """Muestra los comandos activos con su número de usos"""
+    usage = db.get_command_usage_counts()
+    rows = [row for row in db.get_registry_changes(0) if row['enabled']]
+
+    print(f"\n📋 {len(rows)} comandos registrados (versión {db.get_registry_version()}):\n")
+    for row in sorted(rows, key=lambda r: r['keyword']):
+        extra = ""
+        if row['sync'] is not None:
+            extra += f" sync={bool(row['sync'])}"
+        if row['timeout'] is not None:
+            extra += f" timeout={row['timeout']:g}s"
+        print(f"  • {row['keyword']:<30} {row['action']:<14} "
+              f"usos={usage.get(row['keyword'], 0):<5}{extra}  {row['args'] or ''}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Registro de comandos de JARVIS")
+    parser.add_argument("--db", default=DATABASE_PATH, help="Ruta de la base de datos")
+    subparsers = parser.add_subparsers(dest="operation", required=True)
+
+    subparsers.add_parser("list", help="Listar comandos")
+
+    add = subparsers.add_parser("add", help="Crear o actualizar un comando")
+    add.add_argument("keyword")
+    add.add_argument("action")
+    add.add_argument("args", nargs="?")
+    add.add_argument("--sync", action="store_true", default=None,
+                     help="Ejecutar en el bucle principal")
+    add.add_argument("--timeout", type=float, help="Tiempo límite en segundos")
+
+    remove = subparsers.add_parser("remove", help="Dar de baja un comando")
+    remove.add_argument("keyword")
+
+    args = parser.parse_args()
+    db = DatabaseManager(db_path=args.db)
+    db.seed_command_registry(SYSTEM_COMMANDS)
+
+    if args.operation == "list":
+        list_commands(db)
+    elif args.operation == "add":
+        version = db.register_command(args.keyword, args.action, args.args,
+                                      sync=args.sync, timeout=args.timeout)
+        print(f"✅ Comando '{args.keyword}' guardado (versión {version})")
+    elif args.operation == "remove":
+        if db.unregister_command(args.keyword):
+            print(f"🗑️ Comando '{args.keyword}' eliminado")
+        else:
+            print(f"⚠️ Comando '{args.keyword}' no encontrado")
+
+    db.close()
+
+
+if __name__ == "__main__":
+    main()
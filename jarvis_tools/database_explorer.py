@@ -2,11 +2,17 @@
 Explorador y Analizador de Base de Datos de JARVIS
 Herramienta interactiva para visualizar y analizar datos
 """
-import sqlite3
+import math
+import os
+import sys
 from datetime import datetime, timedelta
 from pathlib import Path
 import json
 
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modules.database_manager import connect_readonly, fts_query  # noqa: E402
+
 
 class DatabaseExplorer:
     """Herramienta para explorar la base de datos de JARVIS"""
@@ -24,8 +30,8 @@ class DatabaseExplorer:
             exit(1)
         
         self.db_path = db_path
-        self.conn = sqlite3.connect(db_path)
-        self.conn.row_factory = sqlite3.Row
+        # Solo lectura: en modo WAL no bloquea al asistente mientras escribe
+        self.conn = connect_readonly(db_path)
         self.cursor = self.conn.cursor()
         
         print(f"✅ Conectado a: {db_path}\n")
@@ -261,17 +267,38 @@ class DatabaseExplorer:
         print(f"🔍 BÚSQUEDA: '{keyword}'")
         print("=" * 80)
         
-        self.cursor.execute("""
-        SELECT 
-            timestamp,
-            user_input,
-            response,
-            response_type
-        FROM interactions
-        WHERE user_input LIKE ? OR response LIKE ?
-        ORDER BY timestamp DESC
-        LIMIT 20
-        """, (f'%{keyword}%', f'%{keyword}%'))
+        match = fts_query(keyword)
+        has_fts = self.cursor.execute(
+            "SELECT 1 FROM sqlite_master WHERE name = 'interactions_fts'"
+        ).fetchone()
+        
+        if match and has_fts:
+            # Índice de texto completo: por relevancia (BM25) y sin distinguir acentos
+            self.cursor.execute("""
+            SELECT 
+                i.timestamp,
+                i.user_input,
+                i.response,
+                i.response_type
+            FROM interactions_fts f
+            JOIN interactions i ON i.interaction_id = f.rowid
+            WHERE interactions_fts MATCH ?
+            ORDER BY bm25(interactions_fts, 2.0, 1.0)
+            LIMIT 20
+            """, (match,))
+        else:
+            # Base anterior al índice (el explorador no la modifica) o solo palabras vacías
+            self.cursor.execute("""
+            SELECT 
+                timestamp,
+                user_input,
+                response,
+                response_type
+            FROM interactions
+            WHERE user_input LIKE ? OR response LIKE ?
+            ORDER BY timestamp DESC
+            LIMIT 20
+            """, (f'%{keyword}%', f'%{keyword}%'))
         
         results = self.cursor.fetchall()
         
@@ -313,6 +340,107 @@ class DatabaseExplorer:
         
         print("\n" + "=" * 80)
     
+    def show_stage_latency(self, days=7):
+        """Muestra p50/p95 de cada etapa de las interacciones, en total y por día"""
+        print("\n" + "=" * 80)
+        print(f"⏱️  LATENCIA POR ETAPA (últimos {days} días)")
+        print("=" * 80)
+        
+        self.cursor.execute("""
+        SELECT name FROM sqlite_master WHERE type = 'table' AND name = 'interaction_spans'
+        """)
+        if not self.cursor.fetchone():
+            print("\n📭 No hay trazas registradas (activa ENABLE_TRACING)")
+            print("\n" + "=" * 80)
+            return
+        
+        # Etapa a etapa (salto por idx_spans_stage_time para listarlas) para que
+        # el filtro de fecha use el índice (stage, timestamp) y no recorra la tabla
+        self.cursor.execute("""
+        WITH RECURSIVE stages(stage) AS (
+            SELECT MIN(stage) FROM interaction_spans
+            UNION ALL
+            SELECT (SELECT MIN(stage) FROM interaction_spans WHERE stage > stages.stage)
+            FROM stages WHERE stage IS NOT NULL
+        )
+        SELECT DATE(s.timestamp) as day, s.stage, s.duration
+        FROM stages CROSS JOIN interaction_spans s
+        WHERE s.stage = stages.stage AND s.timestamp >= DATETIME('now', ?)
+        ORDER BY day
+        """, (f"-{days} days",))
+        
+        by_stage = {}
+        by_day = {}
+        for row in self.cursor.fetchall():
+            by_stage.setdefault(row['stage'], []).append(row['duration'])
+            by_day.setdefault(row['day'], {}).setdefault(row['stage'], []).append(row['duration'])
+        
+        if not by_stage:
+            print("\n📭 No hay trazas en este periodo")
+            print("\n" + "=" * 80)
+            return
+        
+        # Etapas ordenadas de la más lenta a la más rápida (por p95)
+        stages = sorted(by_stage, key=lambda st: self._percentile(by_stage[st], 95), reverse=True)
+        
+        print(f"\n{'Etapa':<20}{'n':>7}{'p50 (ms)':>12}{'p95 (ms)':>12}{'máx (ms)':>12}")
+        print("-" * 63)
+        for stage in stages:
+            values = by_stage[stage]
+            print(f"{stage:<20}{len(values):>7}"
+                  f"{self._percentile(values, 50) * 1000:>12.0f}"
+                  f"{self._percentile(values, 95) * 1000:>12.0f}"
+                  f"{max(values) * 1000:>12.0f}")
+        
+        print("\n📅 p50 / p95 por día (ms):\n")
+        print(f"{'Día':<12}" + "".join(f"{stage[:16]:>18}" for stage in stages))
+        for day in sorted(by_day):
+            cells = []
+            for stage in stages:
+                values = by_day[day].get(stage)
+                if values:
+                    cells.append(f"{self._percentile(values, 50) * 1000:.0f}/"
+                                 f"{self._percentile(values, 95) * 1000:.0f}")
+                else:
+                    cells.append("-")
+            print(f"{day:<12}" + "".join(f"{cell:>18}" for cell in cells))
+        
+        self._show_deadline_slo(days)
+        print("\n" + "=" * 80)
+    
+    def _show_deadline_slo(self, days):
+        """Cumplimiento del plazo de respuesta de los turnos de IA"""
+        self.cursor.execute("""
+        SELECT name FROM sqlite_master WHERE type = 'table' AND name = 'response_deadlines'
+        """)
+        if not self.cursor.fetchone():
+            return
+        
+        self.cursor.execute("""
+        SELECT outcome, missed, COUNT(*) as count
+        FROM response_deadlines
+        WHERE timestamp >= DATETIME('now', ?)
+        GROUP BY outcome, missed
+        """, (f"-{days} days",))
+        rows = self.cursor.fetchall()
+        
+        turns = sum(row['count'] for row in rows)
+        if not turns:
+            return
+        
+        misses = sum(row['count'] for row in rows if row['missed'])
+        print(f"\n🎯 Plazo de respuesta: {turns - misses}/{turns} turnos a tiempo "
+              f"({(turns - misses) / turns:.1%}), {misses} fuera de plazo")
+        for row in sorted(rows, key=lambda r: r['count'], reverse=True):
+            print(f"  • {row['outcome']:<12} {row['count']}")
+    
+    @staticmethod
+    def _percentile(values, percent):
+        """Percentil por rango más cercano"""
+        ordered = sorted(values)
+        index = max(0, min(len(ordered) - 1, math.ceil(percent / 100 * len(ordered)) - 1))
+        return ordered[index]
+    
     def export_to_json(self, output_file="jarvis_export.json"):
         """Exporta toda la base de datos a JSON"""
         print(f"\n📤 Exportando base de datos a {output_file}...")
@@ -324,6 +452,9 @@ class DatabaseExplorer:
             'reminders': []
         }
         
+        # Una transacción de lectura: todo el export ve la base en el mismo instante
+        self.conn.execute("BEGIN")
+        
         # Exportar sesiones con sus interacciones
         self.cursor.execute("SELECT * FROM sessions")
         for session in self.cursor.fetchall():
@@ -354,6 +485,7 @@ class DatabaseExplorer:
         # Exportar recordatorios
         self.cursor.execute("SELECT * FROM reminders")
         export_data['reminders'] = [dict(r) for r in self.cursor.fetchall()]
+        self.conn.rollback()
         
         # Guardar archivo
         with open(output_file, 'w', encoding='utf-8') as f:
@@ -383,7 +515,8 @@ def main():
         print("7.  🔍 Buscar en conversaciones")
         print("8.  📊 Uso por hora")
         print("9.  📤 Exportar a JSON")
-        print("10. 🚪 Salir")
+        print("10. ⏱️  Latencia por etapa")
+        print("11. 🚪 Salir")
         print("=" * 80)
         
         opcion = input("\n👉 Selecciona una opción: ").strip()
@@ -416,6 +549,9 @@ def main():
                 filename = filename if filename else "jarvis_export.json"
                 explorer.export_to_json(filename)
             elif opcion == "10":
+                days = input("¿Cuántos días analizar? [7]: ").strip()
+                explorer.show_stage_latency(int(days) if days else 7)
+            elif opcion == "11":
                 print("\n👋 ¡Hasta luego!")
                 break
             else:
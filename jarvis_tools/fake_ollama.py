@@ -0,0 +1,362 @@
+"""
+Servidor HTTP que imita la API de Ollama para pruebas y benchmarks sin GPU
+
+Implementa /api/chat y /api/generate (con y sin streaming), /api/embed,
+/api/embeddings, /api/tags y /api/version. La velocidad de generación,
+el tiempo hasta el primer token y la inyección de fallos son configurables.
+
+Uso:
+    python jarvis_tools/fake_ollama.py --port 11434 --token-rate 40 --ttft 0.3
+"""
+import argparse
+import hashlib
+import json
+import math
+import random
+import socket
+import threading
+import time
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+DEFAULT_REPLY = (
+    "Claro, aquí tienes una respuesta de prueba generada por el servidor "
+    "simulado de Ollama para medir la latencia del asistente JARVIS."
+)
+
+
+def fake_embedding(text, dimensions=384):
+    """
+    Calcula un embedding determinista a partir de trigramas de caracteres.
+
+    Textos parecidos comparten trigramas y por tanto obtienen vectores
+    cercanos, lo que basta para probar la búsqueda semántica.
+
+    Args:
+        text (str): Texto de entrada
+        dimensions (int): Dimensión del vector
+
+    Returns:
+        list: Vector normalizado (norma 1)
+    """
+    vector = [0.0] * dimensions
+    padded = f"  {text.lower()}  "
+
+    for i in range(len(padded) - 2):
+        digest = hashlib.md5(padded[i:i + 3].encode("utf-8")).digest()
+        index = int.from_bytes(digest[:4], "little") % dimensions
+        sign = 1.0 if digest[4] & 1 else -1.0
+        vector[index] += sign
+
+    norm = math.sqrt(sum(v * v for v in vector)) or 1.0
+    return [v / norm for v in vector]
+
+
+class FakeOllamaSettings:
+    """Parámetros de comportamiento del servidor simulado"""
+
+    def __init__(self, token_rate=50.0, ttft=0.2, load_time=0.0,
+                 response_tokens=30, reply=None, failure_rate=0.0,
+                 failure_mode="error", embedding_dimensions=384,
+                 model_token_rates=None, seed=None):
+        """
+        Args:
+            token_rate (float): Tokens por segundo generados
+            ttft (float): Segundos hasta el primer token (evaluación del prompt)
+            load_time (float): Segundos extra la primera vez que se usa un modelo
+            response_tokens (int): Longitud de la respuesta en tokens
+            reply (str): Texto base de las respuestas
+            failure_rate (float): Probabilidad (0-1) de fallo por petición
+            failure_mode (str): 'error' (HTTP 500), 'disconnect' o 'hang'
+            embedding_dimensions (int): Dimensión de los embeddings
+            model_token_rates (dict): Velocidad específica por modelo
+            seed (int): Semilla para que la inyección de fallos sea reproducible
+        """
+        self.token_rate = token_rate
+        self.ttft = ttft
+        self.load_time = load_time
+        self.response_tokens = response_tokens
+        self.reply = reply or DEFAULT_REPLY
+        self.failure_rate = failure_rate
+        self.failure_mode = failure_mode
+        self.embedding_dimensions = embedding_dimensions
+        self.model_token_rates = model_token_rates or {}
+        self.random = random.Random(seed)
+
+
+class FakeOllamaHandler(BaseHTTPRequestHandler):
+    """Atiende las peticiones imitando las respuestas de Ollama"""
+
+    protocol_version = "HTTP/1.1"  # Conexiones keep-alive como Ollama real
+
+    def setup(self):
+        super().setup()
+        self.server.record("connections")
+
+    def log_message(self, format, *args):
+        """Silencia el log por petición de BaseHTTPRequestHandler"""
+        pass
+
+    # === ENRUTADO ===
+
+    def do_GET(self):
+        if self.path == "/api/tags":
+            models = [{"name": m, "model": m} for m in sorted(self.server.loaded_models)]
+            self._send_json({"models": models})
+        elif self.path == "/api/version":
+            self._send_json({"version": "0.0.0-fake"})
+        elif self.path == "/":
+            self._send_text("Ollama is running")
+        else:
+            self._send_json({"error": "not found"}, status=404)
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        try:
+            body = json.loads(self.rfile.read(length) or b"{}")
+        except json.JSONDecodeError:
+            self._send_json({"error": "invalid JSON"}, status=400)
+            return
+
+        self.server.record("requests")
+
+        if self._inject_failure():
+            return
+
+        if self.path == "/api/chat":
+            self._handle_generation(body, chat=True)
+        elif self.path == "/api/generate":
+            self._handle_generation(body, chat=False)
+        elif self.path == "/api/embed":
+            self._handle_embed(body)
+        elif self.path == "/api/embeddings":
+            embedding = fake_embedding(body.get("prompt", ""), self.settings.embedding_dimensions)
+            self._send_json({"embedding": embedding})
+        else:
+            self._send_json({"error": "not found"}, status=404)
+
+    @property
+    def settings(self):
+        return self.server.settings
+
+    # === ENDPOINTS ===
+
+    def _handle_generation(self, body, chat):
+        """Simula /api/chat y /api/generate"""
+        model = body.get("model", "")
+        stream = body.get("stream", True)
+        start = time.time()
+
+        load_duration = self.server.load_model(model)
+
+        # Un prompt vacío solo carga el modelo (así precarga Ollama)
+        if not chat and not body.get("prompt"):
+            self._send_json(self._final_chunk(model, chat, "", start, load_duration, 0))
+            return
+
+        time.sleep(self.settings.ttft)
+
+        tokens = self._reply_tokens()
+        rate = self.settings.model_token_rates.get(model, self.settings.token_rate)
+        delay = 1.0 / rate if rate > 0 else 0.0
+
+        if not stream:
+            time.sleep(delay * len(tokens))
+            self._send_json(self._final_chunk(model, chat, "".join(tokens), start,
+                                              load_duration, len(tokens)))
+            return
+
+        # Streaming NDJSON con transferencia chunked
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+        try:
+            for token in tokens:
+                self._write_chunk(self._partial_chunk(model, chat, token))
+                time.sleep(delay)
+
+            self._write_chunk(self._final_chunk(model, chat, "", start,
+                                               load_duration, len(tokens)))
+            self.wfile.write(b"0\r\n\r\n")
+        except (BrokenPipeError, ConnectionResetError):
+            # El cliente canceló el stream: igual que Ollama, se deja de generar
+            self.server.record("cancelled_streams")
+            self.close_connection = True
+
+    def _handle_embed(self, body):
+        """Simula /api/embed (uno o varios textos)"""
+        texts = body.get("input", "")
+        if isinstance(texts, str):
+            texts = [texts]
+
+        self.server.load_model(body.get("model", ""))
+        dimensions = self.settings.embedding_dimensions
+        self._send_json({
+            "model": body.get("model", ""),
+            "embeddings": [fake_embedding(t, dimensions) for t in texts]
+        })
+
+    # === RESPUESTAS ===
+
+    def _reply_tokens(self):
+        """Divide el texto base en 'tokens' (palabras) hasta la longitud pedida"""
+        words = self.settings.reply.split()
+        count = self.settings.response_tokens
+        return [words[i % len(words)] + " " for i in range(count)]
+
+    def _partial_chunk(self, model, chat, token):
+        chunk = {"model": model, "created_at": _now(), "done": False}
+        if chat:
+            chunk["message"] = {"role": "assistant", "content": token}
+        else:
+            chunk["response"] = token
+        return chunk
+
+    def _final_chunk(self, model, chat, text, start, load_duration, eval_count):
+        chunk = self._partial_chunk(model, chat, text)
+        total = time.time() - start
+        chunk.update({
+            "done": True,
+            "done_reason": "stop" if eval_count else "load",
+            "total_duration": int(total * 1e9),
+            "load_duration": int(load_duration * 1e9),
+            "prompt_eval_count": 10,
+            "prompt_eval_duration": int(self.settings.ttft * 1e9),
+            "eval_count": eval_count,
+            "eval_duration": int(max(total - self.settings.ttft - load_duration, 0) * 1e9)
+        })
+        return chunk
+
+    def _inject_failure(self):
+        """Simula un fallo según failure_rate. Devuelve True si se inyectó"""
+        settings = self.settings
+        if settings.failure_rate <= 0 or settings.random.random() >= settings.failure_rate:
+            return False
+
+        self.server.record("injected_failures")
+
+        if settings.failure_mode == "disconnect":
+            self.close_connection = True
+            self.connection.shutdown(socket.SHUT_RDWR)
+        elif settings.failure_mode == "hang":
+            time.sleep(3600)
+        else:
+            self._send_json({"error": "fake ollama: injected failure"}, status=500)
+        return True
+
+    def _send_json(self, payload, status=200):
+        data = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _send_text(self, text):
+        data = text.encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _write_chunk(self, payload):
+        data = (json.dumps(payload) + "\n").encode("utf-8")
+        self.wfile.write(f"{len(data):X}\r\n".encode("ascii") + data + b"\r\n")
+        self.wfile.flush()
+
+
+class FakeOllamaServer(ThreadingHTTPServer):
+    """Servidor Ollama simulado que puede arrancarse en un hilo"""
+
+    daemon_threads = True
+
+    def __init__(self, host="127.0.0.1", port=0, settings=None, **kwargs):
+        """
+        Args:
+            host (str): Interfaz de escucha
+            port (int): Puerto (0 = elegir uno libre)
+            settings (FakeOllamaSettings): Comportamiento del servidor
+            **kwargs: Alternativa a `settings` (se pasan a FakeOllamaSettings)
+        """
+        super().__init__((host, port), FakeOllamaHandler)
+        self.settings = settings or FakeOllamaSettings(**kwargs)
+        self.loaded_models = set()
+        self.counters = {}
+        self._lock = threading.Lock()
+        self._thread = None
+
+    @property
+    def url(self):
+        """URL base para OLLAMA_HOST / OllamaClient(host=...)"""
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def record(self, counter):
+        """Incrementa un contador de actividad"""
+        with self._lock:
+            self.counters[counter] = self.counters.get(counter, 0) + 1
+
+    def load_model(self, model):
+        """Simula la carga en frío de un modelo. Devuelve el tiempo empleado"""
+        with self._lock:
+            cold = model not in self.loaded_models
+            self.loaded_models.add(model)
+
+        if cold and self.settings.load_time:
+            time.sleep(self.settings.load_time)
+            return self.settings.load_time
+        return 0.0
+
+    def start(self):
+        """Arranca el servidor en un hilo daemon y devuelve self"""
+        self._thread = threading.Thread(target=self.serve_forever, name="fake-ollama", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """Detiene el servidor y libera el puerto"""
+        self.shutdown()
+        self.server_close()
+
+
+def _now():
+    return datetime.now(timezone.utc).isoformat()
+
+
+def main():
+    """Arranca el servidor simulado desde la línea de comandos"""
+    parser = argparse.ArgumentParser(description="Servidor Ollama simulado para JARVIS")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11434)
+    parser.add_argument("--token-rate", type=float, default=50.0, help="tokens por segundo")
+    parser.add_argument("--ttft", type=float, default=0.2, help="segundos hasta el primer token")
+    parser.add_argument("--load-time", type=float, default=0.0, help="carga en frío por modelo")
+    parser.add_argument("--tokens", type=int, default=30, help="tokens por respuesta")
+    parser.add_argument("--failure-rate", type=float, default=0.0)
+    parser.add_argument("--failure-mode", choices=["error", "disconnect", "hang"], default="error")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    server = FakeOllamaServer(
+        args.host, args.port,
+        token_rate=args.token_rate, ttft=args.ttft, load_time=args.load_time,
+        response_tokens=args.tokens, failure_rate=args.failure_rate,
+        failure_mode=args.failure_mode, seed=args.seed
+    )
+
+    print(f"🧪 Ollama simulado escuchando en {server.url}")
+    print("⌨️  Presiona Ctrl+C para salir\n")
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print(f"\n📊 Actividad: {server.counters}")
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,182 @@
+"""
+Reproducción sin hardware de una sesión completa de JARVIS
+
+Sustituye el micrófono por un guion de texto o un directorio de WAV y la
+voz por un sumidero nulo o un archivo, y ejecuta el camino completo de
+cada turno (transcripción, process_user_input, persistencia) a máxima
+velocidad. Imprime throughput, latencia por turno y desglose por etapa,
+para detectar regresiones de rendimiento antes de desplegar.
+
+Uso:
+    python jarvis_tools/replay.py --text guion.txt --fake-ollama
+    python jarvis_tools/replay.py --text guion.txt --repeat 20 --mode async --output respuestas.txt
+    python jarvis_tools/replay.py --wav-dir grabaciones/ --json resultados.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from benchmark_ai import AI_PROMPTS, COMMAND_PROMPTS, summarize, print_report  # noqa: E402
+from fake_ollama import FakeOllamaServer  # noqa: E402
+from modules import (  # noqa: E402
+    AIEngine, AsyncPipeline, CommandExecutor, DatabaseManager, JarvisLogger, OllamaClient,
+    TextScriptRecorder, WavDirectoryRecorder, PassthroughSpeechToText,
+    NullTextToSpeech, FileTextToSpeech
+)
+
+
+def build_input(args):
+    """
+    Crea el grabador y el transcriptor según la entrada elegida
+
+    Returns:
+        tuple: (grabador, transcriptor)
+    """
+    if args.wav_dir:
+        from modules import SpeechToText  # Carga Whisper solo si hay audio real
+        return WavDirectoryRecorder(args.wav_dir), SpeechToText()
+
+    utterances = read_script(args.text) if args.text else AI_PROMPTS + COMMAND_PROMPTS
+    return TextScriptRecorder(utterances * args.repeat), PassthroughSpeechToText()
+
+
+def read_script(path):
+    """Una frase por línea; se ignoran las vacías y las que empiezan por #"""
+    with open(path, encoding="utf-8") as f:
+        lines = [line.strip() for line in f]
+    return [line for line in lines if line and not line.startswith("#")]
+
+
+def count_turn_errors(db):
+    """Errores de interacción registrados por el bucle o el pipeline"""
+    return db.conn.execute(
+        "SELECT COUNT(*) FROM error_logs WHERE module IN ('run_loop', 'pipeline')"
+    ).fetchone()[0]
+
+
+def run_sync(assistant):
+    """Turnos uno tras otro con run_turn (el bucle de main.py sin pausas)"""
+    latencies = []
+    while True:
+        t0 = time.perf_counter()
+        if not assistant.run_turn():
+            break
+        latencies.append(time.perf_counter() - t0)
+    return latencies
+
+
+def run_async(assistant):
+    """Turnos solapados con el pipeline asíncrono"""
+    pipeline = AsyncPipeline(assistant)
+    asyncio.run(pipeline.run())
+    return pipeline.latencies
+
+
+def stage_report(db, session_id):
+    """
+    Resume las etapas medidas (interaction_spans) de la sesión reproducida
+
+    Returns:
+        list: Estadísticas por etapa en el formato de summarize()
+    """
+    rows = db.conn.execute("""
+    SELECT s.stage, s.duration
+    FROM interaction_spans s
+    JOIN interactions i ON i.interaction_id = s.interaction_id
+    WHERE i.session_id = ?
+    """, (session_id,)).fetchall()
+    by_stage = {}
+    for row in rows:
+        by_stage.setdefault(row['stage'], []).append(row['duration'])
+
+    return [summarize(f"  etapa: {stage}", durations, 0)
+            for stage, durations in sorted(by_stage.items())]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Reproducción sin hardware de JARVIS")
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument("--text", help="guion de texto (una frase por línea)")
+    source.add_argument("--wav-dir", help="directorio de WAV (se transcriben con Whisper)")
+    parser.add_argument("--repeat", type=int, default=1, help="repeticiones del guion de texto")
+    parser.add_argument("--mode", choices=("sync", "async"), default="sync",
+                        help="bucle secuencial (run) o pipeline asíncrono (run_async)")
+    parser.add_argument("--output", help="escribir las respuestas en este archivo")
+    parser.add_argument("--db", help="base de datos (por defecto, una temporal)")
+    parser.add_argument("--fake-ollama", action="store_true",
+                        help="usar un Ollama simulado en el propio proceso")
+    parser.add_argument("--token-rate", type=float, default=200.0)
+    parser.add_argument("--ttft", type=float, default=0.05)
+    parser.add_argument("--json", help="guardar resultados en un archivo JSON")
+    args = parser.parse_args()
+
+    server = None
+    if args.fake_ollama:
+        server = FakeOllamaServer(token_rate=args.token_rate, ttft=args.ttft).start()
+        print(f"🧪 Ollama simulado en {server.url}")
+    client = OllamaClient(host=server.url if server else None)
+
+    from main import JarvisAssistant
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        logger = JarvisLogger(log_dir=os.path.join(work_dir, "logs"))
+        db = DatabaseManager(db_path=args.db or os.path.join(work_dir, "replay.db"), logger=logger)
+        recorder, stt = build_input(args)
+        tts = FileTextToSpeech(args.output) if args.output else NullTextToSpeech()
+
+        assistant = JarvisAssistant(
+            logger=logger,
+            db=db,
+            audio_recorder=recorder,
+            speech_to_text=stt,
+            text_to_speech=tts,
+            ai_engine=AIEngine(client=client, logger=logger, warmup=False),
+            command_executor=CommandExecutor(logger=logger, db=db)
+        )
+
+        errors_before = count_turn_errors(db)
+        start = time.perf_counter()
+        try:
+            latencies = run_async(assistant) if args.mode == "async" else run_sync(assistant)
+            # El throughput incluye la persistencia pendiente
+            if assistant.persistence:
+                assistant.persistence.flush()
+        finally:
+            elapsed = time.perf_counter() - start
+            if assistant.persistence:
+                assistant.persistence.close()
+            if assistant.vector_store:
+                assistant.vector_store.close()
+            assistant.command_executor.close()
+            if assistant.speculator:
+                assistant.speculator.shutdown()
+
+        errors = count_turn_errors(db) - errors_before
+        results = [summarize(f"Turno completo ({args.mode})", latencies, elapsed, errors)]
+        results.extend(stage_report(db, assistant.session_id))
+
+        db.close()
+        client.close()
+        if server:
+            server.stop()
+
+    print_report(results)
+    print(f"⏱️ {len(latencies)} turnos en {elapsed:.2f}s "
+          f"({results[0]['throughput']:.2f} turnos/s), frases dichas: {tts.spoken}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"settings": vars(args), "results": results}, f, indent=2)
+        print(f"💾 Resultados guardados en {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,278 @@
+"""
+Prueba de carga del servidor multisesión de JARVIS
+
+Arranca en el propio proceso un Ollama simulado y el servidor (con una BD
+temporal y transcripciones fijadas para los WAV de prueba) y lanza N
+clientes concurrentes, cada uno con su sesión, que alternan turnos de
+texto y de audio por HTTP o por WebSocket. Informa de la latencia por
+tipo de turno y de los rechazos por límite (429) o por admisión (503).
+
+Uso:
+    python jarvis_tools/server_load.py --clients 8 --turns 10
+    python jarvis_tools/server_load.py --clients 32 --transport ws --max-active 4
+    python jarvis_tools/server_load.py --url http://127.0.0.1:8765 --clients 4
+"""
+import argparse
+import base64
+import io
+import json
+import os
+import socket
+import struct
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+import wave
+
+import numpy as np
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from benchmark_ai import AI_PROMPTS, summarize, print_report  # noqa: E402
+from fake_ollama import FakeOllamaServer  # noqa: E402
+from modules import (  # noqa: E402
+    DatabaseManager, JarvisLogger, OllamaClient, PersistenceWriter,
+    SessionManager, SpeechToTextPool, JarvisServer, FixtureSpeechToText
+)
+
+
+def make_wav(seconds, seed, sample_rate=16000):
+    """WAV mono de ruido (el contenido da igual: la transcripción está fijada)"""
+    rng = np.random.default_rng(seed)
+    samples = (rng.standard_normal(int(seconds * sample_rate)) * 3000).astype(np.int16)
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(sample_rate)
+        wav.writeframes(samples.tobytes())
+    return buffer.getvalue()
+
+
+# === CLIENTES ===
+
+class HttpClient:
+    """Cliente de la API REST (una sesión)"""
+
+    def __init__(self, url):
+        self.url = url
+        self.session_id = self._request("POST", "/sessions", b"{}")[1]["session_id"]
+
+    def turn(self, text=None, audio=None):
+        if audio is not None:
+            return self._request("POST", f"/sessions/{self.session_id}/turns", audio, "audio/wav")
+        body = json.dumps({"text": text}).encode("utf-8")
+        return self._request("POST", f"/sessions/{self.session_id}/turns", body)
+
+    def close(self):
+        self._request("DELETE", f"/sessions/{self.session_id}")
+
+    def _request(self, method, path, body=None, content_type="application/json"):
+        """Devuelve (código HTTP, JSON de la respuesta)"""
+        request = urllib.request.Request(self.url + path, data=body, method=method,
+                                         headers={"Content-Type": content_type})
+        try:
+            with urllib.request.urlopen(request, timeout=120) as response:
+                return response.status, json.loads(response.read())
+        except urllib.error.HTTPError as e:
+            return e.code, json.loads(e.read() or b"{}")
+
+
+class WebSocketClient(HttpClient):
+    """Cliente WebSocket mínimo (handshake y tramas enmascaradas sin fragmentar)"""
+
+    def __init__(self, url):
+        super().__init__(url)
+        host, port = url.split("//", 1)[1].split(":")
+        self.sock = socket.create_connection((host, int(port)), timeout=120)
+        key = base64.b64encode(os.urandom(16)).decode()
+        self.sock.sendall((
+            f"GET /sessions/{self.session_id}/ws HTTP/1.1\r\n"
+            f"Host: {host}:{port}\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n"
+            f"Sec-WebSocket-Key: {key}\r\nSec-WebSocket-Version: 13\r\n\r\n"
+        ).encode())
+        self.reader = self.sock.makefile("rb")
+        status = self.reader.readline()
+        if b" 101 " not in status:
+            raise RuntimeError(f"Handshake rechazado: {status!r}")
+        while self.reader.readline() not in (b"\r\n", b""):
+            pass
+
+    def turn(self, text=None, audio=None):
+        if audio is not None:
+            self._send(0x2, audio)
+        else:
+            self._send(0x1, json.dumps({"text": text}).encode("utf-8"))
+        result = json.loads(self._receive())
+        return result.get("status", 200), result
+
+    def close(self):
+        self._send(0x8, b"")
+        self._receive()
+        self.sock.close()
+        super().close()
+
+    def _send(self, opcode, payload):
+        length = len(payload)
+        if length < 126:
+            header = struct.pack(">BB", 0x80 | opcode, 0x80 | length)
+        elif length < 65536:
+            header = struct.pack(">BBH", 0x80 | opcode, 0x80 | 126, length)
+        else:
+            header = struct.pack(">BBQ", 0x80 | opcode, 0x80 | 127, length)
+        mask = os.urandom(4)
+        data = np.frombuffer(payload, dtype=np.uint8) ^ np.resize(np.frombuffer(mask, dtype=np.uint8), length)
+        self.sock.sendall(header + mask + data.tobytes())
+
+    def _receive(self):
+        header = self.reader.read(2)
+        length = header[1] & 0x7F
+        if length == 126:
+            length = struct.unpack(">H", self.reader.read(2))[0]
+        elif length == 127:
+            length = struct.unpack(">Q", self.reader.read(8))[0]
+        return self.reader.read(length)
+
+
+def run_client(url, transport, turns, fixtures, pause, results, lock):
+    """Un usuario: abre sesión, alterna turnos de texto y audio y la cierra"""
+    client = (WebSocketClient if transport == "ws" else HttpClient)(url)
+    local = {"text": [], "audio": [], "status": {}}
+    try:
+        for i in range(turns):
+            use_audio = i % 2 == 1
+            t0 = time.perf_counter()
+            if use_audio:
+                status, _ = client.turn(audio=fixtures[i % len(fixtures)][0])
+            else:
+                status, _ = client.turn(text=AI_PROMPTS[i % len(AI_PROMPTS)])
+            elapsed = time.perf_counter() - t0
+
+            local["status"][status] = local["status"].get(status, 0) + 1
+            if status == 200:
+                local["audio" if use_audio else "text"].append(elapsed)
+            if pause:
+                time.sleep(pause)
+    finally:
+        client.close()
+
+    with lock:
+        results["text"].extend(local["text"])
+        results["audio"].extend(local["audio"])
+        for status, count in local["status"].items():
+            results["status"][status] = results["status"].get(status, 0) + count
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Prueba de carga del servidor multisesión")
+    parser.add_argument("--clients", type=int, default=8, help="clientes concurrentes")
+    parser.add_argument("--turns", type=int, default=10, help="turnos por cliente")
+    parser.add_argument("--transport", choices=("http", "ws"), default="http")
+    parser.add_argument("--pause", type=float, default=0.0, help="segundos entre turnos")
+    parser.add_argument("--url", help="servidor ya arrancado (por defecto, uno en proceso)")
+    parser.add_argument("--max-active", type=int, default=None, help="turnos simultáneos admitidos")
+    parser.add_argument("--rate", type=float, default=600.0, help="turnos por minuto y sesión")
+    parser.add_argument("--burst", type=int, default=None, help="ráfaga de turnos por sesión")
+    parser.add_argument("--stt-workers", type=int, default=2)
+    parser.add_argument("--stt-delay", type=float, default=0.05,
+                        help="segundos que tarda la transcripción simulada")
+    parser.add_argument("--token-rate", type=float, default=200.0)
+    parser.add_argument("--ttft", type=float, default=0.05)
+    parser.add_argument("--json", help="guardar resultados en un archivo JSON")
+    args = parser.parse_args()
+
+    # Audios de prueba con su transcripción fijada
+    fixtures = [(make_wav(1.0 + i * 0.5, seed=i), prompt) for i, prompt in enumerate(AI_PROMPTS[:3])]
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        stack = None
+        url = args.url
+        if not url:
+            stack = start_stack(args, fixtures, work_dir)
+            url = stack["server"].url
+            print(f"🧪 Servidor en proceso en {url} (Ollama simulado en {stack['ollama'].url})")
+
+        results = {"text": [], "audio": [], "status": {}}
+        lock = threading.Lock()
+        threads = [
+            threading.Thread(target=run_client,
+                             args=(url, args.transport, args.turns, fixtures, args.pause, results, lock))
+            for _ in range(args.clients)
+        ]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - start
+
+        health = stop_stack(stack) if stack else None
+
+    rejected = sum(count for status, count in results["status"].items() if status != 200)
+    report = [
+        summarize(f"Turno de texto ({args.transport})", results["text"], elapsed),
+        summarize(f"Turno de audio ({args.transport})", results["audio"], elapsed),
+        summarize("Todos los turnos", results["text"] + results["audio"], elapsed, rejected)
+    ]
+    print_report(report)
+    print(f"👥 {args.clients} clientes x {args.turns} turnos en {elapsed:.2f}s")
+    print(f"📨 Respuestas por código: {dict(sorted(results['status'].items()))}")
+    if health:
+        print(f"🩺 Servidor: {health}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"settings": vars(args), "results": report,
+                       "status": results["status"], "server": health}, f, indent=2)
+        print(f"💾 Resultados guardados en {args.json}")
+
+
+def start_stack(args, fixtures, work_dir):
+    """Ollama simulado, BD temporal y servidor JARVIS en hilos del proceso"""
+    ollama = FakeOllamaServer(token_rate=args.token_rate, ttft=args.ttft).start()
+    logger = JarvisLogger(log_dir=os.path.join(work_dir, "logs"))
+    db = DatabaseManager(db_path=os.path.join(work_dir, "server.db"), logger=logger)
+    client = OllamaClient(host=ollama.url, logger=logger)
+    persistence = PersistenceWriter(db, logger=logger)
+
+    def make_stt():
+        stt = FixtureSpeechToText({audio: text for audio, text in fixtures})
+        transcribe = stt.transcribe
+
+        def slow_transcribe(audio_file):
+            time.sleep(args.stt_delay)  # Coste simulado de Whisper
+            return transcribe(audio_file)
+
+        stt.transcribe = slow_transcribe
+        return stt
+
+    manager = SessionManager(
+        db=db, client=client, stt_pool=SpeechToTextPool(make_stt, size=args.stt_workers),
+        persistence=persistence, logger=logger,
+        max_sessions=max(args.clients, 1), max_active_turns=args.max_active,
+        session_rate=args.rate, session_burst=args.burst
+    )
+    server = JarvisServer(manager).start()
+    return {"ollama": ollama, "db": db, "client": client, "persistence": persistence,
+            "manager": manager, "server": server}
+
+
+def stop_stack(stack):
+    """Detiene el servidor y devuelve su estado final (/health)"""
+    health = stack["manager"].health()
+    stack["server"].stop()
+    stack["manager"].close()
+    stack["persistence"].close()
+    stack["client"].close()
+    stack["db"].close()
+    stack["ollama"].stop()
+    return health
+
+
+if __name__ == "__main__":
+    main()
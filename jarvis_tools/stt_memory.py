@@ -0,0 +1,70 @@
+"""
+Informe de memoria de los workers de transcripción (ForkedSpeechToText)
+
+Carga el modelo una vez, crea los workers con fork y muestra, por proceso,
+la memoria única (privada) y la compartida. Con el modelo bien compartido
+la memoria única de cada worker es pequeña y la suma de PSS se acerca a
+una sola copia del modelo, no a N.
+
+Uso:
+    python jarvis_tools/stt_memory.py --workers 4
+    python jarvis_tools/stt_memory.py --workers 4 --model base --wav data/rec.wav
+    python jarvis_tools/stt_memory.py --workers 4 --simulate-mb 500
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modules import ForkedSpeechToText  # noqa: E402
+
+
+class SimulatedSpeechToText:
+    """Modelo simulado: pesos float32 que se leen enteros en cada transcripción"""
+
+    def __init__(self, size_mb):
+        self.model_name = f"simulado-{size_mb}MB"
+        self.weights = np.random.default_rng(0).standard_normal(
+            size_mb * 1024 * 1024 // 4, dtype=np.float32
+        )
+
+    def transcribe(self, audio_path):
+        return f"suma de pesos {float(self.weights.sum()):.1f}"
+
+    def transcribe_partial(self, audio):
+        return self.transcribe(None)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Memoria única y compartida de los workers STT")
+    parser.add_argument("--workers", type=int, default=2, help="procesos hijos")
+    parser.add_argument("--model", help="modelo de Whisper (por defecto, WHISPER_MODEL)")
+    parser.add_argument("--wav", help="WAV a transcribir en cada worker antes de medir")
+    parser.add_argument("--simulate-mb", type=int,
+                        help="usar un modelo simulado de este tamaño en lugar de Whisper")
+    args = parser.parse_args()
+
+    factory = (lambda: SimulatedSpeechToText(args.simulate_mb)) if args.simulate_mb else None
+    stt = ForkedSpeechToText(workers=args.workers, model_name=args.model, factory=factory)
+    try:
+        print("Tras el fork (sin transcribir):")
+        stt.print_memory_report()
+
+        # Una transcripción por worker: las lecturas de pesos no deben copiar páginas
+        if args.wav or args.simulate_mb:
+            start = time.perf_counter()
+            for _ in range(args.workers):
+                text = stt.transcribe(args.wav)
+            print(f"Tras {args.workers} transcripciones ({time.perf_counter() - start:.2f}s, "
+                  f"última: {text!r}):")
+            stt.print_memory_report()
+    finally:
+        stt.close()
+
+
+if __name__ == "__main__":
+    main()
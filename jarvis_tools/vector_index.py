@@ -0,0 +1,118 @@
+"""
+Mantenimiento del índice semántico de JARVIS (VectorStore)
+
+Convierte en embeddings los contextos pendientes (backfill), reconstruye
+el índice tras cambiar de modelo, prueba búsquedas y mide la búsqueda
+top-k sobre una matriz sintética.
+
+Uso:
+    python jarvis_tools/vector_index.py --backfill
+    python jarvis_tools/vector_index.py --rebuild --backfill
+    python jarvis_tools/vector_index.py --search "qué música me gusta"
+    python jarvis_tools/vector_index.py --backfill --fake-embeddings --db /tmp/prueba.db
+    python jarvis_tools/vector_index.py --bench 1000000 --dims 768 --dtype float16
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from config import DATABASE_PATH, SEARCH_CANDIDATES  # noqa: E402
+from fake_ollama import fake_embedding  # noqa: E402
+from modules import DatabaseManager, VectorStore  # noqa: E402
+
+
+def bench(rows, dims, dtype, k, queries):
+    """Búsqueda top-k sobre `rows` vectores aleatorios en una base temporal"""
+    rng = np.random.default_rng(0)
+    with tempfile.TemporaryDirectory() as work_dir:
+        db = DatabaseManager(db_path=os.path.join(work_dir, "bench.db"))
+        store = VectorStore(db, embedder=lambda texts: None, dtype=dtype, start=False)
+
+        start = time.perf_counter()
+        for first in range(0, rows, 100_000):
+            n = min(100_000, rows - first)
+            store.add(range(first + 1, first + n + 1), rng.standard_normal((n, dims), dtype=np.float32))
+        build = time.perf_counter() - start
+
+        store.search_vector(rng.standard_normal(dims), k)  # Primera lectura: páginas a memoria
+        times = []
+        for _ in range(queries):
+            vector = rng.standard_normal(dims)
+            t0 = time.perf_counter()
+            store.search_vector(vector, k, min_similarity=-1.0)
+            times.append(time.perf_counter() - t0)
+        size_mb = os.path.getsize(store.path) / 1024 / 1024
+
+        store.close()
+        db.close()
+
+    times.sort()
+    print("\n" + "=" * 64)
+    print(f"🧭 BÚSQUEDA TOP-{k} ({rows} vectores x {dims}, {dtype}, {size_mb:.0f} MB)")
+    print("=" * 64)
+    print(f"Construcción: {build:.1f}s")
+    print(f"Búsqueda: p50 {times[len(times) // 2] * 1000:.1f} ms · "
+          f"p95 {times[int(len(times) * 0.95)] * 1000:.1f} ms ({queries} consultas)")
+    print("=" * 64 + "\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Índice semántico del contexto RAG")
+    parser.add_argument("--db", default=DATABASE_PATH, help="base de datos de JARVIS")
+    parser.add_argument("--rebuild", action="store_true", help="borrar los vectores existentes")
+    parser.add_argument("--backfill", action="store_true", help="convertir los contextos pendientes")
+    parser.add_argument("--search", help="consulta de prueba (búsqueda semántica y combinada)")
+    parser.add_argument("--fake-embeddings", action="store_true",
+                        help="embeddings de trigramas en lugar de Ollama (pruebas)")
+    parser.add_argument("--bench", type=int, metavar="N", help="medir la búsqueda con N vectores aleatorios")
+    parser.add_argument("--dims", type=int, default=768, help="dimensión de los vectores (--bench)")
+    parser.add_argument("--dtype", choices=("float32", "float16"), default="float32")
+    parser.add_argument("--k", type=int, default=SEARCH_CANDIDATES, help="resultados por búsqueda")
+    parser.add_argument("--queries", type=int, default=20, help="consultas medidas (--bench)")
+    args = parser.parse_args()
+
+    if args.bench:
+        bench(args.bench, args.dims, args.dtype, args.k, args.queries)
+        return
+
+    db = DatabaseManager(db_path=args.db)
+    embedder = (lambda texts: [fake_embedding(t) for t in texts]) if args.fake_embeddings else None
+    store = VectorStore(db, embedder=embedder, dtype=args.dtype, model="fake" if embedder else None,
+                        start=False)
+    try:
+        if args.rebuild:
+            store.rebuild()
+            print(f"🗑️ Vectores borrados: {store.path}")
+
+        if args.backfill:
+            start = time.perf_counter()
+            added = store.backfill(progress=lambda rows: print(f"   {rows} vectores", end="\r"))
+            elapsed = time.perf_counter() - start
+            print(f"\r✅ {added} contextos convertidos en {elapsed:.1f}s "
+                  f"({store.rows} vectores, {store.dimensions} dimensiones)")
+
+        if args.search:
+            db.vector_store = store
+            print(f"\n🔍 Semántica: '{args.search}'")
+            for context_id, similarity in store.search(args.search, k=5):
+                print(f"   {similarity:.3f}  contexto {context_id}")
+            print("\n🔍 Combinada (search_context):")
+            for context in db.search_context(args.search, limit=5):
+                similarity = context.get('similarity')
+                print(f"   {context['score']:.4f}  "
+                      f"{'sem ' + format(similarity, '.2f') if similarity else 'léxico  '}  "
+                      f"{context['content'][:60]!r}")
+    finally:
+        store.close()
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -2,46 +2,131 @@
 Asistente de Voz JARVIS - Versión Modular con Logging y Base de Datos
 Punto de entrada principal del programa
 """
+import asyncio
 import time
+from concurrent.futures import ThreadPoolExecutor
 from modules import (
     AudioRecorder,
     SpeechToText,
     TextToSpeech,
+    SpeechQueue,
     AIEngine,
     CommandExecutor,
     JarvisLogger,
-    DatabaseManager
+    DatabaseManager,
+    SpeculativeGenerator,
+    DeadlineResponder,
+    PersistenceWriter,
+    VectorStore,
+    ReminderScheduler,
+    AsyncPipeline
+)
+from modules.tracing import span, start_turn, current_trace
+from modules.time_parser import parse_reminder, format_time
+from modules.text_utils import extract_keywords
+from config import (
+    ENABLE_SPECULATION, SPECULATION_PARTIAL_INTERVAL, ENABLE_MEMORY_RESTORE,
+    ENABLE_BACKGROUND_PERSISTENCE, ENABLE_ASYNC_PIPELINE,
+    ENABLE_CONCURRENT_RETRIEVAL, RETRIEVAL_WORKERS, ENABLE_RESPONSE_DEADLINE,
+    ENABLE_REMINDER_SCHEDULER, ENABLE_VECTOR_SEARCH, CONTEXT_MAX_KEYWORDS
+)
+
+
+# Expresiones con las que el usuario alude a conversaciones anteriores
+PAST_REFERENCE_MARKERS = (
+    'recuerdas', 'te acuerdas', 'la otra vez', 'antes me dijiste',
+    'antes dijiste', 'hablamos de', 'te conté', 'te dije'
 )
 
 
 class JarvisAssistant:
     """Clase principal que orquesta todos los módulos"""
     
-    def __init__(self):
-        """Inicializa todos los módulos del asistente"""
+    def __init__(self, logger=None, db=None, audio_recorder=None,
+                 speech_to_text=None, text_to_speech=None, ai_engine=None,
+                 command_executor=None):
+        """
+        Inicializa todos los módulos del asistente.
+        
+        Cualquier módulo puede inyectarse ya construido (benchmarks, pruebas
+        con Ollama simulado); los que no se pasan se crean con la
+        configuración por defecto.
+        """
         print("=" * 60)
         print("🤖 JARVIS - Asistente de Voz Inteligente")
         print("=" * 60 + "\n")
         
         # Inicializar sistema de logging PRIMERO
-        self.logger = JarvisLogger()
+        self.logger = logger or JarvisLogger()
         self.logger.log_session_start()
         
         # Inicializar base de datos
-        self.db = DatabaseManager(logger=self.logger)
+        self.db = db or DatabaseManager(logger=self.logger)
         self.session_id = self.db.create_session()
         
+        # Escrituras de cada turno en un hilo aparte (una transacción por lote)
+        self.persistence = None
+        if ENABLE_BACKGROUND_PERSISTENCE:
+            self.persistence = PersistenceWriter(self.db, logger=self.logger)
+        
+        # Búsqueda de contexto RAG en paralelo con el reconocimiento de comandos
+        self.retrieval_pool = None
+        if ENABLE_CONCURRENT_RETRIEVAL:
+            self.retrieval_pool = ThreadPoolExecutor(
+                max_workers=RETRIEVAL_WORKERS, thread_name_prefix="rag"
+            )
+        
         # Inicializar módulos con logger
         try:
-            self.audio_recorder = AudioRecorder(logger=self.logger)
-            self.speech_to_text = SpeechToText(logger=self.logger)
-            self.text_to_speech = TextToSpeech(logger=self.logger)
-            self.ai_engine = AIEngine(logger=self.logger)
-            self.command_executor = CommandExecutor(logger=self.logger)
+            self.audio_recorder = audio_recorder or AudioRecorder(logger=self.logger)
+            self.speech_to_text = speech_to_text or SpeechToText(logger=self.logger)
+            self.text_to_speech = text_to_speech or TextToSpeech(logger=self.logger)
+            self.ai_engine = ai_engine or AIEngine(logger=self.logger)
+            self.command_executor = command_executor or CommandExecutor(logger=self.logger, db=self.db)
+            
+            # Embeddings del contexto en segundo plano: search_context busca también por significado
+            self.vector_store = None
+            if ENABLE_VECTOR_SEARCH and self.db.db_path != ":memory:":
+                self.vector_store = VectorStore(
+                    self.db, client=self.ai_engine.client, logger=self.logger
+                )
+                self.db.vector_store = self.vector_store
+            
+            # Toda la voz (respuestas y avisos) pasa por una única cola
+            self.speech = SpeechQueue(self.text_to_speech)
+            
+            # Recordatorios con hora: se avisan por voz al vencer
+            self.reminders = None
+            if ENABLE_REMINDER_SCHEDULER:
+                self.reminders = ReminderScheduler(
+                    self.db, announce=self.speech.announce, logger=self.logger
+                )
+            
+            # Generación especulativa sobre transcripciones parciales
+            self.speculator = None
+            if ENABLE_SPECULATION:
+                self.speculator = SpeculativeGenerator(
+                    self.speech_to_text,
+                    self.ai_engine,
+                    command_executor=self.command_executor,
+                    context_provider=self._retrieve_context,
+                    logger=self.logger
+                )
+            
+            # Presupuesto de latencia por turno con respuesta degradada
+            self.responder = None
+            if ENABLE_RESPONSE_DEADLINE:
+                self.responder = DeadlineResponder(
+                    self.ai_engine, self.speech, db=self.db, logger=self.logger
+                )
             
             # Cargar preferencias del usuario desde BD
             self._load_user_preferences()
             
+            # Recuperar los últimos turnos de sesiones anteriores (acotado)
+            if ENABLE_MEMORY_RESTORE:
+                self.ai_engine.restore_memory(self.db)
+            
             print("=" * 60)
             print("✅ Todos los módulos cargados correctamente")
             print("=" * 60 + "\n")
@@ -76,42 +161,120 @@ class JarvisAssistant:
             self.db.set_preference('favorite_topics', ['general'], 'json')
             print("📋 Preferencias iniciales configuradas\n")
     
-    def process_user_input(self, user_text: str) -> tuple:
+    def process_user_input(self, user_text: str, context_future=None) -> tuple:
         """
         Procesa el texto del usuario: primero busca comandos, 
         si no encuentra, responde con IA
         
         Args:
             user_text (str): Texto transcrito del usuario
+            context_future (Future): Búsqueda RAG ya lanzada con
+                prefetch_context (si es None se lanza aquí)
             
         Returns:
             tuple: (respuesta, tipo) donde tipo es 'command' o 'ai'
         """
+        turn_started = time.perf_counter()  # Referencia del plazo de respuesta
+        if self.responder:
+            self.responder.last_result = None
+        
+        # Buscar contexto y precalentar Ollama mientras se buscan comandos
+        if context_future is None:
+            context_future = self.prefetch_context(user_text)
+        
         # Intentar ejecutar comando del sistema
-        command_response = self.command_executor.execute(user_text)
+        with span("command_match"):
+            command_response = self.command_executor.execute(user_text)
         
         if command_response:
             print(f"⚙️ Comando ejecutado: {command_response}")
             self.command_count += 1
+            if self.speculator:
+                self.speculator.discard()
+            if context_future:
+                context_future.cancel()  # Gana el comando: el contexto se descarta
             return command_response, "command"
         
-        # Si no es comando, buscar contexto relevante en BD (RAG simple)
-        relevant_context = self.db.search_context(user_text, limit=3)
+        # Cargar memoria más antigua solo si el usuario alude al pasado
+        text_lower = user_text.lower()
+        if any(marker in text_lower for marker in PAST_REFERENCE_MARKERS):
+            with span("load_memory"):
+                self.ai_engine.load_older_memory()
+        
+        # Reutilizar la respuesta especulativa si la transcripción final coincide
+        speculative = None
+        if self.speculator:
+            with span("speculation"):
+                speculative = self.speculator.resolve(user_text)
+        if speculative:
+            if context_future:
+                context_future.cancel()
+            ai_response = self.ai_engine.commit_response(speculative, user_message=user_text)
+            self.ai_response_count += 1
+            return ai_response, "ai"
         
-        # Agregar contexto a la consulta si es relevante
-        if relevant_context:
-            context_info = "\n".join([ctx['content'] for ctx in relevant_context])
-            enhanced_input = f"Contexto relevante de conversaciones previas:\n{context_info}\n\nPregunta actual: {user_text}"
-            print(f"🔍 Usando contexto de conversaciones previas...")
+        # Si no es comando, buscar contexto relevante en BD (RAG simple)
+        if context_future:
+            with span("wait_context"):  # Solo lo que falte de la búsqueda ya lanzada
+                context_info = context_future.result()
         else:
-            enhanced_input = user_text
+            with span("search_context"):
+                context_info = self._retrieve_context(user_text)
         
-        # Responder con IA
-        ai_response = self.ai_engine.generate_response(enhanced_input)
+        # Responder con IA (el motor elige el modelo según la consulta)
+        with span("generate_response"):
+            if self.responder:
+                ai_response = self.responder.respond(user_text, context=context_info,
+                                                     started=turn_started)
+            else:
+                ai_response = self.ai_engine.generate_response(user_text, context=context_info)
         self.ai_response_count += 1
         
         return ai_response, "ai"
     
+    def prefetch_context(self, user_text: str):
+        """
+        Lanza en segundo plano la búsqueda RAG de un turno y precalienta
+        Ollama, sin esperar a saber si el texto es un comando
+        
+        Args:
+            user_text: Texto transcrito del usuario
+            
+        Returns:
+            Future or None: Contexto (str o None) cuando termine la búsqueda;
+            None si la búsqueda concurrente está desactivada
+        """
+        if not self.retrieval_pool or not user_text or not user_text.strip():
+            return None
+        
+        self.ai_engine.prime(user_text)
+        return self.retrieval_pool.submit(self._retrieve_traced, user_text, current_trace())
+    
+    def _retrieve_traced(self, user_text: str, trace):
+        """_retrieve_context medido en la traza del turno (el hilo no la hereda)"""
+        if trace is None:
+            return self._retrieve_context(user_text)
+        with trace.span("search_context"):
+            return self._retrieve_context(user_text)
+    
+    def _retrieve_context(self, user_text: str):
+        """
+        Busca contexto relevante en la BD para la consulta (RAG simple)
+        
+        Args:
+            user_text: Texto del usuario
+            
+        Returns:
+            str or None: Contexto concatenado, o None si no hay nada relevante
+        """
+        relevant_context = self.db.search_context(user_text, limit=3)
+        
+        if not relevant_context:
+            return None
+        
+        print(f"🔍 Usando contexto de conversaciones previas...")
+        return "\n".join([ctx['content'] for ctx in relevant_context])
+    
     def run(self):
         """Bucle principal del asistente"""
         print("\n🎤 Presiona y mantén '|' para hablar con JARVIS")
@@ -121,74 +284,151 @@ class JarvisAssistant:
         self._check_reminders()
         
         try:
-            while True:
-                interaction_start = time.time()
-                
-                try:
-                    # 1. Grabar audio
-                    audio_file = self.audio_recorder.record_while_pressed()
-                    
-                    # 2. Transcribir a texto
-                    user_text = self.speech_to_text.transcribe(audio_file)
-                    
-                    # 3. Procesar y generar respuesta
-                    response, response_type = self.process_user_input(user_text)
-                    
-                    # 4. Reproducir respuesta por voz
-                    self.text_to_speech.speak(response)
-                    
-                    # 5. Guardar interacción en BD
-                    interaction_duration = time.time() - interaction_start
-                    self.interaction_count += 1
-                    
-                    model_used = self.ai_engine.model_name if response_type == 'ai' else None
-                    
-                    interaction_id = self.db.save_interaction(
-                        session_id=self.session_id,
-                        user_input=user_text,
-                        response=response,
-                        response_type=response_type,
-                        duration=interaction_duration,
-                        model_used=model_used
-                    )
-                    
-                    # Guardar contexto para RAG (solo respuestas de IA importantes)
-                    if response_type == 'ai' and len(user_text) > 20:
-                        keywords = self._extract_keywords(user_text)
-                        self.db.save_context(
-                            interaction_id=interaction_id,
-                            content=f"Usuario: {user_text}\nAsistente: {response}",
-                            keywords=keywords,
-                            importance=0.7 if len(response) > 100 else 0.5
-                        )
-                    
-                    # Registrar en logger
-                    self.logger.log_interaction(
-                        user_text, 
-                        response, 
-                        response_type, 
-                        interaction_duration
-                    )
-                    
-                    # Detectar si el usuario está creando un recordatorio
-                    self._detect_reminder(user_text)
-                    
-                except Exception as e:
-                    error_msg = f"Error en interacción: {str(e)}"
-                    print(f"❌ {error_msg}")
-                    self.logger.log_error("InteractionError", str(e), module="run_loop")
-                    self.db.log_error("InteractionError", str(e), module="run_loop")
-                    continue
-                
+            while self.run_turn():
                 # Pequeña pausa antes de la siguiente interacción
                 print("\n" + "-" * 60)
                 print("Listo para la siguiente interacción...")
                 print("-" * 60 + "\n")
                 time.sleep(0.5)
+            self._shutdown()  # Entrada agotada (grabadores sin hardware)
         
         except KeyboardInterrupt:
             self._shutdown()
     
+    def run_turn(self):
+        """
+        Ejecuta una interacción completa: grabar, transcribir, responder,
+        hablar y encolar la persistencia
+        
+        Returns:
+            bool: False si el grabador ya no tiene más entrada (devuelve None)
+        """
+        interaction_start = time.time()
+        trace = start_turn()  # Duración de cada etapa del turno
+        
+        try:
+            # 1. Grabar audio (con transcripciones parciales si se especula)
+            with span("record"):
+                if self.speculator:
+                    self.speculator.begin_turn()
+                    audio_file = self.audio_recorder.record_while_pressed(
+                        on_partial_audio=self.speculator.on_partial_audio,
+                        partial_interval=SPECULATION_PARTIAL_INTERVAL
+                    )
+                    self.speculator.end_recording()
+                else:
+                    audio_file = self.audio_recorder.record_while_pressed()
+            
+            if audio_file is None:
+                return False
+            
+            # 2. Transcribir a texto
+            with span("transcribe"):
+                user_text = self.speech_to_text.transcribe(audio_file)
+            
+            # 3. Procesar y generar respuesta
+            response, response_type = self.process_user_input(user_text)
+            
+            # 4. Reproducir respuesta por voz (salvo si ya se dijo en streaming)
+            deadline = self.responder.last_result if self.responder else None
+            if not (deadline and deadline.get('spoken')):
+                with span("speak"):
+                    self.speech.speak(response)
+            
+            # 5. Guardar interacción, contexto y registros (en segundo plano)
+            interaction_duration = time.time() - interaction_start
+            self.interaction_count += 1
+            
+            model_used = self.ai_engine.last_model_used if response_type == 'ai' else None
+            command_jobs = self.command_executor.take_turn_jobs()
+            
+            turn = (user_text, response, response_type, interaction_duration,
+                    model_used, command_jobs, trace, deadline)
+            if self.persistence:
+                self.persistence.submit(self._persist_turn, *turn)
+            else:
+                # Un solo commit por interacción (o nada si falla a medias)
+                with self.db.transaction():
+                    self._persist_turn(*turn)
+        
+        except Exception as e:
+            error_msg = f"Error en interacción: {str(e)}"
+            print(f"❌ {error_msg}")
+            self.logger.log_error("InteractionError", str(e), module="run_loop")
+            self.db.log_error("InteractionError", str(e), module="run_loop")
+        
+        return True
+    
+    def run_async(self):
+        """
+        Bucle principal con etapas solapadas (ver AsyncPipeline).
+        
+        La generación especulativa no se usa en este modo: la grabación del
+        turno siguiente puede empezar antes de resolver el actual.
+        """
+        print("\n🎤 Presiona y mantén '|' para hablar con JARVIS (pipeline asíncrono)")
+        print("⌨️  Presiona Ctrl+C para salir\n")
+        
+        self._check_reminders()
+        
+        pipeline = AsyncPipeline(self)
+        try:
+            asyncio.run(pipeline.run())
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self._shutdown()
+    
+    def _persist_turn(self, user_text, response, response_type, duration,
+                      model_used, command_jobs, trace=None, deadline=None):
+        """
+        Guarda todo lo relativo a un turno sin confirmar la transacción
+        (la confirma el escritor de persistencia junto con el resto del lote)
+        """
+        persist_start = time.perf_counter()
+        
+        interaction_id = self.db.save_interaction(
+            session_id=self.session_id,
+            user_input=user_text,
+            response=response,
+            response_type=response_type,
+            duration=duration,
+            model_used=model_used,
+            commit=False
+        )
+        
+        # Resultado real de los comandos lanzados en este turno
+        if command_jobs:
+            self.command_executor.bind_interaction(interaction_id, command_jobs)
+        
+        # Guardar contexto para RAG (solo respuestas de IA importantes)
+        if response_type == 'ai' and len(user_text) > 20:
+            keywords = self._extract_keywords(user_text)
+            self.db.save_context(
+                interaction_id=interaction_id,
+                content=f"Usuario: {user_text}\nAsistente: {response}",
+                keywords=keywords,
+                importance=0.7 if len(response) > 100 else 0.5,
+                commit=False
+            )
+        
+        # Cumplimiento del plazo de respuesta (turnos de IA)
+        if deadline is not None:
+            self.db.save_deadline(interaction_id, deadline, commit=False)
+        
+        # Registrar en logger
+        self.logger.log_interaction(user_text, response, response_type, duration)
+        
+        # Detectar si el usuario está creando un recordatorio
+        self._detect_reminder(user_text)
+        
+        # Etapas medidas del turno, incluida esta persistencia
+        if trace is not None:
+            trace.spans.append((
+                "persist", persist_start - trace.started, time.perf_counter() - persist_start
+            ))
+            self.db.save_spans(interaction_id, trace.spans, commit=False)
+    
     def _check_reminders(self):
         """Verifica y muestra recordatorios pendientes"""
         reminders = self.db.get_pending_reminders()
@@ -200,6 +440,10 @@ class JarvisAssistant:
                 scheduled = reminder['scheduled_time']
                 print(f"  • {task}" + (f" - Programado: {scheduled}" if scheduled else ""))
             print()
+        
+        # Los que tienen hora se avisarán por voz al vencer (los vencidos, ya)
+        if self.reminders:
+            self.reminders.start()
     
     def _detect_reminder(self, user_text: str):
         """
@@ -213,14 +457,28 @@ class JarvisAssistant:
         reminder_keywords = ['recuérdame', 'recordatorio', 'no olvides', 'tengo que']
         
         if any(keyword in text_lower for keyword in reminder_keywords):
-            # Extraer la tarea (simplificado)
-            task = user_text
-            self.db.create_reminder(task, priority=1)
-            print("📝 Recordatorio guardado en la base de datos")
+            # Separar la tarea de la expresión temporal ("mañana a las 8"...)
+            try:
+                task, when = parse_reminder(user_text)
+            except Exception as e:
+                # Un fallo del intérprete no debe deshacer el resto del turno
+                self.logger.log_error("ReminderParseError", str(e), module="JarvisAssistant")
+                task, when = user_text, None
+            scheduled_time = format_time(when) if when else None
+            reminder_id = self.db.create_reminder(
+                task, scheduled_time=scheduled_time, priority=1, commit=False
+            )
+            
+            # Se avisa solo si la fila llega a confirmarse (el lote puede deshacerse)
+            if when and self.reminders:
+                self.db.after_commit(lambda: self.reminders.add(reminder_id, task, when))
+            print("📝 Recordatorio guardado en la base de datos" +
+                  (f" para {scheduled_time}" if when else ""))
     
     def _extract_keywords(self, text: str) -> list:
         """
-        Extrae palabras clave del texto (versión simple)
+        Extrae palabras clave del texto: raíces sin acentos, palabras vacías
+        ni repeticiones (las que indexa context_keywords)
         
         Args:
             text: Texto a analizar
@@ -228,15 +486,7 @@ class JarvisAssistant:
         Returns:
             Lista de palabras clave
         """
-        # Palabras comunes a ignorar
-        stopwords = {'el', 'la', 'de', 'que', 'y', 'a', 'en', 'un', 'ser', 'se', 
-                     'no', 'haber', 'por', 'con', 'su', 'para', 'como', 'estar', 
-                     'tener', 'le', 'lo', 'todo', 'pero', 'más', 'hacer', 'o', 'poder'}
-        
-        words = text.lower().split()
-        keywords = [w for w in words if len(w) > 4 and w not in stopwords]
-        
-        return keywords[:5]  # Máximo 5 keywords
+        return extract_keywords(text, limit=CONTEXT_MAX_KEYWORDS)
     
     def _shutdown(self):
         """Procedimiento de cierre limpio"""
@@ -244,6 +494,21 @@ class JarvisAssistant:
         print("👋 Cerrando JARVIS...")
         print("=" * 60)
         
+        # Dejar de avisar recordatorios y terminar de hablar
+        if self.reminders:
+            self.reminders.stop()
+        self.speech.close()
+        
+        # Confirmar las escrituras pendientes antes de cerrar la sesión
+        if self.persistence:
+            self.persistence.close()
+            self.logger.main_logger.info(f"💾 Persistencia en segundo plano: {self.persistence.stats}")
+        
+        # Lo que quede sin embedding se convierte en el próximo arranque
+        if self.vector_store:
+            self.vector_store.close()
+            self.logger.main_logger.info(f"🧭 Búsqueda semántica: {self.vector_store.stats}")
+        
         # Finalizar sesión en BD
         stats = {
             'total_interactions': self.interaction_count,
@@ -253,6 +518,32 @@ class JarvisAssistant:
         }
         self.db.end_session(self.session_id, stats)
         
+        # Resumen de especulación para ajustar el umbral de estabilidad
+        if self.speculator:
+            spec_stats = self.speculator.get_stats()
+            self.speculator.shutdown()
+            print(
+                f"🎲 Especulación: {spec_stats['hits']}/{spec_stats['started']} aciertos "
+                f"({spec_stats['hit_rate']:.0%}), {spec_stats['overlap_seconds']:.1f}s ahorrados, "
+                f"{spec_stats['wasted_seconds']:.1f}s y {spec_stats['wasted_tokens']} tokens desperdiciados"
+            )
+            self.logger.main_logger.info(f"🎲 Estadísticas de especulación: {spec_stats}")
+        
+        # Cumplimiento del plazo de respuesta en esta sesión
+        if self.responder and self.responder.stats['turns']:
+            deadline_stats = self.responder.stats
+            print(
+                f"⏱️ Plazo de respuesta: {deadline_stats['misses']}/{deadline_stats['turns']} "
+                f"turnos fuera de plazo ({deadline_stats['cached']} de caché, "
+                f"{deadline_stats['small_model']} con modelo pequeño)"
+            )
+            self.logger.main_logger.info(f"⏱️ Plazo de respuesta: {deadline_stats}")
+        
+        # Dejar de aceptar comandos (las acciones colgadas no bloquean el cierre)
+        self.command_executor.close()
+        if self.retrieval_pool:
+            self.retrieval_pool.shutdown(wait=True, cancel_futures=True)
+        
         # Crear backup si es necesario
         backup_path = self.db.backup_database()
         print(f"💾 Backup creado: {backup_path}")
@@ -260,6 +551,9 @@ class JarvisAssistant:
         # Cerrar conexión a BD
         self.db.close()
         
+        # Cerrar conexiones HTTP con Ollama
+        self.ai_engine.close()
+        
         # Finalizar logging
         self.logger.log_session_end(self.interaction_count)
         self.logger.print_session_summary()
@@ -271,7 +565,10 @@ def main():
     """Función principal de entrada"""
     try:
         assistant = JarvisAssistant()
-        assistant.run()
+        if ENABLE_ASYNC_PIPELINE:
+            assistant.run_async()
+        else:
+            assistant.run()
     except Exception as e:
         print(f"\n❌ Error crítico al iniciar JARVIS: {str(e)}")
         print("Por favor, verifica que todas las dependencias estén instaladas.")
@@ -3,20 +3,62 @@ Paquete de módulos del asistente JARVIS
 """
 from .audio_handler import AudioRecorder
 from .speech_to_text import SpeechToText
-from .text_to_speech import TextToSpeech
+from .stt_workers import ForkedSpeechToText
+from .text_to_speech import TextToSpeech, SpeechQueue
+from .ollama_client import OllamaClient
+from .model_router import ModelRouter
 from .ai_engine import AIEngine
+from .command_matcher import CommandMatcher
+from .fuzzy_matcher import FuzzyCommandMatcher
+from .intent_classifier import IntentClassifier
+from .command_worker import CommandWorkerPool
 from .command_executor import CommandExecutor
+from .speculation import SpeculativeGenerator
+from .response_deadline import DeadlineResponder
 from .logger import JarvisLogger
 from .database_manager import DatabaseManager
+from .persistence_writer import PersistenceWriter
+from .vector_store import VectorStore
+from .reminder_scheduler import ReminderScheduler
+from .pipeline import AsyncPipeline
+from .session_server import SessionManager, SpeechToTextPool, JarvisServer, ServerError
+from .headless import (
+    TextScriptRecorder, WavDirectoryRecorder, PassthroughSpeechToText,
+    FixtureSpeechToText, NullTextToSpeech, FileTextToSpeech
+)
 
 __all__ = [
     'AudioRecorder',
     'SpeechToText',
+    'ForkedSpeechToText',
     'TextToSpeech',
+    'SpeechQueue',
+    'OllamaClient',
+    'ModelRouter',
     'AIEngine',
+    'CommandMatcher',
+    'FuzzyCommandMatcher',
+    'IntentClassifier',
+    'CommandWorkerPool',
     'CommandExecutor',
+    'SpeculativeGenerator',
+    'DeadlineResponder',
     'JarvisLogger',
-    'DatabaseManager'
+    'DatabaseManager',
+    'PersistenceWriter',
+    'VectorStore',
+    'ReminderScheduler',
+    'AsyncPipeline',
+    'SessionManager',
+    'SpeechToTextPool',
+    'JarvisServer',
+    'ServerError',
+    'TextScriptRecorder',
+    'WavDirectoryRecorder',
+    'PassthroughSpeechToText',
+    'FixtureSpeechToText',
+    'NullTextToSpeech',
+    'FileTextToSpeech'
 ]
 
 __version__ = '1.0.0'
\ No newline at end of file
@@ -1,14 +1,22 @@
 """
 Módulo para interacción con modelos de lenguaje (Ollama)
 """
-from ollama import chat, ChatResponse
-from config import OLLAMA_MODEL, ASSISTANT_ROLE
+import time
+from ollama import ResponseError
+from config import (
+    OLLAMA_MODEL, ASSISTANT_ROLE, OLLAMA_WARMUP,
+    ENABLE_MODEL_ROUTING, OLLAMA_MODEL_TIERS,
+    MEMORY_RESTORE_TURNS, MEMORY_TOKEN_BUDGET, MEMORY_LOAD_MORE_TURNS
+)
+from .ollama_client import OllamaClient
+from .model_router import ModelRouter
 
 
 class AIEngine:
     """Clase para gestionar conversaciones con IA"""
     
-    def __init__(self, model_name=None, system_role=None, logger=None):
+    def __init__(self, model_name=None, system_role=None, logger=None,
+                 client=None, warmup=None, routing=None):
         """
         Inicializa el motor de IA con memoria conversacional
         
@@ -16,61 +24,385 @@ class AIEngine:
             model_name (str): Nombre del modelo de Ollama
             system_role (str): Instrucciones del sistema para el asistente
             logger: Logger opcional
+            client (OllamaClient): Cliente compartido (se crea uno si es None)
+            warmup (bool): Precargar el modelo en segundo plano
+            routing (bool): Elegir modelo pequeño/grande por consulta
         """
         self.model_name = model_name or OLLAMA_MODEL
         self.system_role = system_role or ASSISTANT_ROLE
         self.logger = logger
         
+        # Cliente HTTP persistente (propio o compartido)
+        self._owns_client = client is None
+        self.client = client or OllamaClient(logger=logger)
+        
+        # Enrutador de modelos: el nivel 'large' es siempre model_name
+        use_routing = ENABLE_MODEL_ROUTING if routing is None else routing
+        self.router = None
+        if use_routing:
+            self.router = ModelRouter(
+                tiers={**OLLAMA_MODEL_TIERS, "large": self.model_name},
+                logger=logger
+            )
+        
+        # Modelo que generó la última respuesta (para model_used en BD)
+        self.last_model_used = None
+        
         # Historial conversacional
         self.history = [
             {"role": "system", "content": self.system_role}
         ]
         
+        # Memoria restaurada desde la BD (paginación hacia el pasado)
+        self.memory_db = None
+        self._oldest_restored_id = None
+        self._memory_exhausted = False
+        
+        # Cargar el modelo en Ollama antes de la primera pregunta
+        should_warmup = OLLAMA_WARMUP if warmup is None else warmup
+        if should_warmup:
+            for model in self._active_models():
+                self.client.warmup(model)
+        
         print(f"🤖 Motor IA inicializado con modelo: {self.model_name}\n")
     
-    def generate_response(self, user_message):
+    def generate_response(self, user_message, context=None):
         """
         Genera respuesta del asistente manteniendo contexto
         
         Args:
             user_message (str): Mensaje del usuario
+            context (str): Contexto relevante de conversaciones previas (RAG)
             
         Returns:
             str: Respuesta del asistente
         """
-        import time
+        print("🤖 Generando respuesta con IA...\n")
+        
+        result = self.generate_detached(user_message, context=context)
+        return self.commit_response(result)
+    
+    def generate_detached(self, user_message, context=None,
+                          cancel_event=None, dry_run=False, model=None, on_text=None):
+        """
+        Genera una respuesta sin modificar el historial.
         
-        # Agregar mensaje del usuario al historial
-        self.history.append({"role": "user", "content": user_message})
+        La respuesta se recibe en streaming para poder abortarla en cuanto
+        se activa `cancel_event` (Ollama deja de generar al cerrar la conexión).
         
-        print("🤖 Generando respuesta con IA...\n")
+        Si el modelo elegido no está descargado en Ollama (404) y no es el
+        principal, se responde con el principal y el enrutador deja de
+        proponerlo.
+        
+        Args:
+            user_message (str): Mensaje del usuario
+            context (str): Contexto RAG opcional
+            cancel_event (threading.Event): Señal de cancelación opcional
+            dry_run (bool): No actualizar el estado del enrutador
+            model (str): Modelo a usar sin consultar al enrutador
+            on_text (callable): Recibe cada fragmento de texto según llega
+            
+        Returns:
+            dict: Resultado con 'response', 'model', 'response_time',
+                  'eval_count' y 'cancelled'
+        """
+        model = model or self._route(user_message, has_context=bool(context), dry_run=dry_run)
+        prompt = self.build_prompt(user_message, context)
+        messages = list(self.history) + [{"role": "user", "content": prompt}]
         
         start_time = time.time()
-        # Obtener respuesta del modelo
-        response: ChatResponse = chat(
-            model=self.model_name,
-            messages=self.history
-        )
-        response_time = time.time() - start_time
+        parts = []
+        eval_count = 0
+        cancelled = False
+        
+        try:
+            stream = self._open_stream(model, messages)
+        except ResponseError as e:
+            if e.status_code != 404 or model == self.model_name:
+                raise
+            self._model_unavailable(model, e)
+            model = self.model_name
+            stream = self._open_stream(model, messages)
+        
+        try:
+            for chunk in stream:
+                if cancel_event is not None and cancel_event.is_set():
+                    cancelled = True
+                    break
+                
+                parts.append(chunk.message.content or "")
+                # Ollama envía aproximadamente un token por fragmento
+                eval_count = chunk.eval_count or len(parts)
+                if on_text is not None:
+                    on_text(parts[-1])
+        finally:
+            stream.close()
+        
+        return {
+            "user_message": user_message,
+            "context": context,
+            "response": "".join(parts).strip(),
+            "model": model,
+            "response_time": time.time() - start_time,
+            "eval_count": eval_count,
+            "cancelled": cancelled,
+            "dry_run": dry_run
+        }
+    
+    def _open_stream(self, model, messages):
+        """
+        Abre el stream y espera al primer fragmento, para que un error de
+        Ollama (modelo inexistente) salte aquí y no a mitad de respuesta
+        """
+        stream = self.client.chat_stream(model=model, messages=messages)
+        try:
+            first_chunk = next(stream, None)
+        except BaseException:
+            stream.close()
+            raise
+        
+        def chunks():
+            try:
+                if first_chunk is not None:
+                    yield first_chunk
+                    yield from stream
+            finally:
+                stream.close()
+        
+        return chunks()
+    
+    def _model_unavailable(self, model, error):
+        """Retira un modelo no descargado del enrutado (se usa el principal)"""
+        message = (f"Modelo '{model}' no disponible en Ollama ({error}); "
+                   f"se usa '{self.model_name}'")
+        print(f"⚠️ {message}")
+        if self.logger:
+            self.logger.main_logger.warning(f"⚠️ {message}")
+        if self.router:
+            self.router.mark_unavailable(model)
+    
+    def commit_response(self, result, user_message=None):
+        """
+        Incorpora al historial una respuesta generada con generate_detached
+        
+        Args:
+            result (dict): Resultado de generate_detached
+            user_message (str): Texto final del usuario (si difiere del
+                usado al generar, p. ej. en especulación)
+            
+        Returns:
+            str: Respuesta del asistente
+        """
+        user_message = user_message or result["user_message"]
+        assistant_message = result["response"]
+        model = result["model"]
+        
+        # Las generaciones especulativas aplican ahora su decisión de enrutado
+        if result.get("dry_run") and self.router:
+            self.router.route(result["user_message"], has_context=bool(result["context"]))
         
-        assistant_message = response.message.content.strip()
+        self.last_model_used = model
         
-        # Agregar respuesta al historial
+        # Agregar intercambio al historial
+        self.history.append({
+            "role": "user",
+            "content": self.build_prompt(user_message, result["context"])
+        })
         self.history.append({"role": "assistant", "content": assistant_message})
         
-        print(f"💬 Asistente: {assistant_message}\n")
+        print(f"💬 Asistente ({model}): {assistant_message}\n")
         
         if self.logger:
             # Log detallado con entrada del usuario
             self.logger.log_ai_response(
                 user_message, 
                 assistant_message, 
-                self.model_name, 
-                response_time
+                model, 
+                result["response_time"]
             )
         
         return assistant_message
     
+    def prime(self, user_message=None):
+        """
+        Precalienta en segundo plano los modelos que pueden responder a la
+        consulta (con y sin contexto RAG, que aún no se conoce)
+        
+        Returns:
+            threading.Thread or None: Hilo de precarga (si hacía falta)
+        """
+        if self.router and user_message:
+            models = [self._route(user_message, has_context=has_context, dry_run=True)
+                      for has_context in (False, True)]
+            models = list(dict.fromkeys(models))
+        else:
+            models = self._active_models()
+        
+        return self.client.prime(models)
+    
+    def select_model(self, user_message, has_context=False):
+        """
+        Elige el modelo que responderá a la consulta
+        
+        Args:
+            user_message (str): Texto original del usuario
+            has_context (bool): Si se adjunta contexto RAG
+            
+        Returns:
+            str: Nombre del modelo de Ollama
+        """
+        return self._route(user_message, has_context=has_context)
+    
+    def _route(self, user_message, has_context=False, dry_run=False):
+        """Consulta el enrutador (si está activo) y devuelve el modelo"""
+        if not self.router:
+            return self.model_name
+        
+        return self.router.route(
+            user_message, has_context=has_context, dry_run=dry_run
+        )["model"]
+    
+    @staticmethod
+    def build_prompt(user_message, context=None):
+        """
+        Construye el mensaje final combinando la pregunta y el contexto RAG
+        
+        Args:
+            user_message (str): Texto del usuario
+            context (str): Contexto recuperado (opcional)
+            
+        Returns:
+            str: Mensaje a enviar al modelo
+        """
+        if not context:
+            return user_message
+        
+        return f"Contexto relevante de conversaciones previas:\n{context}\n\nPregunta actual: {user_message}"
+    
+    def set_model_override(self, tier_or_model=None):
+        """
+        Fuerza un nivel ('small'/'large') o un modelo para todas las consultas
+        
+        Args:
+            tier_or_model (str): Nivel o modelo (None vuelve al enrutado automático)
+        """
+        if self.router:
+            self.router.set_override(tier_or_model)
+        elif tier_or_model:
+            self.change_model(tier_or_model)
+    
+    def _active_models(self):
+        """Devuelve los modelos que pueden responder (sin duplicados)"""
+        if not self.router:
+            return [self.model_name]
+        
+        return list(dict.fromkeys(self.router.tiers.values()))
+    
+    # === MEMORIA PERSISTENTE ===
+    
+    def restore_memory(self, db, max_turns=None, token_budget=None):
+        """
+        Recupera los últimos turnos guardados en la BD como historial.
+        
+        Hace una única consulta acotada por `max_turns`, por lo que el coste
+        de arranque no depende del tamaño de la base de datos. La memoria
+        más antigua se carga bajo demanda con load_older_memory().
+        
+        Args:
+            db (DatabaseManager): Base de datos con las interacciones
+            max_turns (int): Turnos máximos a recuperar
+            token_budget (int): Tokens aproximados máximos a incorporar
+            
+        Returns:
+            int: Número de turnos restaurados
+        """
+        self.memory_db = db
+        self._oldest_restored_id = None
+        self._memory_exhausted = False
+        
+        restored = self._load_memory_page(
+            max_turns or MEMORY_RESTORE_TURNS,
+            token_budget or MEMORY_TOKEN_BUDGET
+        )
+        
+        if restored:
+            print(f"🧠 Memoria restaurada: {restored} turnos de sesiones anteriores\n")
+        
+        return restored
+    
+    def load_older_memory(self, max_turns=None, token_budget=None):
+        """
+        Carga turnos anteriores a los ya restaurados (bajo demanda)
+        
+        Args:
+            max_turns (int): Turnos máximos a añadir
+            token_budget (int): Tokens aproximados máximos a añadir
+            
+        Returns:
+            int: Número de turnos añadidos (0 si no queda memoria)
+        """
+        if self.memory_db is None or self._memory_exhausted:
+            return 0
+        
+        loaded = self._load_memory_page(
+            max_turns or MEMORY_LOAD_MORE_TURNS,
+            token_budget or MEMORY_TOKEN_BUDGET
+        )
+        
+        if loaded:
+            print(f"🧠 Recuperados {loaded} turnos más antiguos de memoria")
+        
+        return loaded
+    
+    def _load_memory_page(self, max_turns, token_budget):
+        """Lee una página de turnos y la inserta tras el mensaje del sistema"""
+        rows = self.memory_db.get_recent_turns(
+            limit=max_turns, before_id=self._oldest_restored_id
+        )
+        
+        # Recorrer del más reciente al más antiguo hasta agotar el presupuesto
+        messages = []
+        used_tokens = 0
+        for row in rows:
+            turn_tokens = self.estimate_tokens(row['user_input']) + self.estimate_tokens(row['response'])
+            if messages and used_tokens + turn_tokens > token_budget:
+                break
+            
+            used_tokens += turn_tokens
+            self._oldest_restored_id = row['interaction_id']
+            messages[:0] = [
+                {"role": "user", "content": row['user_input']},
+                {"role": "assistant", "content": row['response']}
+            ]
+        
+        # No queda nada más antiguo si la página vino incompleta y cupo entera
+        if len(rows) < max_turns and len(messages) // 2 == len(rows):
+            self._memory_exhausted = True
+        
+        # La memoria va justo después del mensaje del sistema
+        insert_at = 1 if self.history and self.history[0]["role"] == "system" else 0
+        self.history[insert_at:insert_at] = messages
+        
+        if self.logger and messages:
+            self.logger.main_logger.info(
+                f"🧠 Memoria: {len(messages) // 2} turnos (~{used_tokens} tokens) cargados desde BD"
+            )
+        
+        return len(messages) // 2
+    
+    @staticmethod
+    def estimate_tokens(text):
+        """
+        Estima el número de tokens de un texto (aprox. 4 caracteres por token)
+        
+        Args:
+            text (str): Texto a medir
+            
+        Returns:
+            int: Tokens aproximados
+        """
+        return len(text) // 4 + 1
+    
     def clear_history(self, keep_system=True):
         """
         Limpia el historial conversacional
@@ -85,6 +417,10 @@ class AIEngine:
         else:
             self.history = []
         
+        # La memoria persistente vuelve a paginarse desde el turno más reciente
+        self._oldest_restored_id = None
+        self._memory_exhausted = False
+        
         print("🗑️ Historial conversacional limpiado.")
     
     def get_history(self):
@@ -113,7 +449,12 @@ class AIEngine:
             model_name (str): Nuevo modelo
         """
         self.model_name = model_name
+        if self.router:
+            self.router.tiers["large"] = model_name
         print(f"Modelo cambiado a: {model_name}")
+        
+        if OLLAMA_WARMUP:
+            self.client.warmup(model_name)
     
     def update_system_role(self, new_role):
         """
@@ -124,4 +465,9 @@ class AIEngine:
         """
         self.system_role = new_role
         self.history[0] = {"role": "system", "content": new_role}
-        print("✅ Rol del asistente actualizado.")
\ No newline at end of file
+        print("✅ Rol del asistente actualizado.")
+    
+    def close(self):
+        """Libera las conexiones del cliente de Ollama si son propias"""
+        if self._owns_client:
+            self.client.close()
\ No newline at end of file
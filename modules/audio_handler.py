@@ -1,10 +1,9 @@
 """
 Módulo para captura y manejo de audio
 """
-import sounddevice as sd
+import time
 from scipy.io.wavfile import write
 import numpy as np
-import keyboard
 from config import (
     SAMPLERATE, AUDIO_CHANNELS, AUDIO_DTYPE, 
     CHUNK_SIZE, RECORDING_KEY, TEMP_AUDIO_FILE
@@ -23,13 +22,26 @@ class AudioRecorder:
         self.output_file = TEMP_AUDIO_FILE
         self.logger = logger  # Logger opcional
     
-    def record_while_pressed(self):
+    def record_while_pressed(self, on_partial_audio=None, partial_interval=1.0,
+                             output_file=None):
         """
         Graba audio mientras se mantiene presionada la tecla configurada.
         
+        Args:
+            on_partial_audio (callable): Recibe el audio acumulado (np.ndarray)
+                cada `partial_interval` segundos mientras se graba
+            partial_interval (float): Segundos entre entregas parciales
+            output_file (str): Ruta del WAV (por defecto TEMP_AUDIO_FILE); el
+                pipeline asíncrono usa una por turno en vuelo
+        
         Returns:
             str: Ruta del archivo de audio guardado
         """
+        # Importación diferida: sin micrófono ni teclado (servidores) el resto
+        # del paquete sigue siendo importable
+        import keyboard
+        import sounddevice as sd
+        
         print(f"Mantén presionada la tecla [{self.recording_key}] para grabar...")
         keyboard.wait(self.recording_key)
         
@@ -41,18 +53,25 @@ class AudioRecorder:
             channels=self.channels,
             dtype=self.dtype
         ) as stream:
+            last_partial = time.time()
             while keyboard.is_pressed(self.recording_key):
                 data, _ = stream.read(self.chunk_size)
                 audio_frames.append(data)
+                
+                # Entregar el audio acumulado para transcripción parcial
+                if on_partial_audio and time.time() - last_partial >= partial_interval:
+                    on_partial_audio(np.concatenate(audio_frames, axis=0))
+                    last_partial = time.time()
         
         print("🛑 Grabación detenida.")
         
         # Concatenar y guardar
+        output_file = output_file or self.output_file
         audio_np = np.concatenate(audio_frames, axis=0)
-        write(self.output_file, self.samplerate, audio_np)
+        write(output_file, self.samplerate, audio_np)
         
-        print(f"✅ Audio guardado como: {self.output_file}")
-        return self.output_file
+        print(f"✅ Audio guardado como: {output_file}")
+        return output_file
     
     def set_recording_key(self, key):
         """Permite cambiar la tecla de grabación dinámicamente"""
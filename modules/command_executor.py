@@ -1,29 +1,83 @@
 """
 Módulo para ejecutar comandos del sistema
 """
+import json
 import os
+import subprocess
+import threading
 import webbrowser
 import time
-from config import SYSTEM_COMMANDS
+from config import (
+    SYSTEM_COMMANDS, ENABLE_FUZZY_COMMANDS, FUZZY_EXCLUDED_ACTIONS,
+    ENABLE_INTENT_CLASSIFIER, INTENT_MAX_WORDS, COMMAND_INTENT_EXAMPLES,
+    COMMAND_DEFAULT_TIMEOUT, COMMAND_TIMEOUTS, SYNC_COMMAND_ACTIONS,
+    ENABLE_COMMAND_REGISTRY, COMMAND_REGISTRY_POLL_INTERVAL, MACRO_RESULT_WAIT
+)
+from .command_matcher import CommandMatcher
+from .command_worker import CommandJob, CommandWorkerPool, MacroRun
+from .fuzzy_matcher import FuzzyCommandMatcher
+from .intent_classifier import IntentClassifier
+from .text_utils import content_words
 
 
 class CommandExecutor:
     """Clase para detectar y ejecutar comandos del sistema"""
     
-    def __init__(self, custom_commands=None, logger=None):
+    def __init__(self, custom_commands=None, logger=None, db=None):
         """
         Inicializa el ejecutor de comandos
         
         Args:
             custom_commands (dict): Comandos personalizados adicionales
             logger: Logger opcional
+            db: DatabaseManager opcional: registro de comandos y resultados
         """
-        self.commands = SYSTEM_COMMANDS.copy()
         self.logger = logger
+        self.db = db
+        
+        # Con base de datos, el registro es la fuente de verdad y se recarga en caliente
+        self.use_registry = db is not None and ENABLE_COMMAND_REGISTRY
+        self._registry_version = 0
+        self._registry_checked_at = time.time()
+        self._registry_lock = threading.RLock()
+        self.usage_counts = {}
+        
+        if self.use_registry:
+            db.seed_command_registry(SYSTEM_COMMANDS)
+            self.commands = {}
+            for row in db.get_registry_changes(0):
+                self._registry_version = row['version']
+                if row['enabled']:
+                    self.commands[row['keyword']] = self._row_to_command(row)
+            
+            # Los comandos más usados desempatan las coincidencias
+            self.usage_counts = db.get_command_usage_counts()
+        else:
+            self.commands = SYSTEM_COMMANDS.copy()
         
         if custom_commands:
             self.commands.update(custom_commands)
         
+        # Autómata con todas las palabras clave (búsqueda en una pasada)
+        self.matcher = CommandMatcher(self.commands.keys())
+        
+        # Índice de trigramas para frases mal transcritas ("abrir yutub")
+        self.fuzzy_matcher = None
+        if ENABLE_FUZZY_COMMANDS:
+            self.fuzzy_matcher = FuzzyCommandMatcher(self.commands.keys())
+        
+        # Clasificador de paráfrasis ("pon algo de música")
+        self.intent_classifier = None
+        if ENABLE_INTENT_CLASSIFIER:
+            self.intent_classifier = IntentClassifier()
+            for keyword in self.commands:
+                self._add_intent(keyword)
+        
+        # Las acciones lentas (lanzar programas) no bloquean el bucle principal
+        self.worker_pool = CommandWorkerPool(on_complete=self._on_job_complete, logger=logger)
+        self._turn_jobs = []  # Trabajos del turno actual, a la espera de su interacción
+        self._jobs_lock = threading.Lock()
+        
         print(f"⚙️ Ejecutor de comandos inicializado ({len(self.commands)} comandos disponibles)\n")
     
     def execute(self, user_text):
@@ -36,90 +90,453 @@ class CommandExecutor:
         Returns:
             str or None: Mensaje de confirmación si se ejecutó un comando, None si no
         """
-        text_lower = user_text.lower()
+        keyword = self.match(user_text)
         
-        # Buscar coincidencia con comandos registrados
-        for keyword, command_data in self.commands.items():
-            if keyword in text_lower:
-                return self._execute_action(command_data)
+        if keyword is None:
+            return None  # No se encontró comando
         
-        return None  # No se encontró comando
+        return self.dispatch(keyword)
     
-    def _execute_action(self, command_data):
+    def dispatch(self, keyword):
         """
-        Ejecuta la acción específica del comando
+        Lanza la acción de un comando y devuelve la confirmación hablada.
+        
+        Las acciones asíncronas se encolan en el grupo de hilos y la
+        confirmación vuelve de inmediato; su resultado real llega después
+        (registro y base de datos). Las síncronas se ejecutan aquí y su
+        resultado es la respuesta.
         
         Args:
-            command_data (dict): Datos del comando con 'action' y opcionalmente 'args'
+            keyword (str): Palabra clave del comando
             
         Returns:
             str: Mensaje de confirmación
         """
+        command_data = self.commands[keyword]
+        if command_data.get("action") == "macro":
+            return self._dispatch_macro(keyword, command_data)
+        
+        action = command_data.get("action")
+        args = command_data.get("args")
+        job = self._make_job(keyword, command_data)
+        
+        if command_data.get("sync", action in SYNC_COMMAND_ACTIONS):
+            job.started_at = time.time()
+            try:
+                success, result = job.run()
+            except Exception as e:
+                success, result = False, str(e)
+            job.complete(success, result)
+            self._on_job_complete(job)
+            return result if success else f"No he podido completar el comando: {result}"
+        
+        if not self.worker_pool.submit(job):
+            self.worker_pool.reject(job, "Demasiados comandos en curso")
+            return "Hay demasiados comandos en curso, inténtalo en un momento."
+        
+        return self._confirmation(action, args)
+    
+    def _make_job(self, keyword, command_data):
+        """Crea el trabajo de una acción y lo asocia al turno actual"""
         action = command_data.get("action")
         args = command_data.get("args")
+        timeout = command_data.get("timeout") or COMMAND_TIMEOUTS.get(action, COMMAND_DEFAULT_TIMEOUT)
+        
+        job = CommandJob(
+            keyword, action, args, timeout=timeout,
+            run=lambda: self._run_action(action, args, timeout)
+        )
+        with self._jobs_lock:
+            self._turn_jobs.append(job)
+        return job
+    
+    def _dispatch_macro(self, keyword, command_data):
+        """
+        Ejecuta una macro: los pasos independientes en paralelo y el resto
+        en cuanto terminan sus dependencias ("after").
+        
+        Espera como mucho MACRO_RESULT_WAIT segundos para componer una única
+        respuesta con lo que ya terminó; cada paso se guarda por separado.
+        
+        Args:
+            keyword (str): Palabra clave de la macro
+            command_data (dict): {"action": "macro", "args": [pasos]}
+            
+        Returns:
+            str: Respuesta combinada
+        """
+        steps = command_data.get("args") or []
+        step_ids = [step.get("id") or f"paso{i + 1}" for i, step in enumerate(steps)]
+        dependencies = {step_id: step.get("after", []) for step_id, step in zip(step_ids, steps)}
+        
+        problem = None
+        if len(set(step_ids)) != len(step_ids):
+            problem = "hay pasos con el mismo identificador"
+        elif any(step.get("action") == "macro" for step in steps):
+            problem = "una macro no puede contener otra macro"
+        else:
+            problem = MacroRun.validate(dependencies)
+        
+        if problem:
+            if self.logger:
+                self.logger.log_error("MacroError", f"{keyword}: {problem}", module="CommandExecutor")
+            return f"La macro {keyword} está mal definida: {problem}."
+        
+        run = MacroRun(
+            {
+                step_id: (self._make_job(f"{keyword}:{step_id}", step), dependencies[step_id])
+                for step_id, step in zip(step_ids, steps)
+            },
+            self.worker_pool
+        )
+        run.start()
+        run.wait(MACRO_RESULT_WAIT)
+        
+        jobs = [run.jobs[step_id] for step_id in step_ids]
+        done = [job for job in jobs if job.done.is_set() and job.success]
+        failed = [job for job in jobs if job.done.is_set() and not job.success]
+        pending = len(jobs) - len(done) - len(failed)
+        
+        # "Modo trabajo: abriendo Ableton, abriendo Spotify y abriendo Youtube."
+        phrases = [job.result.rstrip(".") for job in done]
+        phrases = [p[:1].lower() + p[1:] for p in phrases]
+        response = keyword.capitalize()
+        if phrases:
+            joined = phrases[0] if len(phrases) == 1 else ", ".join(phrases[:-1]) + " y " + phrases[-1]
+            response += f": {joined}."
+        else:
+            response += "."
+        
+        if failed:
+            names = ", ".join(job.keyword.split(":", 1)[1] for job in failed)
+            response += f" No se pudo completar: {names}."
+        if pending:
+            response += (" 1 acción sigue en curso." if pending == 1
+                         else f" {pending} acciones siguen en curso.")
+        
+        return response
+    
+    def take_turn_jobs(self):
+        """
+        Entrega los comandos lanzados en el turno actual y empieza uno nuevo
+        
+        Returns:
+            list: Trabajos del turno (CommandJob)
+        """
+        with self._jobs_lock:
+            jobs, self._turn_jobs = self._turn_jobs, []
+        return jobs
+    
+    def bind_interaction(self, interaction_id, jobs=None):
+        """
+        Asocia los comandos del turno a su interacción guardada y persiste
+        los que ya terminaron (el resto se guarda al terminar)
+        
+        Args:
+            interaction_id (int): ID de la interacción en la base de datos
+            jobs (list): Trabajos tomados con take_turn_jobs (por defecto, los del turno actual)
+        """
+        if jobs is None:
+            jobs = self.take_turn_jobs()
+        
+        for job in jobs:
+            job.interaction_id = interaction_id
+            self._persist(job)
+    
+    def _on_job_complete(self, job):
+        """Recibe el resultado real de una acción (desde cualquier hilo)"""
+        if self.logger:
+            self.logger.log_command_execution(job.keyword, job.action, job.result)
+        
+        if job.success:
+            self.usage_counts[job.keyword] = self.usage_counts.get(job.keyword, 0) + 1
+        else:
+            print(f"\n⚠️ El comando '{job.keyword}' falló: {job.result}")
+            if self.logger:
+                self.logger.log_error("CommandError", f"{job.keyword}: {job.result}", module="CommandExecutor")
+        
+        self._persist(job)
+    
+    def _persist(self, job):
+        """Guarda el comando en la base de datos una sola vez"""
+        if self.db is None or not job.claim_persist():
+            return
+        
+        try:
+            self.db.save_command(
+                job.interaction_id, job.keyword, job.action, job.result,
+                success=job.success, duration=job.duration
+            )
+        except Exception as e:
+            if self.logger:
+                self.logger.log_error("DatabaseError", str(e), module="CommandExecutor")
+    
+    def close(self):
+        """Libera el grupo de hilos sin esperar a acciones colgadas"""
+        self.worker_pool.shutdown(wait=False)
+    
+    def match(self, user_text):
+        """
+        Busca el comando que corresponde al texto sin ejecutarlo
+        
+        Args:
+            user_text (str): Texto transcrito del usuario
+            
+        Returns:
+            str or None: Palabra clave del comando encontrado
+        """
+        with self._registry_lock:
+            self._poll_registry()
+            return self._match(user_text)
+    
+    def _match(self, user_text):
+        """Cadena de búsqueda: exacta, aproximada y por intención"""
+        # Gana la palabra clave más larga (p. ej. "abrir chrome" sobre "abrir");
+        # a igual longitud, la más usada
+        keyword = self.matcher.match(user_text.lower(), priority=self._usage_priority)
+        if keyword is not None:
+            return keyword
+        
+        # Coincidencia aproximada: evita una llamada completa al LLM
+        if self.fuzzy_matcher:
+            fuzzy = self.fuzzy_matcher.match(user_text)
+            if fuzzy is not None:
+                keyword, score = fuzzy
+                if self._allows_inexact(keyword):
+                    self._log_match("🔎 Comando aproximado", user_text, keyword, score)
+                    return keyword
         
+        # Paráfrasis de un comando: un producto matricial contra todas las intenciones
+        if self.intent_classifier and len(content_words(user_text)) <= INTENT_MAX_WORDS:
+            intent = self.intent_classifier.classify(user_text)
+            if intent is not None:
+                keyword, score = intent
+                self._log_match("🧭 Intención detectada", user_text, keyword, score)
+                return keyword
+        
+        return None
+    
+    def _usage_priority(self, keyword):
+        return self.usage_counts.get(keyword, 0)
+    
+    def _log_match(self, label, user_text, keyword, score):
+        """Registra una coincidencia no literal"""
+        if self.logger:
+            self.logger.main_logger.info(
+                f"{label}: '{user_text}' -> '{keyword}' (similitud {score:.2f})"
+            )
+    
+    def _allows_inexact(self, keyword):
+        """
+        Indica si un comando puede lanzarse por coincidencia aproximada o
+        por intención: no si su acción, o algún paso de su macro, está en
+        FUZZY_EXCLUDED_ACTIONS
+        """
+        command_data = self.commands[keyword]
+        actions = [command_data.get("action")]
+        if actions[0] == "macro":
+            steps = command_data.get("args")
+            actions += [step.get("action") for step in steps or [] if isinstance(step, dict)]
+        return not any(action in FUZZY_EXCLUDED_ACTIONS for action in actions)
+    
+    def _add_intent(self, keyword):
+        """Entrena la intención de un comando con su palabra clave y ejemplos"""
+        if not self._allows_inexact(keyword):
+            return
+        examples = [keyword] + COMMAND_INTENT_EXAMPLES.get(keyword, [])
+        self.intent_classifier.add_examples(keyword, examples)
+    
+    def _confirmation(self, action, args):
+        """
+        Mensaje que se dice al lanzar una acción asíncrona
+        
+        Args:
+            action (str): Tipo de acción
+            args (str): Argumentos de la acción
+            
+        Returns:
+            str: Mensaje de confirmación
+        """
         # Navegador
         if action == "open_browser":
-            os.system(f"start {args}")
             return f"Abriendo {args}."
         
         # URLs
         elif action == "open_url":
-            webbrowser.open(args)
             url_name = args.split("//")[1].split(".")[1] if "//" in args else args
             return f"Abriendo {url_name.capitalize()}."
         
         # Aplicaciones
         elif action == "open_app":
-            os.startfile(args)
             app_name = os.path.basename(args).replace(".exe", "")
             return f"Abriendo {app_name}."
         
         # Sistema
         elif action == "lock_screen":
-            os.system("rundll32.exe user32.dll,LockWorkStation")
             return "Bloqueando la pantalla."
         
         elif action == "shutdown":
-            os.system("shutdown /s /t 1")
             return "Apagando el sistema."
         
+        else:
+            return "Comando no reconocido."
+    
+    def _run_action(self, action, args, timeout):
+        """
+        Ejecuta la acción específica del comando
+        
+        Los comandos de consola usan subprocess con tiempo límite para poder
+        cortar los que se cuelgan.
+        
+        Args:
+            action (str): Tipo de acción
+            args (str): Argumentos opcionales
+            timeout (float): Segundos máximos para comandos de consola
+            
+        Returns:
+            tuple: (éxito, mensaje de resultado)
+        """
+        # Navegador
+        if action == "open_browser":
+            code = subprocess.run(f"start {args}", shell=True, timeout=timeout).returncode
+            return code == 0, f"Abriendo {args}." if code == 0 else f"Código de salida {code}"
+        
+        # URLs
+        elif action == "open_url":
+            opened = webbrowser.open(args)
+            return opened, self._confirmation(action, args) if opened else "No hay navegador disponible"
+        
+        # Aplicaciones
+        elif action == "open_app":
+            os.startfile(args)
+            return True, self._confirmation(action, args)
+        
+        # Sistema
+        elif action == "lock_screen":
+            code = subprocess.run("rundll32.exe user32.dll,LockWorkStation", shell=True, timeout=timeout).returncode
+            return code == 0, "Bloqueando la pantalla." if code == 0 else f"Código de salida {code}"
+        
+        elif action == "shutdown":
+            code = subprocess.run("shutdown /s /t 1", shell=True, timeout=timeout).returncode
+            return code == 0, "Apagando el sistema." if code == 0 else f"Código de salida {code}"
+        
         # Utilidades
         elif action == "get_time":
             hora = time.strftime("%H:%M")
-            return f"Son las {hora}."
+            return True, f"Son las {hora}."
         
         else:
-            return "Comando no reconocido."
+            return False, "Comando no reconocido."
     
     def add_command(self, keyword, action, args=None):
         """
-        Agrega un nuevo comando dinámicamente
+        Agrega un nuevo comando dinámicamente (y lo guarda en el registro)
         
         Args:
             keyword (str): Palabra clave para activar el comando
             action (str): Tipo de acción
             args (str): Argumentos opcionales
         """
-        self.commands[keyword.lower()] = {
-            "action": action,
-            "args": args
-        }
+        with self._registry_lock:
+            self._register(keyword, {"action": action, "args": args})
+            if self.use_registry:
+                self.db.register_command(keyword, action, args)
         print(f"✅ Comando '{keyword}' agregado.")
     
     def remove_command(self, keyword):
         """
-        Elimina un comando
+        Elimina un comando (también del registro)
         
         Args:
             keyword (str): Palabra clave del comando a eliminar
         """
-        if keyword.lower() in self.commands:
-            del self.commands[keyword.lower()]
+        with self._registry_lock:
+            found = self._unregister(keyword)
+            if self.use_registry:
+                found = self.db.unregister_command(keyword) or found
+        
+        if found:
             print(f"🗑️ Comando '{keyword}' eliminado.")
         else:
             print(f"⚠️ Comando '{keyword}' no encontrado.")
     
+    # === REGISTRO EN BASE DE DATOS ===
+    
+    def refresh_registry(self):
+        """
+        Aplica los cambios del registro posteriores a la última versión cargada
+        
+        Returns:
+            int: Número de cambios aplicados
+        """
+        if not self.use_registry:
+            return 0
+        
+        with self._registry_lock:
+            self._registry_checked_at = time.time()
+            if self.db.get_registry_version() <= self._registry_version:
+                return 0
+            
+            changes = self.db.get_registry_changes(self._registry_version)
+            for row in changes:
+                self._registry_version = row['version']
+                if row['enabled']:
+                    self._register(row['keyword'], self._row_to_command(row))
+                else:
+                    self._unregister(row['keyword'])
+        
+        if changes and self.logger:
+            self.logger.main_logger.info(f"🔄 Registro de comandos recargado: {len(changes)} cambios")
+        return len(changes)
+    
+    def _poll_registry(self):
+        """Comprueba cambios como mucho cada COMMAND_REGISTRY_POLL_INTERVAL segundos"""
+        if self.use_registry and time.time() - self._registry_checked_at >= COMMAND_REGISTRY_POLL_INTERVAL:
+            try:
+                self.refresh_registry()
+            except Exception as e:
+                if self.logger:
+                    self.logger.log_error("RegistryError", str(e), module="CommandExecutor")
+    
+    @staticmethod
+    def _row_to_command(row):
+        """Convierte una fila del registro al formato de SYSTEM_COMMANDS"""
+        command = {"action": row['action'], "args": row['args']}
+        if row['action'] == "macro" and isinstance(row['args'], str):
+            command["args"] = json.loads(row['args'])  # Lista de pasos
+        if row['sync'] is not None:
+            command["sync"] = bool(row['sync'])
+        if row['timeout'] is not None:
+            command["timeout"] = row['timeout']
+        return command
+    
+    def _register(self, keyword, command_data):
+        """Alta (o reemplazo) de un comando en memoria y en los buscadores"""
+        keyword = keyword.lower()
+        if keyword in self.commands:
+            self._unregister(keyword)
+        
+        self.commands[keyword] = command_data
+        self.matcher.add(keyword)
+        if self.fuzzy_matcher:
+            self.fuzzy_matcher.add(keyword)
+        if self.intent_classifier:
+            self._add_intent(keyword)
+    
+    def _unregister(self, keyword):
+        """Baja de un comando en memoria y en los buscadores"""
+        keyword = keyword.lower()
+        if keyword not in self.commands:
+            return False
+        
+        del self.commands[keyword]
+        self.matcher.remove(keyword)
+        if self.fuzzy_matcher:
+            self.fuzzy_matcher.remove(keyword)
+        if self.intent_classifier:
+            self.intent_classifier.remove_intent(keyword)
+        return True
+    
     def list_commands(self):
         """
         Lista todos los comandos disponibles
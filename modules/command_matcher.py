@@ -0,0 +1,188 @@
+"""
+Módulo de búsqueda de comandos con un autómata Aho-Corasick
+"""
+from collections import deque
+
+
+class CommandMatcher:
+    """
+    Autómata Aho-Corasick sobre las palabras clave de los comandos.
+
+    Encuentra en una sola pasada sobre el texto todas las palabras clave
+    que aparecen en él, con coste O(longitud del texto + coincidencias)
+    independientemente del número de comandos registrados.
+
+    Las altas y bajas modifican el trie directamente; los enlaces de fallo
+    se recalculan de forma perezosa en la siguiente búsqueda, de modo que
+    registrar miles de comandos seguidos solo provoca una reconstrucción.
+    """
+
+    def __init__(self, keywords=None):
+        """
+        Inicializa el autómata
+
+        Args:
+            keywords (iterable): Palabras clave iniciales
+        """
+        self._reset()
+
+        for keyword in keywords or ():
+            self.add(keyword)
+
+    def _reset(self):
+        """Deja el autómata vacío (solo el nodo raíz)"""
+        self._goto = [{}]          # Transiciones de cada nodo
+        self._fail = [0]           # Enlace de fallo de cada nodo
+        self._output = [None]      # Palabra clave que termina en el nodo
+        self._dict_link = [0]      # Siguiente nodo terminal por la cadena de fallos
+        self._nodes_by_keyword = {}
+        self._dead_nodes = 0       # Nodos huérfanos tras eliminar comandos
+        self._dirty = False
+
+    # === ALTAS Y BAJAS ===
+
+    def add(self, keyword):
+        """
+        Registra una palabra clave
+
+        Args:
+            keyword (str): Palabra clave (se normaliza a minúsculas)
+        """
+        keyword = keyword.lower()
+        if not keyword or keyword in self._nodes_by_keyword:
+            return
+
+        node = 0
+        for char in keyword:
+            next_node = self._goto[node].get(char)
+            if next_node is None:
+                next_node = len(self._goto)
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append(None)
+                self._dict_link.append(0)
+                self._goto[node][char] = next_node
+            node = next_node
+
+        self._output[node] = keyword
+        self._nodes_by_keyword[keyword] = node
+        self._dirty = True
+
+    def remove(self, keyword):
+        """
+        Elimina una palabra clave
+
+        Args:
+            keyword (str): Palabra clave a eliminar
+
+        Returns:
+            bool: True si existía
+        """
+        node = self._nodes_by_keyword.pop(keyword.lower(), None)
+        if node is None:
+            return False
+
+        self._output[node] = None
+        self._dead_nodes += len(keyword)
+        self._dirty = True
+
+        # Compactar cuando la mitad del trie ya no corresponde a ningún comando
+        if self._dead_nodes * 2 > len(self._goto):
+            keywords = list(self._nodes_by_keyword)
+            self._reset()
+            for remaining in keywords:
+                self.add(remaining)
+
+        return True
+
+    def __contains__(self, keyword):
+        return keyword.lower() in self._nodes_by_keyword
+
+    def __len__(self):
+        return len(self._nodes_by_keyword)
+
+    # === BÚSQUEDA ===
+
+    def find_all(self, text):
+        """
+        Encuentra todas las palabras clave contenidas en el texto
+
+        Args:
+            text (str): Texto en minúsculas
+
+        Returns:
+            list: Tuplas (posición_inicial, palabra_clave)
+        """
+        if self._dirty:
+            self._build_links()
+
+        goto, fail = self._goto, self._fail
+        output, dict_link = self._output, self._dict_link
+
+        matches = []
+        node = 0
+        for index, char in enumerate(text):
+            while node and char not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(char, 0)
+
+            # Recorrer los terminales alcanzables por la cadena de fallos
+            match_node = node if output[node] is not None else dict_link[node]
+            while match_node:
+                keyword = output[match_node]
+                matches.append((index - len(keyword) + 1, keyword))
+                match_node = dict_link[match_node]
+
+        return matches
+
+    def match(self, text, priority=None):
+        """
+        Devuelve la coincidencia más específica del texto.
+
+        Gana la palabra clave más larga; a igual longitud, la de mayor
+        prioridad y después la que aparece antes en el texto.
+
+        Args:
+            text (str): Texto en minúsculas
+            priority (callable): Prioridad opcional de cada palabra clave
+
+        Returns:
+            str or None: Palabra clave ganadora
+        """
+        best = None
+        best_key = None
+
+        for start, keyword in self.find_all(text):
+            key = (len(keyword), priority(keyword) if priority else 0, -start)
+            if best_key is None or key > best_key:
+                best, best_key = keyword, key
+
+        return best
+
+    # === CONSTRUCCIÓN ===
+
+    def _build_links(self):
+        """Recalcula enlaces de fallo y de diccionario con un BFS"""
+        goto, fail = self._goto, self._fail
+        output, dict_link = self._output, self._dict_link
+
+        queue = deque()
+        for child in goto[0].values():
+            fail[child] = 0
+            dict_link[child] = 0
+            queue.append(child)
+
+        while queue:
+            node = queue.popleft()
+            for char, child in goto[node].items():
+                state = fail[node]
+                while state and char not in goto[state]:
+                    state = fail[state]
+                fail_target = goto[state].get(char, 0)
+                fail[child] = fail_target if fail_target != child else 0
+
+                target = fail[child]
+                dict_link[child] = target if output[target] is not None else dict_link[target]
+                queue.append(child)
+
+        self._dirty = False
@@ -0,0 +1,262 @@
+"""
+Módulo de ejecución de comandos en segundo plano con tiempo límite
+"""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from config import COMMAND_WORKERS, COMMAND_MAX_PENDING
+
+
+class CommandJob:
+    """
+    Ejecución de un comando: se completa una sola vez, ya sea con el
+    resultado real de la acción o por agotar su tiempo límite.
+    """
+
+    def __init__(self, keyword, action, args=None, timeout=None, run=None):
+        """
+        Args:
+            keyword (str): Palabra clave que activó el comando
+            action (str): Tipo de acción
+            args: Argumentos de la acción
+            timeout (float): Segundos máximos antes de darla por fallida
+            run (callable): Función sin argumentos que realiza la acción
+        """
+        self.keyword = keyword
+        self.action = action
+        self.args = args
+        self.timeout = timeout
+        self.run = run
+
+        self.interaction_id = None
+        self.success = None
+        self.result = None
+        self.duration = None
+        self.started_at = None
+        self.done = threading.Event()
+        self.listeners = []  # Se llaman con el trabajo al completarse (macros)
+
+        self._lock = threading.Lock()
+        self._persisted = False
+
+    def complete(self, success, result):
+        """
+        Fija el resultado si todavía no lo tenía
+
+        Returns:
+            bool: True si esta llamada completó el trabajo
+        """
+        with self._lock:
+            if self.done.is_set():
+                return False
+            self.success = success
+            self.result = result
+            self.duration = time.time() - self.started_at if self.started_at else 0.0
+            self.done.set()
+            return True
+
+    def claim_persist(self):
+        """Devuelve True una sola vez, cuando hay resultado e interacción asociada"""
+        with self._lock:
+            if self._persisted or not self.done.is_set() or self.interaction_id is None:
+                return False
+            self._persisted = True
+            return True
+
+
+class CommandWorkerPool:
+    """
+    Grupo acotado de hilos para las acciones de los comandos.
+
+    Cada trabajo tiene un temporizador: si la acción no termina a tiempo
+    se reporta como fallida (el proceso lanzado puede seguir vivo, pero
+    el asistente no se queda esperando).
+    """
+
+    def __init__(self, max_workers=None, max_pending=None, on_complete=None, logger=None):
+        """
+        Inicializa el grupo de hilos
+
+        Args:
+            max_workers (int): Hilos simultáneos
+            max_pending (int): Trabajos en curso o en cola como máximo
+            on_complete (callable): Se llama con cada CommandJob terminado
+            logger: Logger opcional
+        """
+        self.on_complete = on_complete
+        self.logger = logger
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers or COMMAND_WORKERS,
+            thread_name_prefix="command"
+        )
+        self._slots = threading.BoundedSemaphore(max_pending or COMMAND_MAX_PENDING)
+
+    def submit(self, job):
+        """
+        Encola un trabajo sin bloquear
+
+        Args:
+            job (CommandJob): Trabajo a ejecutar
+
+        Returns:
+            bool: False si el grupo está saturado
+        """
+        if not self._slots.acquire(blocking=False):
+            return False
+
+        job.started_at = time.time()
+
+        timer = None
+        if job.timeout:
+            timer = threading.Timer(
+                job.timeout, self._finish, (job, False, f"Tiempo agotado ({job.timeout:g}s)")
+            )
+            timer.daemon = True
+            timer.start()
+
+        self._executor.submit(self._run, job, timer)
+        return True
+
+    def reject(self, job, reason):
+        """Completa como fallido un trabajo que no llegó a ejecutarse"""
+        self._finish(job, False, reason)
+
+    def _run(self, job, timer):
+        """Ejecuta la acción en un hilo del grupo"""
+        try:
+            success, result = job.run()
+        except Exception as e:
+            success, result = False, str(e)
+        finally:
+            if timer:
+                timer.cancel()
+            self._slots.release()
+
+        self._finish(job, success, result)
+
+    def _finish(self, job, success, result):
+        """Completa el trabajo (una sola vez) y notifica"""
+        if not job.complete(success, result):
+            return
+
+        for callback in [self.on_complete] + job.listeners:
+            if callback is None:
+                continue
+            try:
+                callback(job)
+            except Exception as e:
+                if self.logger:
+                    self.logger.log_error("CommandCallbackError", str(e), module="CommandWorkerPool")
+
+    def shutdown(self, wait=True):
+        """Espera a los trabajos en curso y libera los hilos"""
+        self._executor.shutdown(wait=wait)
+
+
+class MacroRun:
+    """
+    Ejecución de una macro: cada paso se encola en cuanto todas sus
+    dependencias terminan bien, así que los pasos independientes corren en
+    paralelo. Si una dependencia falla, los pasos que dependen de ella se
+    omiten (y se reportan como fallidos).
+    """
+
+    def __init__(self, steps, pool):
+        """
+        Args:
+            steps (dict): Identificador del paso -> (CommandJob, lista de dependencias)
+            pool (CommandWorkerPool): Grupo donde se ejecutan los pasos
+        """
+        self.pool = pool
+        self.jobs = {step_id: job for step_id, (job, _) in steps.items()}
+        self.dependencies = {step_id: list(after) for step_id, (_, after) in steps.items()}
+        self.done = threading.Event()
+
+        self._step_of = {id(job): step_id for step_id, job in self.jobs.items()}
+        self._started = set()
+        self._remaining = len(self.jobs)
+        self._lock = threading.Lock()
+
+        for job in self.jobs.values():
+            job.listeners.append(self._on_step_done)
+
+    @staticmethod
+    def validate(dependencies):
+        """
+        Comprueba que las dependencias existen y no forman ciclos
+
+        Args:
+            dependencies (dict): Paso -> lista de pasos previos
+
+        Returns:
+            str or None: Descripción del problema, None si es válida
+        """
+        for step_id, after in dependencies.items():
+            missing = [dep for dep in after if dep not in dependencies]
+            if missing:
+                return f"el paso '{step_id}' depende de pasos inexistentes: {', '.join(missing)}"
+
+        # Kahn: si no se pueden ordenar todos los pasos, hay un ciclo
+        pending = {step_id: len(after) for step_id, after in dependencies.items()}
+        ready = [step_id for step_id, count in pending.items() if count == 0]
+        ordered = 0
+        while ready:
+            current = ready.pop()
+            ordered += 1
+            for step_id, after in dependencies.items():
+                if current in after:
+                    pending[step_id] -= 1
+                    if pending[step_id] == 0:
+                        ready.append(step_id)
+
+        return None if ordered == len(dependencies) else "las dependencias forman un ciclo"
+
+    def start(self):
+        """Encola los pasos sin dependencias"""
+        if not self.jobs:
+            self.done.set()
+            return
+
+        with self._lock:
+            roots = [step_id for step_id, after in self.dependencies.items() if not after]
+            self._started.update(roots)
+
+        for step_id in roots:
+            self._launch(step_id)
+
+    def wait(self, timeout=None):
+        """Espera a que terminen todos los pasos (True si terminaron)"""
+        return self.done.wait(timeout)
+
+    def _launch(self, step_id):
+        job = self.jobs[step_id]
+        if not self.pool.submit(job):
+            self.pool.reject(job, "Demasiados comandos en curso")
+
+    def _on_step_done(self, job):
+        """Encola u omite los pasos que esperaban al que acaba de terminar"""
+        finished = self._step_of[id(job)]
+        launch, skip = [], []
+
+        with self._lock:
+            self._remaining -= 1
+            if self._remaining == 0:
+                self.done.set()
+
+            for step_id, after in self.dependencies.items():
+                if step_id in self._started or finished not in after:
+                    continue
+                if not all(self.jobs[dep].done.is_set() for dep in after):
+                    continue
+
+                self._started.add(step_id)
+                failed = [dep for dep in after if not self.jobs[dep].success]
+                if failed:
+                    skip.append((step_id, failed))
+                else:
+                    launch.append(step_id)
+
+        for step_id in launch:
+            self._launch(step_id)
+        for step_id, failed in skip:
+            self.pool.reject(self.jobs[step_id], f"Omitido: falló '{failed[0]}'")
@@ -4,22 +4,114 @@ Maneja persistencia de conversaciones, preferencias, comandos y más
 """
 import sqlite3
 import json
+import threading
+from contextlib import contextmanager
 from datetime import datetime
 from pathlib import Path
-import shutil
 from typing import List, Dict, Optional, Any
+from config import (
+    DB_JOURNAL_MODE, DB_SYNCHRONOUS, DB_MMAP_SIZE, DB_CACHE_SIZE_KB, DB_BUSY_TIMEOUT,
+    SEARCH_CANDIDATES, SEARCH_RECENCY_DAYS, SEARCH_RRF_K, CONTEXT_MAX_KEYWORDS
+)
+from .text_utils import search_terms, extract_keywords
+
+
+# Siguiente versión del registro de comandos (subconsulta usada al escribir)
+NEXT_REGISTRY_VERSION_SQL = "SELECT COALESCE(MAX(version), 0) + 1 FROM commands_registry"
+
+# Tokenizador de los índices de texto completo: sin distinguir acentos ni mayúsculas
+FTS_TOKENIZER = "unicode61 remove_diacritics 2"
+
+# Índices de texto completo: tabla FTS5 -> (tabla, clave, columnas indexadas)
+FTS_TABLES = {
+    'context_fts': ('conversation_context', 'context_id', ('content',)),
+    'interactions_fts': ('interactions', 'interaction_id', ('user_input', 'response')),
+}
+
+
+def fts_query(text: str) -> Optional[str]:
+    """
+    Convierte una frase en una consulta FTS5: sus términos significativos
+    unidos con OR (BM25 premia los documentos que tienen más y más raros)
+    
+    Args:
+        text: Frase del usuario
+        
+    Returns:
+        str or None: Expresión para MATCH (None si no queda ningún término)
+    """
+    terms = search_terms(text)
+    return " OR ".join(f'"{term}"' for term in terms) if terms else None
+
+
+def _configure(conn, readonly=False):
+    """Ajustes por conexión: filas por nombre, E/S mapeada en memoria y caché de páginas"""
+    conn.row_factory = sqlite3.Row
+    conn.execute(f"PRAGMA mmap_size = {int(DB_MMAP_SIZE)}")
+    conn.execute(f"PRAGMA cache_size = -{int(DB_CACHE_SIZE_KB)}")
+    if readonly:
+        conn.execute("PRAGMA query_only = 1")
+    return conn
+
+
+def connect_readonly(db_path="data/jarvis.db"):
+    """
+    Conexión de solo lectura para herramientas de análisis
+    
+    En modo WAL no bloquea al asistente mientras escribe, y cada consulta
+    (o cada transacción abierta con BEGIN) ve una instantánea consistente.
+    
+    Args:
+        db_path: Ruta de la base de datos
+        
+    Returns:
+        sqlite3.Connection
+    """
+    uri = f"{Path(db_path).resolve().as_uri()}?mode=ro"
+    conn = sqlite3.connect(uri, uri=True, timeout=DB_BUSY_TIMEOUT, check_same_thread=False)
+    return _configure(conn, readonly=True)
 
 
 class DatabaseManager:
-    """Gestor centralizado de base de datos SQLite"""
+    """
+    Gestor centralizado de base de datos SQLite.
+    
+    La base trabaja en modo WAL (los lectores no bloquean al escritor ni al
+    revés). Hay una única conexión de escritura, reservada para un hilo a
+    la vez: las escrituras con commit=False dejan la transacción abierta y
+    el escritor reservado hasta que ese mismo hilo llama a commit(), así
+    los lotes de un hilo nunca se confirman a medias desde otro. Las
+    lecturas usan una conexión propia de cada hilo (solo lectura), salvo
+    en el hilo con una transacción abierta, que lee por el escritor para
+    ver sus propias escrituras.
+    
+    Modos de escritura y durabilidad:
+    
+    - commit=True (por defecto): cada llamada es una transacción. Al
+      retornar sobrevive a la caída del proceso; con synchronous=NORMAL
+      un corte de luz puede perder las últimas transacciones (el fsync se
+      hace en los checkpoints del WAL), con FULL ninguna. Nunca corrompe
+      la base.
+    - transaction(): todo el bloque o nada (un error deshace el bloque);
+      misma durabilidad que un commit al salir. Anidada, usa SAVEPOINT.
+    - commit=False + commit(): como transaction() sin deshacer en caso de
+      error; lo escrito queda pendiente hasta que el hilo confirma.
+    - PersistenceWriter: un commit por lote (PERSIST_BATCH_SIZE tareas o
+      PERSIST_FLUSH_INTERVAL segundos). Si el proceso muere se pierde lo
+      encolado sin confirmar; cada tarea es atómica dentro del lote.
+    - import_interactions(): executemany en una sola transacción.
+    """
     
-    def __init__(self, db_path="data/jarvis.db", logger=None):
+    def __init__(self, db_path="data/jarvis.db", logger=None, journal_mode=None,
+                 synchronous=None):
         """
         Inicializa la conexión a la base de datos
         
         Args:
             db_path (str): Ruta del archivo de base de datos
             logger: Logger opcional para registrar operaciones
+            journal_mode (str): Modo de diario de SQLite (por defecto, DB_JOURNAL_MODE)
+            synchronous (str): Nivel de fsync (por defecto, DB_SYNCHRONOUS)
         """
         self.db_path = db_path
         self.logger = logger
@@ -27,22 +119,179 @@ class DatabaseManager:
         # Crear directorio si no existe
         Path(db_path).parent.mkdir(parents=True, exist_ok=True)
         
-        # Conectar a la base de datos
-        self.conn = sqlite3.connect(db_path, check_same_thread=False)
-        self.conn.row_factory = sqlite3.Row  # Permite acceso por nombre de columna
-        self.cursor = self.conn.cursor()
+        # Conexión de escritura (WAL persiste en el archivo; synchronous es por conexión)
+        self._writer = _configure(sqlite3.connect(db_path, timeout=DB_BUSY_TIMEOUT,
+                                                  check_same_thread=False))
+        self._in_memory = db_path == ":memory:"
+        if not self._in_memory:
+            self._writer.execute(f"PRAGMA journal_mode = {journal_mode or DB_JOURNAL_MODE}")
+        self._writer.execute(f"PRAGMA synchronous = {synchronous or DB_SYNCHRONOUS}")
+        self._write_lock = threading.Lock()
+        self._write_owner = None  # Hilo con una transacción abierta
+        self._tx_depth = 0  # Bloques transaction() abiertos por el hilo dueño
+        self._after_commit = []  # (profundidad, función) a ejecutar tras confirmar
+        
+        # Conexiones de lectura por hilo (identificador de hilo -> conexión)
+        self._readers = {}
+        self._readers_lock = threading.Lock()
+        
+        # Búsqueda semántica opcional (VectorStore) que search_context combina con FTS5
+        self.vector_store = None
         
         # Inicializar esquema
-        self._initialize_schema()
+        with self._write() as conn:
+            self._initialize_schema(conn)
         
         if self.logger:
             self.logger.main_logger.info(f"💾 Base de datos inicializada: {db_path}")
     
-    def _initialize_schema(self):
+    @property
+    def conn(self) -> sqlite3.Connection:
+        """
+        Conexión para consultas del hilo actual
+        
+        Es el escritor si este hilo tiene una transacción abierta (para leer
+        lo que aún no ha confirmado); si no, su conexión de solo lectura.
+        """
+        if self._write_owner == threading.get_ident() or self._in_memory:
+            return self._writer
+        
+        reader = self._readers.get(threading.get_ident())
+        if reader is None:
+            reader = self._open_reader()
+        return reader
+    
+    def _open_reader(self) -> sqlite3.Connection:
+        """Crea la conexión de lectura del hilo actual y cierra las de hilos terminados"""
+        reader = connect_readonly(self.db_path)
+        with self._readers_lock:
+            alive = {thread.ident for thread in threading.enumerate()}
+            for ident in [i for i in self._readers if i not in alive]:
+                self._readers.pop(ident).close()
+            self._readers[threading.get_ident()] = reader
+        return reader
+    
+    @contextmanager
+    def _write(self, commit: bool = True, savepoint: bool = True):
+        """
+        Reserva la conexión de escritura para el hilo actual
+        
+        Las escrituras del bloque son atómicas: si lanza una excepción se
+        deshacen (solo las suyas si el hilo ya tenía escrituras pendientes
+        o un transaction() abierto) y, si este bloque reservó el escritor,
+        se libera. Solo se confirma si el bloque termina bien.
+        
+        Args:
+            commit: Confirmar y liberar el escritor al salir (False: la
+                transacción sigue abierta hasta commit())
+            savepoint: Aislar el bloque en un SAVEPOINT cuando el hilo ya
+                tenía el escritor (transaction() gestiona los suyos)
+        """
+        acquired = self._write_owner != threading.get_ident()
+        if acquired:
+            self._write_lock.acquire()
+            self._write_owner = threading.get_ident()
+        
+        nested = savepoint and not acquired
+        if nested:
+            self._writer.execute("SAVEPOINT write_block")
+        try:
+            yield self._writer
+        except BaseException:
+            if self._write_owner == threading.get_ident():
+                if nested:
+                    self._writer.execute("ROLLBACK TO write_block")
+                    self._writer.execute("RELEASE write_block")
+                elif acquired:
+                    self._release(rollback=True)
+            raise
+        
+        if nested:
+            self._writer.execute("RELEASE write_block")
+        if commit:
+            self.commit()
+    
+    @contextmanager
+    def transaction(self):
+        """
+        Unidad de trabajo: las escrituras del bloque se confirman juntas
+        (un solo commit) o se deshacen todas si hay una excepción
+        
+        Dentro del bloque, commit=True y commit() no confirman nada. Un
+        bloque anidado es un SAVEPOINT: su error solo deshace lo suyo.
+        
+        Ejemplo:
+            with db.transaction():
+                interaction_id = db.save_interaction(...)
+                db.save_context(interaction_id, ...)
+        """
+        with self._write(commit=False, savepoint=False) as conn:
+            depth = self._tx_depth
+            if depth:
+                conn.execute(f"SAVEPOINT uow_{depth}")
+            elif not conn.in_transaction:
+                conn.execute("BEGIN")
+            self._tx_depth += 1
+            
+            try:
+                yield conn
+            except BaseException:
+                self._tx_depth -= 1
+                if depth:
+                    conn.execute(f"ROLLBACK TO uow_{depth}")
+                    conn.execute(f"RELEASE uow_{depth}")
+                    # Lo deshecho no llega a confirmarse: sus avisos tampoco
+                    self._after_commit = [(d, f) for d, f in self._after_commit if d <= depth]
+                else:
+                    self._release(rollback=True)
+                raise
+            
+            self._tx_depth -= 1
+            if depth:
+                conn.execute(f"RELEASE uow_{depth}")
+                # Lo confirmado en el SAVEPOINT pasa a depender del bloque que lo contiene
+                self._after_commit = [(min(d, depth), f) for d, f in self._after_commit]
+            else:
+                self.commit()
+    
+    def after_commit(self, callback):
+        """
+        Ejecuta `callback` cuando se confirme la transacción abierta por
+        este hilo (o ya, si no tiene ninguna)
+        
+        Si la transacción (o el SAVEPOINT en que se registró) se deshace,
+        no se ejecuta: sirve para efectos fuera de la base, como
+        programar el aviso de un recordatorio recién insertado.
+        
+        Args:
+            callback (callable): Función sin argumentos
+        """
+        if self._write_owner != threading.get_ident():
+            callback()
+            return
+        self._after_commit.append((self._tx_depth, callback))
+    
+    @contextmanager
+    def snapshot(self):
+        """
+        Conexión de lectura con una instantánea fija durante el bloque
+        
+        Todas las consultas dentro del bloque ven la base en el mismo
+        instante (transacción de lectura en WAL), aunque el asistente
+        siga escribiendo.
+        """
+        conn = connect_readonly(self.db_path)
+        try:
+            conn.execute("BEGIN")
+            yield conn
+        finally:
+            conn.close()
+    
+    def _initialize_schema(self, conn):
         """Crea las tablas si no existen"""
         
         # Tabla de sesiones
-        self.cursor.execute("""
+        conn.execute("""
         CREATE TABLE IF NOT EXISTS sessions (
             session_id INTEGER PRIMARY KEY AUTOINCREMENT,
             start_time TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
@@ -56,7 +305,7 @@ class DatabaseManager:
         """)
         
         # Tabla de interacciones
-        self.cursor.execute("""
+        conn.execute("""
         CREATE TABLE IF NOT EXISTS interactions (
             interaction_id INTEGER PRIMARY KEY AUTOINCREMENT,
             session_id INTEGER,
@@ -71,7 +320,7 @@ class DatabaseManager:
         """)
         
         # Tabla de comandos ejecutados
-        self.cursor.execute("""
+        conn.execute("""
         CREATE TABLE IF NOT EXISTS commands (
             command_id INTEGER PRIMARY KEY AUTOINCREMENT,
             interaction_id INTEGER,
@@ -80,12 +329,13 @@ class DatabaseManager:
             action_type TEXT NOT NULL,
             result TEXT,
             success BOOLEAN DEFAULT 1,
+            duration REAL,  -- segundos hasta el resultado real de la acción
             FOREIGN KEY (interaction_id) REFERENCES interactions(interaction_id)
         )
         """)
         
         # Tabla de preferencias del usuario
-        self.cursor.execute("""
+        conn.execute("""
         CREATE TABLE IF NOT EXISTS user_preferences (
             preference_id INTEGER PRIMARY KEY AUTOINCREMENT,
             key TEXT UNIQUE NOT NULL,
@@ -96,7 +346,7 @@ class DatabaseManager:
         """)
         
         # Tabla de recordatorios/tareas
-        self.cursor.execute("""
+        conn.execute("""
         CREATE TABLE IF NOT EXISTS reminders (
             reminder_id INTEGER PRIMARY KEY AUTOINCREMENT,
             task TEXT NOT NULL,
@@ -110,7 +360,7 @@ class DatabaseManager:
         """)
         
         # Tabla de contexto conversacional (para RAG)
-        self.cursor.execute("""
+        conn.execute("""
         CREATE TABLE IF NOT EXISTS conversation_context (
             context_id INTEGER PRIMARY KEY AUTOINCREMENT,
             interaction_id INTEGER,
@@ -123,7 +373,7 @@ class DatabaseManager:
         """)
         
         # Tabla de estadísticas de uso
-        self.cursor.execute("""
+        conn.execute("""
         CREATE TABLE IF NOT EXISTS usage_stats (
             stat_id INTEGER PRIMARY KEY AUTOINCREMENT,
             date DATE DEFAULT (DATE('now')),
@@ -137,7 +387,7 @@ class DatabaseManager:
         """)
         
         # Tabla de errores
-        self.cursor.execute("""
+        conn.execute("""
         CREATE TABLE IF NOT EXISTS error_logs (
             error_id INTEGER PRIMARY KEY AUTOINCREMENT,
             timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
@@ -150,7 +400,7 @@ class DatabaseManager:
         """)
         
         # Tabla de historial de modelos (para tracking de versiones)
-        self.cursor.execute("""
+        conn.execute("""
         CREATE TABLE IF NOT EXISTS model_history (
             history_id INTEGER PRIMARY KEY AUTOINCREMENT,
             model_type TEXT NOT NULL,  -- 'whisper', 'ollama'
@@ -161,28 +411,229 @@ class DatabaseManager:
         )
         """)
         
+        # Registro de comandos (fuente de verdad; SYSTEM_COMMANDS solo lo inicializa).
+        # Cada cambio recibe una versión mayor que todas las anteriores y las bajas
+        # se marcan con enabled = 0, de modo que la recarga incremental las ve
+        conn.execute("""
+        CREATE TABLE IF NOT EXISTS commands_registry (
+            keyword TEXT PRIMARY KEY,
+            action TEXT NOT NULL,
+            args TEXT,
+            sync BOOLEAN,  -- NULL: según SYNC_COMMAND_ACTIONS
+            timeout REAL,  -- NULL: según COMMAND_TIMEOUTS
+            enabled BOOLEAN DEFAULT 1,
+            version INTEGER NOT NULL,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        """)
+        
+        # Duración de cada etapa de una interacción (grabar, transcribir, LLM...)
+        conn.execute("""
+        CREATE TABLE IF NOT EXISTS interaction_spans (
+            span_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            interaction_id INTEGER NOT NULL,
+            timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            stage TEXT NOT NULL,
+            start_offset REAL,  -- segundos desde el inicio del turno
+            duration REAL NOT NULL,
+            FOREIGN KEY (interaction_id) REFERENCES interactions(interaction_id)
+        )
+        """)
+        
+        # Plazo de respuesta de cada turno de IA (informes de SLO)
+        conn.execute("""
+        CREATE TABLE IF NOT EXISTS response_deadlines (
+            deadline_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            interaction_id INTEGER,
+            timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            budget REAL NOT NULL,  -- segundos permitidos hasta la primera frase
+            first_sentence REAL,  -- segundos hasta la primera frase (NULL si no llegó)
+            missed BOOLEAN NOT NULL,
+            outcome TEXT NOT NULL,  -- 'on_time', 'streamed', 'cached', 'small_model', 'late'
+            FOREIGN KEY (interaction_id) REFERENCES interactions(interaction_id)
+        )
+        """)
+        
+        # Fila de cada embedding en la matriz de VectorStore (en orden de inserción)
+        conn.execute("""
+        CREATE TABLE IF NOT EXISTS context_vectors (
+            row_index INTEGER PRIMARY KEY,  -- fila en el archivo de vectores
+            context_id INTEGER NOT NULL UNIQUE,
+            FOREIGN KEY (context_id) REFERENCES conversation_context(context_id)
+        )
+        """)
+        
+        # Índices de texto completo sincronizados por triggers
+        self._initialize_fts(conn)
+        
+        # Índice invertido de palabras clave del contexto RAG
+        self._initialize_keywords(conn)
+        
+        # Migración: bases creadas antes de registrar la duración de los comandos
+        command_columns = {row[1] for row in conn.execute("PRAGMA table_info(commands)")}
+        if 'duration' not in command_columns:
+            conn.execute("ALTER TABLE commands ADD COLUMN duration REAL")
+        
         # Crear índices para optimizar consultas
-        self.cursor.execute("""
+        conn.execute("""
         CREATE INDEX IF NOT EXISTS idx_interactions_session 
         ON interactions(session_id)
         """)
         
-        self.cursor.execute("""
+        conn.execute("""
         CREATE INDEX IF NOT EXISTS idx_interactions_timestamp 
         ON interactions(timestamp)
         """)
         
-        self.cursor.execute("""
+        conn.execute("""
         CREATE INDEX IF NOT EXISTS idx_commands_timestamp 
         ON commands(timestamp)
         """)
         
-        self.cursor.execute("""
-        CREATE INDEX IF NOT EXISTS idx_reminders_status 
-        ON reminders(status)
+        # Recuperación de memoria conversacional: últimos turnos por tipo
+        conn.execute("""
+        CREATE INDEX IF NOT EXISTS idx_interactions_type_id 
+        ON interactions(response_type, interaction_id)
+        """)
+        
+        # Recarga incremental del registro y contadores de uso por comando
+        conn.execute("""
+        CREATE INDEX IF NOT EXISTS idx_registry_version 
+        ON commands_registry(version)
+        """)
+        
+        conn.execute("""
+        CREATE INDEX IF NOT EXISTS idx_commands_keyword 
+        ON commands(command_keyword, success)
+        """)
+        
+        # Informe de latencias por etapa y periodo
+        conn.execute("""
+        CREATE INDEX IF NOT EXISTS idx_spans_stage_time 
+        ON interaction_spans(stage, timestamp)
+        """)
+        
+        conn.execute("""
+        CREATE INDEX IF NOT EXISTS idx_spans_interaction 
+        ON interaction_spans(interaction_id)
+        """)
+        
+        conn.execute("""
+        CREATE INDEX IF NOT EXISTS idx_deadlines_time 
+        ON response_deadlines(timestamp, missed)
         """)
         
-        self.conn.commit()
+        # Respuestas ya dadas a la misma pregunta (respaldo si el LLM no llega a tiempo)
+        conn.execute("""
+        CREATE INDEX IF NOT EXISTS idx_interactions_input 
+        ON interactions(user_input COLLATE NOCASE, response_type)
+        """)
+        
+        # Carga de recordatorios pendientes por ventana de tiempo (sin recorrer la tabla)
+        conn.execute("DROP INDEX IF EXISTS idx_reminders_status")
+        conn.execute("""
+        CREATE INDEX IF NOT EXISTS idx_reminders_due 
+        ON reminders(status, scheduled_time)
+        """)
+    
+    def _initialize_fts(self, conn):
+        """
+        Crea las tablas FTS5 (de contenido externo: solo guardan el índice)
+        y los triggers que las mantienen al día; si la tabla es nueva,
+        indexa las filas ya existentes
+        """
+        existing = {row[0] for row in conn.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'table'"
+        )}
+        
+        for fts, (table, key, columns) in FTS_TABLES.items():
+            cols = ", ".join(columns)
+            new_values = ", ".join(f"new.{c}" for c in columns)
+            old_values = ", ".join(f"old.{c}" for c in columns)
+            
+            conn.execute(f"""
+            CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5(
+                {cols}, content='{table}', content_rowid='{key}',
+                tokenize='{FTS_TOKENIZER}'
+            )
+            """)
+            conn.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS {fts}_insert AFTER INSERT ON {table} BEGIN
+                INSERT INTO {fts} (rowid, {cols}) VALUES (new.{key}, {new_values});
+            END
+            """)
+            conn.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS {fts}_delete AFTER DELETE ON {table} BEGIN
+                INSERT INTO {fts} ({fts}, rowid, {cols}) VALUES ('delete', old.{key}, {old_values});
+            END
+            """)
+            conn.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS {fts}_update AFTER UPDATE OF {cols} ON {table} BEGIN
+                INSERT INTO {fts} ({fts}, rowid, {cols}) VALUES ('delete', old.{key}, {old_values});
+                INSERT INTO {fts} (rowid, {cols}) VALUES (new.{key}, {new_values});
+            END
+            """)
+            
+            if fts not in existing:
+                conn.execute(f"INSERT INTO {fts} ({fts}) VALUES ('rebuild')")
+                if self.logger:
+                    self.logger.main_logger.info(f"🔎 Índice de texto completo creado: {fts}")
+    
+    def _initialize_keywords(self, conn):
+        """
+        Crea context_keywords (palabra clave -> contextos que la tienen) y,
+        si es nueva, la rellena con las palabras clave de los contextos
+        existentes (recalculadas: las antiguas no estaban normalizadas)
+        """
+        is_new = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'context_keywords'"
+        ).fetchone() is None
+        
+        # La clave primaria (keyword, context_id) es el índice de búsqueda
+        conn.execute("""
+        CREATE TABLE IF NOT EXISTS context_keywords (
+            keyword TEXT NOT NULL,  -- raíz normalizada (text_utils.extract_keywords)
+            context_id INTEGER NOT NULL,
+            PRIMARY KEY (keyword, context_id),
+            FOREIGN KEY (context_id) REFERENCES conversation_context(context_id)
+        ) WITHOUT ROWID
+        """)
+        conn.execute("""
+        CREATE INDEX IF NOT EXISTS idx_context_keywords_context 
+        ON context_keywords(context_id)
+        """)
+        conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS context_keywords_delete AFTER DELETE ON conversation_context BEGIN
+            DELETE FROM context_keywords WHERE context_id = old.context_id;
+        END
+        """)
+        
+        if not is_new:
+            return
+        
+        # Por tramos: no se modifica la tabla mientras se recorre
+        last_id, indexed = 0, 0
+        while True:
+            rows = conn.execute("""
+            SELECT context_id, content FROM conversation_context
+            WHERE context_id > ? ORDER BY context_id LIMIT 5000
+            """, (last_id,)).fetchall()
+            if not rows:
+                break
+            
+            keywords = [(row[0], extract_keywords(row[1], CONTEXT_MAX_KEYWORDS)) for row in rows]
+            conn.executemany(
+                "UPDATE conversation_context SET keywords = ? WHERE context_id = ?",
+                [(json.dumps(words) if words else None, context_id) for context_id, words in keywords]
+            )
+            conn.executemany(
+                "INSERT OR IGNORE INTO context_keywords (keyword, context_id) VALUES (?, ?)",
+                [(word, context_id) for context_id, words in keywords for word in words]
+            )
+            last_id, indexed = rows[-1][0], indexed + len(rows)
+        
+        if indexed and self.logger:
+            self.logger.main_logger.info(f"🔑 Palabras clave indexadas: {indexed} contextos")
     
     # === MÉTODOS PARA SESIONES ===
     
@@ -193,11 +644,10 @@ class DatabaseManager:
         Returns:
             int: ID de la sesión creada
         """
-        self.cursor.execute("""
-        INSERT INTO sessions (start_time) VALUES (CURRENT_TIMESTAMP)
-        """)
-        self.conn.commit()
-        session_id = self.cursor.lastrowid
+        with self._write() as conn:
+            session_id = conn.execute("""
+            INSERT INTO sessions (start_time) VALUES (CURRENT_TIMESTAMP)
+            """).lastrowid
         
         if self.logger:
             self.logger.main_logger.info(f"📊 Nueva sesión creada: ID {session_id}")
@@ -212,22 +662,22 @@ class DatabaseManager:
             session_id: ID de la sesión
             stats: Diccionario con estadísticas (total_interactions, etc.)
         """
-        self.cursor.execute("""
-        UPDATE sessions 
-        SET end_time = CURRENT_TIMESTAMP,
-            total_interactions = ?,
-            total_commands = ?,
-            total_ai_responses = ?,
-            average_duration = ?
-        WHERE session_id = ?
-        """, (
-            stats.get('total_interactions', 0),
-            stats.get('total_commands', 0),
-            stats.get('total_ai_responses', 0),
-            stats.get('average_duration', 0),
-            session_id
-        ))
-        self.conn.commit()
+        with self._write() as conn:
+            conn.execute("""
+            UPDATE sessions 
+            SET end_time = CURRENT_TIMESTAMP,
+                total_interactions = ?,
+                total_commands = ?,
+                total_ai_responses = ?,
+                average_duration = ?
+            WHERE session_id = ?
+            """, (
+                stats.get('total_interactions', 0),
+                stats.get('total_commands', 0),
+                stats.get('total_ai_responses', 0),
+                stats.get('average_duration', 0),
+                session_id
+            ))
         
         if self.logger:
             self.logger.main_logger.info(f"📊 Sesión {session_id} finalizada")
@@ -236,7 +686,7 @@ class DatabaseManager:
     
     def save_interaction(self, session_id: int, user_input: str, response: str, 
                         response_type: str, duration: float = None, 
-                        model_used: str = None) -> int:
+                        model_used: str = None, commit: bool = True) -> int:
         """
         Guarda una interacción usuario-asistente
         
@@ -247,23 +697,104 @@ class DatabaseManager:
             response_type: 'command' o 'ai'
             duration: Tiempo de procesamiento
             model_used: Modelo de IA usado (si aplica)
+            commit: Confirmar la transacción (False al agrupar escrituras)
             
         Returns:
             int: ID de la interacción guardada
         """
-        self.cursor.execute("""
-        INSERT INTO interactions 
-        (session_id, user_input, response, response_type, duration, model_used)
-        VALUES (?, ?, ?, ?, ?, ?)
-        """, (session_id, user_input, response, response_type, duration, model_used))
-        self.conn.commit()
+        with self._write(commit) as conn:
+            interaction_id = conn.execute("""
+            INSERT INTO interactions 
+            (session_id, user_input, response, response_type, duration, model_used)
+            VALUES (?, ?, ?, ?, ?, ?)
+            """, (session_id, user_input, response, response_type, duration, model_used)).lastrowid
+            
+            # Actualizar estadísticas de uso
+            self._update_usage_stats(response_type, duration, commit=False)
         
-        interaction_id = self.cursor.lastrowid
+        return interaction_id
+    
+    def save_spans(self, interaction_id: int, spans: List[tuple], commit: bool = True):
+        """
+        Guarda las etapas medidas de una interacción en una sola sentencia
         
-        # Actualizar estadísticas de uso
-        self._update_usage_stats(response_type, duration)
+        Args:
+            interaction_id: ID de la interacción
+            spans: Tuplas (etapa, inicio relativo, duración) en segundos
+            commit: Confirmar la transacción (False al agrupar escrituras)
+        """
+        if not spans:
+            return
+        
+        with self._write(commit) as conn:
+            conn.executemany("""
+            INSERT INTO interaction_spans (interaction_id, stage, start_offset, duration)
+            VALUES (?, ?, ?, ?)
+            """, [(interaction_id, stage, start, duration) for stage, start, duration in spans])
+    
+    def save_deadline(self, interaction_id: int, record: Dict, commit: bool = True):
+        """
+        Guarda el resultado del plazo de respuesta de un turno de IA
         
-        return interaction_id
+        Args:
+            interaction_id: ID de la interacción
+            record: Diccionario con 'budget', 'first_sentence', 'missed' y 'outcome'
+            commit: Confirmar la transacción (False al agrupar escrituras)
+        """
+        with self._write(commit) as conn:
+            conn.execute("""
+            INSERT INTO response_deadlines (interaction_id, budget, first_sentence, missed, outcome)
+            VALUES (?, ?, ?, ?, ?)
+            """, (interaction_id, record['budget'], record['first_sentence'],
+                  record['missed'], record['outcome']))
+    
+    def get_deadline_stats(self, days: int = 7) -> Dict:
+        """
+        Resume el cumplimiento del plazo de respuesta de los últimos N días
+        
+        Args:
+            days: Número de días a analizar
+            
+        Returns:
+            Diccionario con turnos, fallos, tasa de fallo y recuento por resultado
+        """
+        rows = self.conn.execute("""
+        SELECT outcome, missed, COUNT(*) as count
+        FROM response_deadlines
+        WHERE timestamp >= DATETIME('now', ?)
+        GROUP BY outcome, missed
+        """, (f"-{days} days",)).fetchall()
+        
+        turns = sum(row['count'] for row in rows)
+        misses = sum(row['count'] for row in rows if row['missed'])
+        return {
+            'turns': turns,
+            'misses': misses,
+            'miss_rate': misses / turns if turns else 0.0,
+            'outcomes': {row['outcome']: row['count'] for row in rows}
+        }
+    
+    def find_cached_response(self, user_input: str, max_age: float = None) -> Optional[str]:
+        """
+        Busca la última respuesta de IA dada a la misma pregunta
+        
+        Args:
+            user_input: Texto del usuario (sin distinguir mayúsculas)
+            max_age: Antigüedad máxima en segundos (None: sin límite)
+            
+        Returns:
+            str or None: Respuesta guardada
+        """
+        age_filter = "AND timestamp >= DATETIME('now', ?)" if max_age is not None else ""
+        params = (user_input.strip(),) + ((f"-{int(max_age)} seconds",) if max_age is not None else ())
+        row = self.conn.execute(f"""
+        SELECT response FROM interactions
+        WHERE user_input = ? COLLATE NOCASE AND response_type = 'ai' {age_filter}
+        ORDER BY interaction_id DESC
+        LIMIT 1
+        """, params).fetchone()
+        
+        return row['response'] if row else None
     
     def get_recent_interactions(self, limit: int = 10) -> List[Dict]:
         """
@@ -275,54 +806,187 @@ class DatabaseManager:
         Returns:
             Lista de diccionarios con datos de interacciones
         """
-        self.cursor.execute("""
+        rows = self.conn.execute("""
         SELECT * FROM interactions 
         ORDER BY timestamp DESC 
         LIMIT ?
-        """, (limit,))
+        """, (limit,)).fetchall()
         
-        return [dict(row) for row in self.cursor.fetchall()]
+        return [dict(row) for row in rows]
+    
+    def get_recent_turns(self, limit: int = 10, before_id: int = None,
+                         response_type: Optional[str] = 'ai') -> List[Dict]:
+        """
+        Obtiene los últimos turnos para restaurar la memoria conversacional.
+        
+        Recorre el índice (response_type, interaction_id) hacia atrás y se
+        detiene en `limit` filas, así que el coste no depende del tamaño de
+        la tabla.
+        
+        Args:
+            limit: Número máximo de turnos
+            before_id: Solo turnos anteriores a este interaction_id (paginación)
+            response_type: 'ai', 'command' o None para todos
+            
+        Returns:
+            Lista de turnos del más reciente al más antiguo
+        """
+        conditions = []
+        params = []
+        
+        if response_type:
+            conditions.append("response_type = ?")
+            params.append(response_type)
+        
+        if before_id is not None:
+            conditions.append("interaction_id < ?")
+            params.append(before_id)
+        
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        
+        rows = self.conn.execute(f"""
+        SELECT interaction_id, session_id, timestamp, user_input, response
+        FROM interactions
+        {where}
+        ORDER BY interaction_id DESC
+        LIMIT ?
+        """, (*params, limit)).fetchall()
+        
+        return [dict(row) for row in rows]
     
     def search_interactions(self, keyword: str, limit: int = 20) -> List[Dict]:
         """
-        Busca interacciones que contengan una palabra clave
+        Busca interacciones por sus palabras (índice interactions_fts)
+        
+        Ordena por BM25 (el texto del usuario pesa el doble que la
+        respuesta) ponderado por antigüedad.
         
         Args:
             keyword: Palabra o frase a buscar
             limit: Número máximo de resultados
             
         Returns:
-            Lista de interacciones relevantes
+            Lista de interacciones relevantes (con su 'score')
         """
-        self.cursor.execute("""
-        SELECT * FROM interactions 
-        WHERE user_input LIKE ? OR response LIKE ?
-        ORDER BY timestamp DESC
+        match = fts_query(keyword)
+        if not match:
+            return []
+        
+        rows = self.conn.execute("""
+        SELECT i.*, -f.bm25 / (1.0 + (julianday('now') - julianday(i.timestamp)) / ?) AS score
+        FROM (
+            SELECT rowid, bm25(interactions_fts, 2.0, 1.0) AS bm25
+            FROM interactions_fts
+            WHERE interactions_fts MATCH ?
+            ORDER BY bm25
+            LIMIT ?
+        ) f
+        JOIN interactions i ON i.interaction_id = f.rowid
+        ORDER BY score DESC
         LIMIT ?
-        """, (f'%{keyword}%', f'%{keyword}%', limit))
+        """, (SEARCH_RECENCY_DAYS, match, max(SEARCH_CANDIDATES, limit), limit)).fetchall()
         
-        return [dict(row) for row in self.cursor.fetchall()]
+        return [dict(row) for row in rows]
+    
+    def import_interactions(self, session_id: int, turns: List[Dict],
+                            save_context: bool = False) -> List[int]:
+        """
+        Inserta muchas interacciones de una vez (importaciones, migraciones)
+        
+        Usa executemany en una sola transacción. No actualiza usage_stats:
+        son turnos históricos, no actividad de esta hora.
+        
+        Args:
+            session_id: Sesión a la que se asignan
+            turns: Diccionarios con user_input, response y opcionalmente
+                response_type ('ai'), duration, model_used y timestamp
+            save_context: Guardar también su contexto RAG (turnos de IA)
+            
+        Returns:
+            IDs de las interacciones insertadas, en orden
+        """
+        if not turns:
+            return []
+        
+        rows = [(
+            session_id,
+            turn.get('timestamp') or datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            turn['user_input'],
+            turn['response'],
+            turn.get('response_type', 'ai'),
+            turn.get('duration'),
+            turn.get('model_used')
+        ) for turn in turns]
+        
+        with self.transaction() as conn:
+            conn.executemany("""
+            INSERT INTO interactions 
+            (session_id, timestamp, user_input, response, response_type, duration, model_used)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+            """, rows)
+            
+            # Con el escritor en exclusiva, los IDs de AUTOINCREMENT son consecutivos
+            last_id = conn.execute("SELECT last_insert_rowid()").fetchone()[0]
+            ids = list(range(last_id - len(rows) + 1, last_id + 1))
+            
+            if save_context:
+                contexts = []
+                for interaction_id, row in zip(ids, rows):
+                    if row[4] == 'ai':
+                        content = f"Usuario: {row[2]}\nAsistente: {row[3]}"
+                        contexts.append((interaction_id, content,
+                                         extract_keywords(content, CONTEXT_MAX_KEYWORDS),
+                                         0.7 if len(row[3]) > 100 else 0.5, row[1]))
+                
+                conn.executemany("""
+                INSERT INTO conversation_context 
+                (interaction_id, content, keywords, importance_score, timestamp)
+                VALUES (?, ?, ?, ?, ?)
+                """, [
+                    (interaction_id, content, json.dumps(keywords) if keywords else None,
+                     importance, timestamp)
+                    for interaction_id, content, keywords, importance, timestamp in contexts
+                ])
+                
+                # Contextos también consecutivos: se indexan sus palabras clave
+                last_context = conn.execute("SELECT last_insert_rowid()").fetchone()[0]
+                conn.executemany(
+                    "INSERT OR IGNORE INTO context_keywords (keyword, context_id) VALUES (?, ?)",
+                    [(keyword, context_id)
+                     for context_id, context in enumerate(contexts, last_context - len(contexts) + 1)
+                     for keyword in context[2]]
+                )
+        
+        if save_context and self.vector_store:
+            self.vector_store.notify()
+        return ids
     
     # === MÉTODOS PARA COMANDOS ===
     
     def save_command(self, interaction_id: int, command_keyword: str, 
-                     action_type: str, result: str, success: bool = True):
+                     action_type: str, result: str, success: bool = True,
+                     duration: float = None, commit: bool = True):
         """
         Guarda un comando ejecutado
         
+        Se llama desde los hilos de comandos: espera a que el escritor
+        quede libre si otro hilo tiene una transacción abierta.
+        
         Args:
             interaction_id: ID de la interacción asociada
             command_keyword: Palabra clave del comando
             action_type: Tipo de acción ejecutada
             result: Resultado de la ejecución
             success: Si el comando se ejecutó correctamente
+            duration: Segundos que tardó la acción
+            commit: Confirmar la transacción (False al agrupar escrituras)
         """
-        self.cursor.execute("""
-        INSERT INTO commands 
-        (interaction_id, command_keyword, action_type, result, success)
-        VALUES (?, ?, ?, ?, ?)
-        """, (interaction_id, command_keyword, action_type, result, success))
-        self.conn.commit()
+        with self._write(commit) as conn:
+            conn.execute("""
+            INSERT INTO commands 
+            (interaction_id, command_keyword, action_type, result, success, duration)
+            VALUES (?, ?, ?, ?, ?, ?)
+            """, (interaction_id, command_keyword, action_type, result, success, duration))
     
     def get_most_used_commands(self, limit: int = 10) -> List[Dict]:
         """
@@ -334,20 +998,147 @@ class DatabaseManager:
         Returns:
             Lista de comandos ordenados por frecuencia
         """
-        self.cursor.execute("""
+        rows = self.conn.execute("""
         SELECT command_keyword, COUNT(*) as usage_count,
                MAX(timestamp) as last_used
         FROM commands
         GROUP BY command_keyword
         ORDER BY usage_count DESC
         LIMIT ?
-        """, (limit,))
+        """, (limit,)).fetchall()
+        
+        return [dict(row) for row in rows]
+    
+    def get_command_usage_counts(self) -> Dict[str, int]:
+        """
+        Cuenta las ejecuciones correctas de cada comando
+        
+        Returns:
+            Diccionario palabra clave -> número de usos
+        """
+        rows = self.conn.execute("""
+        SELECT command_keyword, COUNT(*) FROM commands
+        WHERE success = 1
+        GROUP BY command_keyword
+        """).fetchall()
+        
+        return {keyword: count for keyword, count in rows}
+    
+    # === MÉTODOS PARA EL REGISTRO DE COMANDOS ===
+    
+    def seed_command_registry(self, commands: Dict[str, Dict]) -> int:
+        """
+        Añade al registro los comandos por defecto que aún no tiene
+        
+        Se llama en cada arranque: los comandos nuevos de SYSTEM_COMMANDS
+        llegan a bases ya creadas, y los existentes (editados o dados de
+        baja con enabled = 0) no se tocan.
+        
+        Args:
+            commands: Palabra clave -> {"action", "args", ...}
+            
+        Returns:
+            Número de comandos insertados
+        """
+        inserted = 0
+        with self._write() as conn:
+            for keyword, data in commands.items():
+                args = data.get("args")
+                if args is not None and not isinstance(args, str):
+                    args = json.dumps(args, ensure_ascii=False)
+                inserted += conn.execute(f"""
+                INSERT OR IGNORE INTO commands_registry
+                    (keyword, action, args, sync, timeout, enabled, version, updated_at)
+                VALUES (?, ?, ?, ?, ?, 1, ({NEXT_REGISTRY_VERSION_SQL}), CURRENT_TIMESTAMP)
+                """, (keyword.lower(), data.get("action"), args, data.get("sync"),
+                      data.get("timeout"))).rowcount
+        
+        return inserted
+    
+    def register_command(self, keyword: str, action: str, args: str = None,
+                         sync: bool = None, timeout: float = None,
+                         commit: bool = True) -> int:
+        """
+        Crea o actualiza un comando del registro
+        
+        Args:
+            keyword: Palabra clave (se guarda en minúsculas)
+            action: Tipo de acción
+            args: Argumentos de la acción (listas, como los pasos de una macro, se guardan en JSON)
+            sync: Forzar ejecución síncrona (None: valor por defecto de la acción)
+            timeout: Tiempo límite propio (None: valor por defecto de la acción)
+            commit: Confirmar la transacción
+            
+        Returns:
+            Versión asignada al cambio
+        """
+        if args is not None and not isinstance(args, str):
+            args = json.dumps(args, ensure_ascii=False)
+        
+        # La versión se calcula dentro de la sentencia: atómica frente a otros escritores
+        with self._write(commit) as conn:
+            conn.execute(f"""
+            INSERT INTO commands_registry (keyword, action, args, sync, timeout, enabled, version, updated_at)
+            VALUES (?, ?, ?, ?, ?, 1, ({NEXT_REGISTRY_VERSION_SQL}), CURRENT_TIMESTAMP)
+            ON CONFLICT(keyword) DO UPDATE SET
+                action = excluded.action, args = excluded.args, sync = excluded.sync,
+                timeout = excluded.timeout, enabled = 1, version = excluded.version,
+                updated_at = CURRENT_TIMESTAMP
+            """, (keyword.lower(), action, args, sync, timeout))
+            version = conn.execute(
+                "SELECT version FROM commands_registry WHERE keyword = ?", (keyword.lower(),)
+            ).fetchone()[0]
+        
+        return version
+    
+    def unregister_command(self, keyword: str) -> bool:
+        """
+        Da de baja un comando del registro (queda marcado para la recarga)
+        
+        Args:
+            keyword: Palabra clave
+            
+        Returns:
+            True si el comando estaba activo
+        """
+        with self._write() as conn:
+            cursor = conn.execute(f"""
+            UPDATE commands_registry
+            SET enabled = 0, version = ({NEXT_REGISTRY_VERSION_SQL}), updated_at = CURRENT_TIMESTAMP
+            WHERE keyword = ? AND enabled = 1
+            """, (keyword.lower(),))
+        
+        return cursor.rowcount > 0
+    
+    def get_registry_version(self) -> int:
+        """Versión del último cambio del registro (consulta sobre índice)"""
+        return self.conn.execute(
+            "SELECT COALESCE(MAX(version), 0) FROM commands_registry"
+        ).fetchone()[0]
+    
+    def get_registry_changes(self, since_version: int = 0) -> List[Dict]:
+        """
+        Obtiene los comandos modificados después de una versión
         
-        return [dict(row) for row in self.cursor.fetchall()]
+        Args:
+            since_version: Última versión ya cargada (0 para todo el registro)
+            
+        Returns:
+            Lista de comandos (incluye bajas con enabled = 0) ordenada por versión
+        """
+        rows = self.conn.execute("""
+        SELECT keyword, action, args, sync, timeout, enabled, version
+        FROM commands_registry
+        WHERE version > ?
+        ORDER BY version
+        """, (since_version,)).fetchall()
+        
+        return [dict(row) for row in rows]
     
     # === MÉTODOS PARA PREFERENCIAS ===
     
-    def set_preference(self, key: str, value: Any, data_type: str = 'string'):
+    def set_preference(self, key: str, value: Any, data_type: str = 'string',
+                       commit: bool = True):
         """
         Guarda o actualiza una preferencia del usuario
         
@@ -355,6 +1146,7 @@ class DatabaseManager:
             key: Nombre de la preferencia
             value: Valor (será convertido a JSON si no es string)
             data_type: Tipo de dato ('string', 'int', 'float', 'json')
+            commit: Confirmar la transacción (False al agrupar escrituras)
         """
         if data_type == 'json' or isinstance(value, (dict, list)):
             value = json.dumps(value)
@@ -362,11 +1154,11 @@ class DatabaseManager:
         elif not isinstance(value, str):
             value = str(value)
         
-        self.cursor.execute("""
-        INSERT OR REPLACE INTO user_preferences (key, value, data_type, updated_at)
-        VALUES (?, ?, ?, CURRENT_TIMESTAMP)
-        """, (key, value, data_type))
-        self.conn.commit()
+        with self._write(commit) as conn:
+            conn.execute("""
+            INSERT OR REPLACE INTO user_preferences (key, value, data_type, updated_at)
+            VALUES (?, ?, ?, CURRENT_TIMESTAMP)
+            """, (key, value, data_type))
         
         if self.logger:
             self.logger.main_logger.info(f"⚙️ Preferencia guardada: {key} = {value}")
@@ -382,11 +1174,9 @@ class DatabaseManager:
         Returns:
             Valor de la preferencia o default
         """
-        self.cursor.execute("""
+        result = self.conn.execute("""
         SELECT value, data_type FROM user_preferences WHERE key = ?
-        """, (key,))
-        
-        result = self.cursor.fetchone()
+        """, (key,)).fetchone()
         if not result:
             return default
         
@@ -409,10 +1199,10 @@ class DatabaseManager:
         Returns:
             Diccionario con todas las preferencias
         """
-        self.cursor.execute("SELECT key, value, data_type FROM user_preferences")
+        rows = self.conn.execute("SELECT key, value, data_type FROM user_preferences").fetchall()
         
         preferences = {}
-        for row in self.cursor.fetchall():
+        for row in rows:
             key, value, data_type = row
             if data_type == 'json':
                 preferences[key] = json.loads(value)
@@ -428,7 +1218,8 @@ class DatabaseManager:
     # === MÉTODOS PARA RECORDATORIOS ===
     
     def create_reminder(self, task: str, scheduled_time: str = None, 
-                       priority: int = 0, notes: str = None) -> int:
+                       priority: int = 0, notes: str = None,
+                       commit: bool = True) -> int:
         """
         Crea un recordatorio
         
@@ -437,17 +1228,16 @@ class DatabaseManager:
             scheduled_time: Fecha/hora programada (formato ISO)
             priority: Nivel de prioridad (0-5)
             notes: Notas adicionales
+            commit: Confirmar la transacción (False al agrupar escrituras)
             
         Returns:
             ID del recordatorio creado
         """
-        self.cursor.execute("""
-        INSERT INTO reminders (task, scheduled_time, priority, notes)
-        VALUES (?, ?, ?, ?)
-        """, (task, scheduled_time, priority, notes))
-        self.conn.commit()
-        
-        reminder_id = self.cursor.lastrowid
+        with self._write(commit) as conn:
+            reminder_id = conn.execute("""
+            INSERT INTO reminders (task, scheduled_time, priority, notes)
+            VALUES (?, ?, ?, ?)
+            """, (task, scheduled_time, priority, notes)).lastrowid
         
         if self.logger:
             self.logger.main_logger.info(f"📅 Recordatorio creado: {task}")
@@ -461,69 +1251,272 @@ class DatabaseManager:
         Returns:
             Lista de recordatorios pendientes
         """
-        self.cursor.execute("""
+        rows = self.conn.execute("""
         SELECT * FROM reminders 
         WHERE status = 'pending'
         ORDER BY scheduled_time ASC, priority DESC
-        """)
+        """).fetchall()
         
-        return [dict(row) for row in self.cursor.fetchall()]
+        return [dict(row) for row in rows]
     
-    def complete_reminder(self, reminder_id: int):
+    def get_scheduled_reminders(self, until: str, after: str = None) -> List[Dict]:
+        """
+        Obtiene los recordatorios pendientes con hora en (after, until],
+        ordenados por hora (rango sobre idx_reminders_due)
+        
+        Args:
+            until: Hora límite incluida (formato 'YYYY-MM-DD HH:MM:SS')
+            after: Hora límite excluida (None: también los ya vencidos)
+            
+        Returns:
+            Lista de recordatorios
+        """
+        rows = self.conn.execute("""
+        SELECT reminder_id, task, scheduled_time, priority
+        FROM reminders
+        WHERE status = 'pending' AND scheduled_time > ? AND scheduled_time <= ?
+        ORDER BY scheduled_time
+        """, (after or "", until)).fetchall()
+        
+        return [dict(row) for row in rows]
+    
+    def complete_reminder(self, reminder_id: int, commit: bool = True):
         """Marca un recordatorio como completado"""
-        self.cursor.execute("""
-        UPDATE reminders 
-        SET status = 'completed', completed_at = CURRENT_TIMESTAMP
-        WHERE reminder_id = ?
-        """, (reminder_id,))
-        self.conn.commit()
+        # Lo llama el hilo del planificador de recordatorios
+        with self._write(commit) as conn:
+            conn.execute("""
+            UPDATE reminders 
+            SET status = 'completed', completed_at = CURRENT_TIMESTAMP
+            WHERE reminder_id = ?
+            """, (reminder_id,))
     
     # === MÉTODOS PARA CONTEXTO CONVERSACIONAL (RAG) ===
     
     def save_context(self, interaction_id: int, content: str, 
-                     keywords: List[str] = None, importance: float = 0.5):
+                     keywords: List[str] = None, importance: float = 0.5,
+                     commit: bool = True):
         """
         Guarda contexto conversacional para RAG
         
+        Las palabras clave se guardan en la columna keywords (JSON) y en el
+        índice context_keywords que usa search_context.
+        
         Args:
             interaction_id: ID de la interacción
             content: Contenido a guardar
-            keywords: Lista de palabras clave
+            keywords: Palabras clave ya normalizadas (text_utils.extract_keywords);
+                si no se pasan, se extraen del contenido
             importance: Score de importancia (0-1)
+            commit: Confirmar la transacción (False al agrupar escrituras)
         """
+        if keywords is None:
+            keywords = extract_keywords(content, CONTEXT_MAX_KEYWORDS)
         keywords_json = json.dumps(keywords) if keywords else None
         
-        self.cursor.execute("""
-        INSERT INTO conversation_context 
-        (interaction_id, content, keywords, importance_score)
-        VALUES (?, ?, ?, ?)
-        """, (interaction_id, content, keywords_json, importance))
-        self.conn.commit()
+        with self._write(commit) as conn:
+            context_id = conn.execute("""
+            INSERT INTO conversation_context 
+            (interaction_id, content, keywords, importance_score)
+            VALUES (?, ?, ?, ?)
+            """, (interaction_id, content, keywords_json, importance)).lastrowid
+            
+            conn.executemany(
+                "INSERT OR IGNORE INTO context_keywords (keyword, context_id) VALUES (?, ?)",
+                [(keyword, context_id) for keyword in keywords]
+            )
+        
+        # El embedding se calcula en segundo plano, agrupado con los siguientes
+        if self.vector_store:
+            self.vector_store.notify()
     
     def search_context(self, query: str, limit: int = 5) -> List[Dict]:
         """
-        Busca contexto relevante para RAG
+        Busca contexto relevante para RAG en los índices del contexto
+        
+        Cada vía da sus SEARCH_CANDIDATES mejores contextos, ordenados por
+        su relevancia x (0.5 + importancia) x peso por antigüedad (la mitad
+        a los SEARCH_RECENCY_DAYS días):
+        
+        - Texto completo (context_fts): BM25 de los términos de la
+          consulta, sin acentos.
+        - Palabras clave (context_keywords): cuántas raíces de la consulta
+          comparte cada contexto; une singular y plural, masculino y
+          femenino, que FTS5 trata como palabras distintas.
+        - Significado, si hay un VectorStore asignado (self.vector_store).
+        
+        Las listas se fusionan por rangos (1 / (SEARCH_RRF_K + posición)),
+        así que un resultado encontrado por varias vías sube sin comparar
+        escalas. El coste depende de las coincidencias, no del tamaño de
+        la tabla.
         
         Args:
             query: Consulta a buscar
             limit: Número máximo de resultados
             
         Returns:
-            Lista de contextos relevantes ordenados por importancia
+            Lista de contextos relevantes (con su 'score'), del más relevante al menos
         """
-        self.cursor.execute("""
-        SELECT * FROM conversation_context
-        WHERE content LIKE ?
-        ORDER BY importance_score DESC, timestamp DESC
+        semantic = self.vector_store.search(query) if self.vector_store else []
+        rankings = [
+            self._search_lexical(query, SEARCH_CANDIDATES),
+            self._search_keywords(query, SEARCH_CANDIDATES),
+            self._rank_semantic(semantic) if semantic else []
+        ]
+        
+        rankings = [ranking for ranking in rankings if ranking]
+        if len(rankings) <= 1:
+            return rankings[0][:limit] if rankings else []
+        return self._fuse_results(rankings, limit)
+    
+    def _search_lexical(self, query: str, limit: int) -> List[Dict]:
+        """Mejores contextos por BM25, importancia y antigüedad (índice context_fts)"""
+        match = fts_query(query)
+        if not match:
+            return []
+        
+        # Conexión de lectura del hilo: se consulta en paralelo con el hilo de persistencia
+        rows = self.conn.execute("""
+        SELECT c.*,
+               -f.rank * (0.5 + c.importance_score)
+                   / (1.0 + (julianday('now') - julianday(c.timestamp)) / ?) AS score
+        FROM (
+            SELECT rowid, rank FROM context_fts
+            WHERE context_fts MATCH ?
+            ORDER BY rank
+            LIMIT ?
+        ) f
+        JOIN conversation_context c ON c.context_id = f.rowid
+        ORDER BY score DESC
         LIMIT ?
-        """, (f'%{query}%', limit))
+        """, (SEARCH_RECENCY_DAYS, match, max(SEARCH_CANDIDATES, limit), limit)).fetchall()
         
-        return [dict(row) for row in self.cursor.fetchall()]
+        return [dict(row) for row in rows]
+    
+    def _search_keywords(self, query: str, limit: int) -> List[Dict]:
+        """
+        Mejores contextos por palabras clave compartidas con la consulta,
+        importancia y antigüedad (índice context_keywords)
+        """
+        keywords = extract_keywords(query)
+        if not keywords:
+            return []
+        
+        # Solo se leen las entradas del índice de esas raíces (sin recorrer la tabla)
+        rows = self.conn.execute(f"""
+        SELECT c.*, k.overlap,
+               k.overlap * (0.5 + c.importance_score)
+                   / (1.0 + (julianday('now') - julianday(c.timestamp)) / ?) AS score
+        FROM (
+            SELECT context_id, COUNT(*) AS overlap FROM context_keywords
+            WHERE keyword IN ({", ".join("?" * len(keywords))})
+            GROUP BY context_id
+            ORDER BY overlap DESC, context_id DESC
+            LIMIT ?
+        ) k
+        JOIN conversation_context c ON c.context_id = k.context_id
+        ORDER BY score DESC
+        LIMIT ?
+        """, (SEARCH_RECENCY_DAYS, *keywords, max(SEARCH_CANDIDATES, limit), limit)).fetchall()
+        
+        return [dict(row) for row in rows]
+    
+    def _rank_semantic(self, hits: List[tuple]) -> List[Dict]:
+        """
+        Contextos de una búsqueda semántica ordenados por similitud x
+        (0.5 + importancia) x peso por antigüedad (como los léxicos)
+        
+        Args:
+            hits: Pares (context_id, similitud coseno)
+        """
+        similarity = dict(hits)
+        rows = self.conn.execute(f"""
+        SELECT c.*, 1.0 / (1.0 + (julianday('now') - julianday(c.timestamp)) / ?) AS recency
+        FROM conversation_context c
+        WHERE c.context_id IN ({", ".join("?" * len(similarity))})
+        """, (SEARCH_RECENCY_DAYS, *similarity)).fetchall()
+        
+        ranked = []
+        for row in rows:
+            context = dict(row)
+            context['similarity'] = similarity[context['context_id']]
+            context['score'] = (context['similarity'] * (0.5 + context['importance_score'])
+                                * context.pop('recency'))
+            ranked.append(context)
+        
+        ranked.sort(key=lambda context: context['score'], reverse=True)
+        return ranked
+    
+    @staticmethod
+    def _fuse_results(rankings: List[List[Dict]], limit: int) -> List[Dict]:
+        """Fusión por rangos recíprocos de varias listas de contextos ordenadas"""
+        fused = {}
+        for results in rankings:
+            for position, context in enumerate(results):
+                entry = fused.setdefault(context['context_id'], {**context, 'score': 0.0})
+                entry.update({k: v for k, v in context.items() if k != 'score'})
+                entry['score'] += 1.0 / (SEARCH_RRF_K + position + 1)
+        
+        return sorted(fused.values(), key=lambda context: context['score'], reverse=True)[:limit]
+    
+    # === MÉTODOS PARA EMBEDDINGS (VectorStore) ===
+    
+    def get_contexts_to_embed(self, after_id: int, limit: int) -> List[Dict]:
+        """
+        Contextos posteriores al último con embedding (en orden de inserción)
+        
+        Args:
+            after_id: Último context_id ya convertido
+            limit: Número máximo de contextos
+            
+        Returns:
+            Lista de diccionarios con context_id y content
+        """
+        rows = self.conn.execute("""
+        SELECT context_id, content FROM conversation_context
+        WHERE context_id > ?
+        ORDER BY context_id
+        LIMIT ?
+        """, (after_id, limit)).fetchall()
+        
+        return [dict(row) for row in rows]
+    
+    def get_vector_ids(self) -> List[int]:
+        """context_id de cada fila de la matriz de vectores, en orden"""
+        return [row[0] for row in self.conn.execute(
+            "SELECT context_id FROM context_vectors ORDER BY row_index"
+        )]
+    
+    def save_vector_ids(self, first_row: int, context_ids: List[int], commit: bool = True):
+        """
+        Registra las filas de la matriz que ocupan unos embeddings nuevos
+        
+        Args:
+            first_row: Fila del primero (las demás son consecutivas)
+            context_ids: Contextos convertidos, en el orden en que se añadieron
+            commit: Confirmar la transacción (False al agrupar escrituras)
+        """
+        with self._write(commit) as conn:
+            conn.executemany(
+                "INSERT INTO context_vectors (row_index, context_id) VALUES (?, ?)",
+                enumerate(context_ids, start=first_row)
+            )
+    
+    def trim_vector_ids(self, rows: int, commit: bool = True) -> int:
+        """
+        Olvida las filas a partir de `rows` (matriz truncada o reconstruida)
+        
+        Returns:
+            int: Filas eliminadas del mapa
+        """
+        with self._write(commit) as conn:
+            return conn.execute(
+                "DELETE FROM context_vectors WHERE row_index >= ?", (rows,)
+            ).rowcount
     
     # === MÉTODOS PARA ERRORES ===
     
     def log_error(self, error_type: str, error_message: str, 
-                  module: str = None, stack_trace: str = None):
+                  module: str = None, stack_trace: str = None, commit: bool = True):
         """
         Registra un error en la base de datos
         
@@ -532,13 +1525,14 @@ class DatabaseManager:
             error_message: Mensaje del error
             module: Módulo donde ocurrió
             stack_trace: Stack trace completo
+            commit: Confirmar la transacción (False al agrupar escrituras)
         """
-        self.cursor.execute("""
-        INSERT INTO error_logs 
-        (error_type, error_message, module, stack_trace)
-        VALUES (?, ?, ?, ?)
-        """, (error_type, error_message, module, stack_trace))
-        self.conn.commit()
+        with self._write(commit) as conn:
+            conn.execute("""
+            INSERT INTO error_logs 
+            (error_type, error_message, module, stack_trace)
+            VALUES (?, ?, ?, ?)
+            """, (error_type, error_message, module, stack_trace))
     
     # === MÉTODOS DE ANÁLISIS ===
     
@@ -552,7 +1546,7 @@ class DatabaseManager:
         Returns:
             Diccionario con estadísticas
         """
-        self.cursor.execute("""
+        row = self.conn.execute("""
         SELECT 
             COUNT(*) as total_interactions,
             SUM(CASE WHEN response_type = 'command' THEN 1 ELSE 0 END) as commands,
@@ -562,40 +1556,75 @@ class DatabaseManager:
             MAX(timestamp) as last_interaction
         FROM interactions
         WHERE timestamp >= datetime('now', '-' || ? || ' days')
-        """, (days,))
-        
-        row = self.cursor.fetchone()
+        """, (days,)).fetchone()
         return dict(row) if row else {}
     
-    def _update_usage_stats(self, response_type: str, duration: float):
+    def _update_usage_stats(self, response_type: str, duration: float, commit: bool = True):
         """Actualiza estadísticas de uso por hora"""
         current_hour = datetime.now().hour
         
-        self.cursor.execute("""
-        INSERT INTO usage_stats (date, hour, interaction_count, command_count, ai_response_count, avg_duration)
-        VALUES (DATE('now'), ?, 1, ?, ?, ?)
-        ON CONFLICT(date, hour) DO UPDATE SET
-            interaction_count = interaction_count + 1,
-            command_count = command_count + ?,
-            ai_response_count = ai_response_count + ?,
-            avg_duration = (avg_duration * interaction_count + ?) / (interaction_count + 1)
-        """, (
-            current_hour,
-            1 if response_type == 'command' else 0,
-            1 if response_type == 'ai' else 0,
-            duration or 0,
-            1 if response_type == 'command' else 0,
-            1 if response_type == 'ai' else 0,
-            duration or 0
-        ))
-        self.conn.commit()
+        with self._write(commit) as conn:
+            conn.execute("""
+            INSERT INTO usage_stats (date, hour, interaction_count, command_count, ai_response_count, avg_duration)
+            VALUES (DATE('now'), ?, 1, ?, ?, ?)
+            ON CONFLICT(date, hour) DO UPDATE SET
+                interaction_count = interaction_count + 1,
+                command_count = command_count + ?,
+                ai_response_count = ai_response_count + ?,
+                avg_duration = (avg_duration * interaction_count + ?) / (interaction_count + 1)
+            """, (
+                current_hour,
+                1 if response_type == 'command' else 0,
+                1 if response_type == 'ai' else 0,
+                duration or 0,
+                1 if response_type == 'command' else 0,
+                1 if response_type == 'ai' else 0,
+                duration or 0
+            ))
     
     # === MÉTODOS DE UTILIDAD ===
     
+    def commit(self):
+        """
+        Confirma las escrituras pendientes de este hilo (agrupadas con
+        commit=False) y libera el escritor para los demás hilos
+        
+        Dentro de transaction() no hace nada: confirma el bloque al salir.
+        """
+        if self._write_owner != threading.get_ident() or self._tx_depth:
+            return
+        self._release()
+    
+    def _release(self, rollback=False):
+        """Termina la transacción del hilo dueño, libera el escritor y, si
+        se confirmó, ejecuta lo registrado con after_commit"""
+        callbacks, self._after_commit = self._after_commit, []
+        committed = False
+        try:
+            if rollback:
+                self._writer.rollback()
+            else:
+                self._writer.commit()
+                committed = True
+        finally:
+            self._tx_depth = 0
+            self._write_owner = None
+            self._write_lock.release()
+        
+        for _, callback in callbacks if committed else ():
+            try:
+                callback()
+            except Exception as e:
+                if self.logger:
+                    self.logger.log_error("AfterCommitError", str(e), module="DatabaseManager")
+    
     def backup_database(self, backup_dir: str = "backups") -> str:
         """
         Crea un backup de la base de datos
         
+        Usa la API de copia de SQLite: incluye lo que aún está en el WAL y
+        no bloquea al escritor.
+        
         Args:
             backup_dir: Directorio donde guardar el backup
             
@@ -607,7 +1636,11 @@ class DatabaseManager:
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         backup_path = f"{backup_dir}/jarvis_backup_{timestamp}.db"
         
-        shutil.copy2(self.db_path, backup_path)
+        target = sqlite3.connect(backup_path)
+        try:
+            self.conn.backup(target)
+        finally:
+            target.close()
         
         if self.logger:
             self.logger.main_logger.info(f"💾 Backup creado: {backup_path}")
@@ -615,16 +1648,27 @@ class DatabaseManager:
         return backup_path
     
     def optimize_database(self):
-        """Optimiza la base de datos (VACUUM)"""
-        self.cursor.execute("VACUUM")
-        self.conn.commit()
+        """Optimiza la base de datos (VACUUM) y vacía el WAL"""
+        with self._write() as conn:
+            conn.commit()  # VACUUM no admite una transacción abierta
+            conn.execute("VACUUM")
+            conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
         
         if self.logger:
             self.logger.main_logger.info("🔧 Base de datos optimizada")
     
     def close(self):
-        """Cierra la conexión a la base de datos"""
-        self.conn.close()
+        """Cierra las conexiones a la base de datos"""
+        with self._readers_lock:
+            readers, self._readers = list(self._readers.values()), {}
+        for reader in readers:
+            reader.close()
+        
+        # Integrar el WAL en el archivo principal al salir
+        with self._write() as conn:
+            if not self._in_memory:
+                conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        self._writer.close()
         
         if self.logger:
-            self.logger.main_logger.info("💾 Conexión a base de datos cerrada")
\ No newline at end of file
+            self.logger.main_logger.info("💾 Conexión a base de datos cerrada")
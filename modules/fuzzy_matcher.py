@@ -0,0 +1,172 @@
+"""
+Módulo de búsqueda aproximada de comandos, tolerante a errores de Whisper
+("abrir yutub", "bloquea la pantalla")
+"""
+from collections import Counter
+from config import (
+    FUZZY_MATCH_THRESHOLD, FUZZY_MAX_CANDIDATES, FUZZY_MAX_WORDS
+)
+from .text_utils import content_words
+
+
+def trigrams(text):
+    """
+    Obtiene los trigramas de caracteres de un texto (con relleno en bordes)
+
+    Args:
+        text (str): Texto normalizado
+
+    Returns:
+        set: Trigramas únicos
+    """
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def bounded_levenshtein(a, b, max_distance):
+    """
+    Distancia de edición limitada: abandona en cuanto supera `max_distance`
+
+    Args:
+        a (str): Primer texto
+        b (str): Segundo texto
+        max_distance (int): Distancia máxima de interés
+
+    Returns:
+        int: Distancia, o max_distance + 1 si la supera
+    """
+    if abs(len(a) - len(b)) > max_distance:
+        return max_distance + 1
+
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i] + [0] * len(b)
+        for j, char_b in enumerate(b, 1):
+            current[j] = min(
+                previous[j] + 1,
+                current[j - 1] + 1,
+                previous[j - 1] + (char_a != char_b)
+            )
+        if min(current) > max_distance:
+            return max_distance + 1
+        previous = current
+
+    return previous[-1]
+
+
+class FuzzyCommandMatcher:
+    """
+    Busca la palabra clave de comando más parecida a una frase.
+
+    Un índice invertido de trigramas genera pocos candidatos (como máximo
+    FUZZY_MAX_CANDIDATES) y cada uno se verifica con distancia de edición
+    sobre ventanas de la frase con un número de palabras parecido.
+    """
+
+    def __init__(self, keywords=None, threshold=None, max_candidates=None):
+        """
+        Inicializa el índice
+
+        Args:
+            keywords (iterable): Palabras clave iniciales
+            threshold (float): Similitud mínima (0-1) para aceptar
+            max_candidates (int): Candidatos máximos a verificar por frase
+        """
+        self.threshold = threshold or FUZZY_MATCH_THRESHOLD
+        self.max_candidates = max_candidates or FUZZY_MAX_CANDIDATES
+
+        self._index = {}      # trigrama -> set de palabras clave
+        self._forms = {}      # palabra clave -> (texto normalizado, nº palabras, trigramas)
+
+        for keyword in keywords or ():
+            self.add(keyword)
+
+    def add(self, keyword):
+        """Indexa una palabra clave"""
+        if keyword in self._forms:
+            return
+
+        words = content_words(keyword)
+        normalized = " ".join(words)
+        grams = trigrams(normalized)
+
+        self._forms[keyword] = (normalized, len(words), grams)
+        for gram in grams:
+            self._index.setdefault(gram, set()).add(keyword)
+
+    def remove(self, keyword):
+        """Quita una palabra clave del índice"""
+        form = self._forms.pop(keyword, None)
+        if form is None:
+            return
+
+        for gram in form[2]:
+            postings = self._index.get(gram)
+            if postings:
+                postings.discard(keyword)
+                if not postings:
+                    del self._index[gram]
+
+    def match(self, text):
+        """
+        Busca la palabra clave más parecida a algún fragmento de la frase
+
+        Args:
+            text (str): Frase del usuario
+
+        Returns:
+            tuple or None: (palabra_clave, similitud) si supera el umbral
+        """
+        words = content_words(text)
+        if not words or len(words) > FUZZY_MAX_WORDS:
+            return None
+
+        candidates = self._candidates(" ".join(words))
+
+        best = None
+        for keyword in candidates:
+            score = self._verify(keyword, words)
+            if score >= self.threshold and (best is None or score > best[1]):
+                best = (keyword, score)
+
+        return best
+
+    def _candidates(self, normalized):
+        """Palabras clave que comparten más trigramas con la frase"""
+        # Los trigramas presentes en casi todas las claves no discriminan
+        max_postings = max(50, len(self._forms) // 10)
+
+        shared = Counter()
+        for gram in trigrams(normalized):
+            postings = self._index.get(gram)
+            if postings and len(postings) <= max_postings:
+                shared.update(postings)
+
+        # Exigir que aparezca parte de los trigramas informativos de la clave
+        candidates = []
+        for keyword, count in shared.most_common(self.max_candidates):
+            informative = sum(
+                1 for gram in self._forms[keyword][2]
+                if len(self._index[gram]) <= max_postings
+            )
+            if count / informative >= self.threshold / 2:
+                candidates.append(keyword)
+
+        return candidates
+
+    def _verify(self, keyword, words):
+        """Mejor similitud entre la clave y una ventana de la frase"""
+        normalized, size, _ = self._forms[keyword]
+        best = 0.0
+
+        for window in range(max(size - 1, 1), size + 2):
+            for start in range(0, max(len(words) - window, 0) + 1):
+                fragment = " ".join(words[start:start + window])
+                length = max(len(fragment), len(normalized))
+                max_distance = int(length * (1 - self.threshold))
+
+                distance = bounded_levenshtein(fragment, normalized, max_distance)
+                if distance <= max_distance:
+                    best = max(best, 1 - distance / length)
+
+        return best
@@ -0,0 +1,113 @@
+"""
+Módulo de entrada y salida sin hardware: sustituye micrófono, teclado y
+altavoces para ejecutar JARVIS en servidores (reproducciones y pruebas de carga)
+"""
+import hashlib
+import os
+import threading
+
+
+class TextScriptRecorder:
+    """
+    Sustituto de AudioRecorder que "graba" las frases de un guion de texto.
+
+    Devuelve la frase en lugar de la ruta de un WAV (se combina con
+    PassthroughSpeechToText) y None al agotar el guion.
+    """
+
+    def __init__(self, utterances):
+        """
+        Args:
+            utterances (iterable): Frases del usuario, en orden
+        """
+        self._utterances = iter(utterances)
+        self._lock = threading.Lock()
+
+    def record_while_pressed(self, on_partial_audio=None, partial_interval=1.0,
+                             output_file=None):
+        with self._lock:
+            return next(self._utterances, None)
+
+
+class WavDirectoryRecorder:
+    """Sustituto de AudioRecorder que entrega los WAV de un directorio en orden alfabético"""
+
+    def __init__(self, directory):
+        self._files = iter(sorted(
+            os.path.join(directory, name)
+            for name in os.listdir(directory)
+            if name.lower().endswith(".wav")
+        ))
+        self._lock = threading.Lock()
+
+    def record_while_pressed(self, on_partial_audio=None, partial_interval=1.0,
+                             output_file=None):
+        with self._lock:
+            return next(self._files, None)
+
+
+class PassthroughSpeechToText:
+    """Sustituto de SpeechToText para entrada de texto: la "transcripción" es la propia frase"""
+
+    def transcribe(self, text):
+        return text
+
+
+class FixtureSpeechToText:
+    """
+    Sustituto de SpeechToText con transcripciones fijadas por WAV.
+
+    Identifica cada archivo por el hash de su contenido, de modo que el
+    mismo audio subido por HTTP o leído de disco da la misma transcripción.
+    """
+
+    def __init__(self, transcripts=None, default=""):
+        """
+        Args:
+            transcripts (dict): {bytes del WAV: transcripción}
+            default (str): Transcripción de los audios desconocidos
+        """
+        self.default = default
+        self._transcripts = {}
+        for audio_bytes, text in (transcripts or {}).items():
+            self.add(audio_bytes, text)
+
+    def add(self, audio_bytes, text):
+        self._transcripts[hashlib.sha1(audio_bytes).hexdigest()] = text
+
+    def transcribe(self, audio_file):
+        with open(audio_file, "rb") as f:
+            digest = hashlib.sha1(f.read()).hexdigest()
+        return self._transcripts.get(digest, self.default)
+
+
+class NullTextToSpeech:
+    """Sustituto de TextToSpeech que descarta las respuestas (solo las cuenta)"""
+
+    def __init__(self):
+        self.rate = 0
+        self.spoken = 0
+
+    def speak(self, texto):
+        self.spoken += 1
+
+    def speak_cached(self, texto):
+        self.speak(texto)
+
+    def prerender(self, phrases, background=True):
+        pass
+
+
+class FileTextToSpeech(NullTextToSpeech):
+    """Sustituto de TextToSpeech que escribe cada respuesta en un archivo de texto"""
+
+    def __init__(self, path):
+        super().__init__()
+        self.path = path
+        self._lock = threading.Lock()
+
+    def speak(self, texto):
+        with self._lock:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(texto.replace("\n", " ") + "\n")
+            self.spoken += 1
@@ -0,0 +1,225 @@
+"""
+Módulo de clasificación local de intenciones para comandos
+("pon algo de música", "quiero ver youtube") sin llamar al LLM
+"""
+import zlib
+import numpy as np
+from scipy.sparse import csc_matrix
+from config import (
+    INTENT_HASH_DIM, INTENT_MIN_SCORE, INTENT_MIN_MARGIN,
+    INTENT_NEGATIVE_EXAMPLES
+)
+from .text_utils import content_words
+
+
+STEM_LENGTH = 5  # Prefijo usado como raíz ("reproduce"/"reproducir" -> "repro")
+
+
+def extract_features(text):
+    """
+    Extrae rasgos de bolsa de palabras: raíces y bigramas de raíces
+
+    Args:
+        text (str): Frase original
+
+    Returns:
+        list: Rasgos (pueden repetirse)
+    """
+    stems = [word[:STEM_LENGTH] for word in content_words(text)]
+    bigrams = [f"{a}_{b}" for a, b in zip(stems, stems[1:])]
+    return stems + bigrams
+
+
+class IntentClassifier:
+    """
+    Clasificador TF-IDF con hashing de rasgos.
+
+    Cada intención se representa por el centroide normalizado de sus
+    ejemplos en una matriz dispersa por columnas (intenciones x
+    INTENT_HASH_DIM). Una frase se clasifica con un único producto entre
+    las columnas de sus rasgos y su vector de pesos, de modo que el coste
+    no depende del tamaño del espacio de hashing.
+    """
+
+    def __init__(self, examples=None, negatives=None, dimensions=None,
+                 min_score=None, min_margin=None):
+        """
+        Inicializa el clasificador
+
+        Args:
+            examples (dict): Intención -> lista de frases de ejemplo
+            negatives (list): Frases que NO son comandos (para calibrar)
+            dimensions (int): Tamaño del espacio de hashing
+            min_score (float): Similitud mínima antes de calibrar
+            min_margin (float): Ventaja mínima sobre la segunda intención
+        """
+        self.dimensions = dimensions or INTENT_HASH_DIM
+        self.min_margin = min_margin if min_margin is not None else INTENT_MIN_MARGIN
+        self.base_threshold = min_score if min_score is not None else INTENT_MIN_SCORE
+        self.threshold = self.base_threshold
+        self.negatives = list(INTENT_NEGATIVE_EXAMPLES if negatives is None else negatives)
+
+        self.examples = {}
+        for intent, phrases in (examples or {}).items():
+            self.add_examples(intent, phrases)
+
+        self._intents = []
+        self._matrix = None
+        self._idf = None
+        self._dirty = True
+
+    # === DATOS DE ENTRENAMIENTO ===
+
+    def add_examples(self, intent, phrases):
+        """
+        Agrega frases de ejemplo a una intención (la crea si no existe)
+
+        Args:
+            intent (str): Nombre de la intención
+            phrases (list): Frases de ejemplo
+        """
+        self.examples.setdefault(intent, [])
+        for phrase in phrases:
+            if phrase not in self.examples[intent]:
+                self.examples[intent].append(phrase)
+        self._dirty = True
+
+    def remove_intent(self, intent):
+        """Elimina una intención y sus ejemplos"""
+        if self.examples.pop(intent, None) is not None:
+            self._dirty = True
+
+    # === CLASIFICACIÓN ===
+
+    def classify(self, text):
+        """
+        Devuelve la intención más probable si supera el umbral calibrado
+
+        Args:
+            text (str): Frase del usuario
+
+        Returns:
+            tuple or None: (intención, similitud)
+        """
+        scores = self.scores(text)
+        if scores is None or not len(scores):
+            return None
+
+        best = int(np.argmax(scores))
+        best_score = float(scores[best])
+
+        if len(scores) > 1:
+            second = float(np.partition(scores, -2)[-2])
+            if best_score - second < self.min_margin:
+                return None
+
+        if best_score < self.threshold:
+            return None
+
+        return self._intents[best], best_score
+
+    def scores(self, text):
+        """
+        Similitud coseno de la frase con todas las intenciones
+
+        Args:
+            text (str): Frase del usuario
+
+        Returns:
+            np.ndarray or None: Un valor por intención (None si no hay rasgos)
+        """
+        if self._dirty:
+            self._build()
+
+        if self._matrix is None:
+            return None
+
+        vector = self._vectorize(text)
+        if vector is None:
+            return None
+
+        columns, weights = vector
+        return self._matrix[:, columns] @ weights
+
+    # === ENTRENAMIENTO ===
+
+    def _build(self):
+        """Calcula IDF, centroides por intención y el umbral calibrado"""
+        self._dirty = False
+        self._intents = [intent for intent, phrases in self.examples.items() if phrases]
+
+        if not self._intents:
+            self._matrix = None
+            return
+
+        # Frecuencia documental: cada intención es un documento
+        doc_freq = np.zeros(self.dimensions, dtype=np.float32)
+        hashed = {}
+        for intent in self._intents:
+            per_phrase = [self._hash(extract_features(p)) for p in self.examples[intent]]
+            hashed[intent] = per_phrase
+            seen = set()
+            for indices in per_phrase:
+                seen.update(indices)
+            doc_freq[list(seen)] += 1
+
+        self._idf = np.log((1 + len(self._intents)) / (1 + doc_freq)) + 1
+
+        rows, cols, values = [], [], []
+        for row, intent in enumerate(self._intents):
+            centroid = {}
+            for indices in hashed[intent]:
+                vector = self._weigh(indices)
+                for index, weight in vector.items():
+                    centroid[index] = centroid.get(index, 0.0) + weight
+
+            norm = np.sqrt(sum(w * w for w in centroid.values())) or 1.0
+            for index, weight in centroid.items():
+                rows.append(row)
+                cols.append(index)
+                values.append(weight / norm)
+
+        self._matrix = csc_matrix(
+            (np.array(values, dtype=np.float32), (rows, cols)),
+            shape=(len(self._intents), self.dimensions)
+        )
+
+        self._calibrate()
+
+    def _calibrate(self):
+        """Sube el umbral por encima de la puntuación de frases que no son comandos"""
+        self.threshold = self.base_threshold
+
+        negative_scores = [
+            float(scores.max())
+            for scores in (self.scores(text) for text in self.negatives)
+            if scores is not None and len(scores)
+        ]
+
+        if negative_scores:
+            self.threshold = max(self.base_threshold, max(negative_scores) + self.min_margin)
+
+    def _vectorize(self, text):
+        """Vector TF-IDF normalizado de una frase como (columnas, pesos)"""
+        indices = self._hash(extract_features(text))
+        if not indices:
+            return None
+
+        weights = self._weigh(indices)
+        columns = np.fromiter(weights.keys(), dtype=np.int64, count=len(weights))
+        values = np.fromiter(weights.values(), dtype=np.float32, count=len(weights))
+        return columns, values
+
+    def _weigh(self, indices):
+        """Pesos TF-IDF (L2) de una lista de índices con repeticiones"""
+        counts = {}
+        for index in indices:
+            counts[index] = counts.get(index, 0) + 1
+
+        weights = {i: c * float(self._idf[i]) for i, c in counts.items()}
+        norm = np.sqrt(sum(w * w for w in weights.values())) or 1.0
+        return {i: w / norm for i, w in weights.items()}
+
+    def _hash(self, features):
+        """Proyecta rasgos a índices con un hash estable entre ejecuciones"""
+        return [zlib.crc32(f.encode("utf-8")) % self.dimensions for f in features]
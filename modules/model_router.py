@@ -0,0 +1,157 @@
+"""
+Módulo de enrutado de consultas entre modelos de distinto tamaño
+"""
+import re
+from config import (
+    OLLAMA_MODEL_TIERS, ROUTER_SHORT_INPUT_WORDS,
+    ROUTER_LONG_INPUT_WORDS, ROUTER_ESCALATION_TURNS
+)
+from .text_utils import normalize_text
+
+
+# Expresiones que suelen requerir razonamiento o respuestas largas
+COMPLEX_MARKERS = (
+    "por que", "explica", "como funciona", "diferencia", "compara",
+    "analiza", "resume", "paso a paso", "ventajas", "desventajas",
+    "codigo", "programa", "funcion", "algoritmo", "calcula", "traduce",
+    "escribe", "redacta", "planifica", "recomienda"
+)
+
+# Expresiones con las que el usuario indica que la respuesta no bastó
+ESCALATION_MARKERS = (
+    "no entiendo", "explica mejor", "mas detalle", "profundiza",
+    "te equivocas", "eso no es", "no es correcto", "incorrecto",
+    "otra vez", "repite", "no me sirve"
+)
+
+# Pronombres enclíticos: "explicame", "resumelo" o "repitemelo" cuentan como el marcador
+CLITICS = r"(?:me|te|se|le|lo|la|nos|les|los|las)?(?:lo|la|los|las)?"
+
+
+def _compile_markers(markers):
+    """Patrones por marcador: palabras completas (más enclíticos), no subcadenas"""
+    return [(marker, re.compile(rf"\b{re.escape(marker)}{CLITICS}\b")) for marker in markers]
+
+
+_COMPLEX_PATTERNS = _compile_markers(COMPLEX_MARKERS)
+_ESCALATION_PATTERNS = _compile_markers(ESCALATION_MARKERS)
+
+
+class ModelRouter:
+    """Elige el nivel de modelo (small/large) para cada consulta"""
+
+    def __init__(self, tiers=None, logger=None):
+        """
+        Inicializa el enrutador
+
+        Args:
+            tiers (dict): Mapa nivel -> modelo de Ollama ('small', 'large')
+            logger: Logger opcional
+        """
+        self.tiers = dict(tiers or OLLAMA_MODEL_TIERS)
+        self.logger = logger
+
+        # Forzado manual de nivel o modelo (None = automático)
+        self.override = None
+
+        # Turnos restantes en los que se mantiene el modelo grande
+        self.escalation_turns_left = 0
+
+        self.stats = {tier: 0 for tier in self.tiers}
+
+    def route(self, text, has_context=False, dry_run=False):
+        """
+        Decide qué modelo debe responder a partir de rasgos baratos
+
+        Args:
+            text (str): Texto original del usuario (sin contexto RAG)
+            has_context (bool): Si la consulta incluye contexto recuperado
+            dry_run (bool): Calcular la decisión sin actualizar estado ni logs
+                (usado por las generaciones especulativas)
+
+        Returns:
+            dict: {'tier', 'model', 'reasons'}
+        """
+        if self.override:
+            tier = self.override if self.override in self.tiers else None
+            model = self.tiers[tier] if tier else self.override
+            return self._decide(tier or "override", model, ["override manual"], dry_run)
+
+        normalized = normalize_text(text)
+        word_count = len(re.findall(r"\w+", normalized))
+        reasons = []
+
+        if any(pattern.search(normalized) for _, pattern in _ESCALATION_PATTERNS):
+            if not dry_run:
+                self.escalation_turns_left = ROUTER_ESCALATION_TURNS
+            reasons.append("el usuario pide más precisión")
+        elif self.escalation_turns_left > 0:
+            if not dry_run:
+                self.escalation_turns_left -= 1
+            reasons.append("escalado reciente")
+
+        if has_context:
+            reasons.append("usa contexto RAG")
+
+        if word_count > ROUTER_LONG_INPUT_WORDS:
+            reasons.append(f"entrada larga ({word_count} palabras)")
+
+        complex_hits = [m for m, pattern in _COMPLEX_PATTERNS if pattern.search(normalized)]
+        if complex_hits:
+            reasons.append(f"pregunta compleja ({', '.join(complex_hits[:3])})")
+
+        # Una sola frase corta sin rasgos de complejidad va al modelo pequeño
+        if reasons or word_count > ROUTER_SHORT_INPUT_WORDS:
+            if not reasons:
+                reasons.append(f"entrada media ({word_count} palabras)")
+            return self._decide("large", self.tiers["large"], reasons, dry_run)
+
+        return self._decide("small", self.tiers["small"],
+                            [f"entrada corta ({word_count} palabras)"], dry_run)
+
+    def _decide(self, tier, model, reasons, dry_run=False):
+        """Registra la decisión de enrutado y la devuelve"""
+        if dry_run:
+            return {"tier": tier, "model": model, "reasons": reasons}
+
+        self.stats[tier] = self.stats.get(tier, 0) + 1
+
+        if self.logger:
+            self.logger.main_logger.info(
+                f"🧭 Enrutado a {model} [{tier}]: {'; '.join(reasons)}"
+            )
+
+        return {"tier": tier, "model": model, "reasons": reasons}
+
+    def mark_unavailable(self, model):
+        """
+        Deja de proponer un modelo que Ollama no tiene: sus niveles pasan
+        a usar el modelo grande
+
+        Args:
+            model (str): Modelo que respondió 404
+        """
+        for tier, tier_model in self.tiers.items():
+            if tier_model == model and tier != "large":
+                self.tiers[tier] = self.tiers["large"]
+        if self.override == model:
+            self.override = None
+
+    def set_override(self, tier_or_model=None):
+        """
+        Fuerza un nivel ('small'/'large') o un modelo concreto
+
+        Args:
+            tier_or_model (str): Nivel o nombre de modelo (None = automático)
+        """
+        self.override = tier_or_model
+        print(f"🧭 Enrutado {'forzado a: ' + tier_or_model if tier_or_model else 'automático'}")
+
+    def escalate(self, turns=None):
+        """
+        Fuerza el modelo grande durante los próximos turnos
+
+        Args:
+            turns (int): Número de turnos (por defecto ROUTER_ESCALATION_TURNS)
+        """
+        self.escalation_turns_left = turns or ROUTER_ESCALATION_TURNS
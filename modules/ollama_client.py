@@ -0,0 +1,277 @@
+"""
+Módulo de cliente HTTP para Ollama con conexiones persistentes,
+timeouts acotados, reintentos con backoff y precarga del modelo
+"""
+import random
+import threading
+import time
+
+import httpx
+from ollama import Client, ResponseError
+from config import (
+    OLLAMA_HOST, OLLAMA_TIMEOUT, OLLAMA_CONNECT_TIMEOUT,
+    OLLAMA_MAX_RETRIES, OLLAMA_RETRY_BACKOFF, OLLAMA_MAX_CONNECTIONS,
+    OLLAMA_KEEPALIVE_EXPIRY, OLLAMA_KEEP_ALIVE, OLLAMA_PRIME_IDLE
+)
+
+
+class OllamaClient:
+    """Cliente de Ollama configurado y reutilizable entre llamadas"""
+
+    def __init__(self, host=None, timeout=None, connect_timeout=None,
+                 max_retries=None, retry_backoff=None, keep_alive=None,
+                 logger=None):
+        """
+        Crea el cliente HTTP con pool de conexiones keep-alive
+
+        Args:
+            host (str): URL del servidor Ollama
+            timeout (float): Segundos máximos de lectura por petición
+            connect_timeout (float): Segundos máximos para conectar
+            max_retries (int): Reintentos ante errores transitorios
+            retry_backoff (float): Espera base entre reintentos (exponencial)
+            keep_alive (str|float): Tiempo que Ollama mantiene el modelo cargado
+            logger: Logger opcional
+        """
+        self.host = host or OLLAMA_HOST
+        self.timeout = timeout if timeout is not None else OLLAMA_TIMEOUT
+        self.connect_timeout = connect_timeout if connect_timeout is not None else OLLAMA_CONNECT_TIMEOUT
+        self.max_retries = max_retries if max_retries is not None else OLLAMA_MAX_RETRIES
+        self.retry_backoff = retry_backoff if retry_backoff is not None else OLLAMA_RETRY_BACKOFF
+        self.keep_alive = keep_alive if keep_alive is not None else OLLAMA_KEEP_ALIVE
+        self.logger = logger
+
+        # Un único httpx.Client reutiliza las conexiones TCP entre turnos
+        self.client = Client(
+            host=self.host,
+            timeout=httpx.Timeout(self.timeout, connect=self.connect_timeout),
+            limits=httpx.Limits(
+                max_connections=OLLAMA_MAX_CONNECTIONS,
+                max_keepalive_connections=OLLAMA_MAX_CONNECTIONS,
+                keepalive_expiry=OLLAMA_KEEPALIVE_EXPIRY
+            )
+        )
+
+        self.warmup_thread = None
+        self.warmed_up = threading.Event()
+
+        # Última petición completada (para precalentar solo tras un rato ocioso)
+        self.last_activity = 0.0
+        self._priming = False
+        self._prime_lock = threading.Lock()
+
+    # === PETICIONES ===
+
+    def chat(self, model, messages, **kwargs):
+        """
+        Envía una conversación al modelo (respuesta completa)
+
+        Args:
+            model (str): Modelo de Ollama
+            messages (list): Historial de mensajes
+            **kwargs: Parámetros adicionales de ollama.Client.chat
+
+        Returns:
+            ChatResponse: Respuesta del modelo
+        """
+        kwargs.setdefault("keep_alive", self.keep_alive)
+        return self._with_retry(
+            self.client.chat, model=model, messages=messages, **kwargs
+        )
+
+    def chat_stream(self, model, messages, **kwargs):
+        """
+        Envía una conversación y devuelve la respuesta por fragmentos.
+
+        Los reintentos solo se aplican hasta recibir el primer fragmento;
+        una vez empezado el stream no se repite para no duplicar texto.
+
+        Args:
+            model (str): Modelo de Ollama
+            messages (list): Historial de mensajes
+            **kwargs: Parámetros adicionales de ollama.Client.chat
+
+        Yields:
+            ChatResponse: Fragmentos parciales de la respuesta
+        """
+        kwargs.setdefault("keep_alive", self.keep_alive)
+
+        def open_stream():
+            stream = self.client.chat(
+                model=model, messages=messages, stream=True, **kwargs
+            )
+            return stream, next(stream, None)
+
+        stream, first_chunk = self._with_retry(open_stream)
+        if first_chunk is None:
+            return
+
+        yield first_chunk
+        yield from stream
+
+    def generate(self, model, prompt="", **kwargs):
+        """
+        Genera texto a partir de un prompt suelto
+
+        Args:
+            model (str): Modelo de Ollama
+            prompt (str): Texto de entrada
+            **kwargs: Parámetros adicionales de ollama.Client.generate
+
+        Returns:
+            GenerateResponse: Respuesta del modelo
+        """
+        kwargs.setdefault("keep_alive", self.keep_alive)
+        return self._with_retry(
+            self.client.generate, model=model, prompt=prompt, **kwargs
+        )
+
+    def embed(self, model, texts, **kwargs):
+        """
+        Calcula embeddings para uno o varios textos
+
+        Args:
+            model (str): Modelo de embeddings
+            texts (str|list): Texto o lista de textos
+            **kwargs: Parámetros adicionales de ollama.Client.embed
+
+        Returns:
+            list: Lista de vectores (uno por texto)
+        """
+        kwargs.setdefault("keep_alive", self.keep_alive)
+        response = self._with_retry(
+            self.client.embed, model=model, input=texts, **kwargs
+        )
+        return response.embeddings
+
+    # === PRECARGA DEL MODELO ===
+
+    def warmup(self, model, background=True):
+        """
+        Carga el modelo en memoria de Ollama antes de la primera pregunta.
+
+        Un prompt vacío hace que Ollama cargue el modelo sin generar texto.
+
+        Args:
+            model (str): Modelo a precargar
+            background (bool): Si ejecutar en un hilo aparte
+
+        Returns:
+            threading.Thread or None: Hilo de precarga (si es en background)
+        """
+        if not background:
+            self._warmup(model)
+            return None
+
+        self.warmup_thread = threading.Thread(
+            target=self._warmup, args=(model,),
+            name=f"ollama-warmup-{model}", daemon=True
+        )
+        self.warmup_thread.start()
+        return self.warmup_thread
+
+    def prime(self, models, max_idle=None):
+        """
+        Precalienta conexión y modelos en segundo plano si el cliente lleva
+        más de `max_idle` segundos sin peticiones.
+
+        Tras un rato ocioso el pool puede haber cerrado la conexión TCP y
+        Ollama descargado el modelo; lanzarlo al empezar el turno solapa esa
+        espera con la búsqueda de comandos y de contexto.
+
+        Args:
+            models (list): Modelos que pueden responder al turno
+            max_idle (float): Segundos de inactividad (por defecto OLLAMA_PRIME_IDLE)
+
+        Returns:
+            threading.Thread or None: Hilo de precarga, o None si no hacía falta
+        """
+        max_idle = OLLAMA_PRIME_IDLE if max_idle is None else max_idle
+        with self._prime_lock:
+            if self._priming or time.time() - self.last_activity < max_idle:
+                return None
+            self._priming = True
+
+        def run():
+            try:
+                for model in models:
+                    self._warmup(model)
+            finally:
+                self._priming = False
+
+        thread = threading.Thread(target=run, name="ollama-prime", daemon=True)
+        thread.start()
+        return thread
+
+    def _warmup(self, model):
+        """Envía la petición de precarga y registra el resultado"""
+        start_time = time.time()
+        try:
+            self.generate(model=model, prompt="")
+            load_time = time.time() - start_time
+            self.warmed_up.set()
+
+            if self.logger:
+                self.logger.log_model_load("Ollama", model, load_time)
+
+        except Exception as e:
+            if self.logger:
+                self.logger.main_logger.warning(
+                    f"⚠️ No se pudo precargar el modelo {model}: {e}"
+                )
+
+    # === REINTENTOS ===
+
+    def _with_retry(self, func, *args, **kwargs):
+        """
+        Ejecuta una petición reintentando ante errores transitorios
+
+        Args:
+            func: Función a ejecutar
+
+        Returns:
+            Resultado de la función
+        """
+        attempt = 0
+        while True:
+            try:
+                result = func(*args, **kwargs)
+                self.last_activity = time.time()
+                return result
+            except Exception as e:
+                if attempt >= self.max_retries or not self._is_retryable(e):
+                    raise
+
+                # Backoff exponencial con jitter para no sincronizar reintentos
+                delay = self.retry_backoff * (2 ** attempt)
+                delay += random.uniform(0, self.retry_backoff)
+                attempt += 1
+
+                if self.logger:
+                    self.logger.main_logger.warning(
+                        f"⚠️ Error en Ollama ({type(e).__name__}: {e}). "
+                        f"Reintento {attempt}/{self.max_retries} en {delay:.2f}s"
+                    )
+                time.sleep(delay)
+
+    @staticmethod
+    def _is_retryable(error):
+        """Indica si un error justifica reintentar la petición"""
+        if isinstance(error, ResponseError):
+            return error.status_code == 429 or error.status_code >= 500
+
+        # ollama convierte httpx.ConnectError en ConnectionError
+        return isinstance(error, (ConnectionError, httpx.TransportError))
+
+    def close(self):
+        """Cierra las conexiones HTTP del pool"""
+        # Client.close() solo existe en versiones recientes de ollama; en las
+        # anteriores se cierra el httpx.Client interno si sigue ahí
+        if hasattr(self.client, "close"):
+            self.client.close()
+            return
+        http_client = getattr(self.client, "_client", None)
+        if isinstance(http_client, httpx.Client):
+            http_client.close()
+        elif self.logger:
+            self.logger.main_logger.warning("⚠️ No se pudieron cerrar las conexiones de Ollama")
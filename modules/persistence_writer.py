@@ -0,0 +1,142 @@
+"""
+Módulo de persistencia en segundo plano: saca la base de datos y los
+registros en disco del camino crítico de cada interacción
+"""
+import queue
+import threading
+import time
+from config import PERSIST_QUEUE_SIZE, PERSIST_BATCH_SIZE, PERSIST_FLUSH_INTERVAL
+
+
+class PersistenceWriter:
+    """
+    Hilo escritor único alimentado por una cola acotada.
+
+    Cada tarea es una función que escribe sin confirmar (commit=False); el
+    hilo agrupa las tareas que llegan en PERSIST_FLUSH_INTERVAL segundos
+    (como mucho PERSIST_BATCH_SIZE) y las confirma en una sola transacción
+    (group commit: un fsync por lote en lugar de varios por turno). Cada
+    tarea corre en un SAVEPOINT, así que si falla se deshace solo lo suyo
+    y el resto del lote se confirma. Si la cola se llena, `submit`
+    bloquea: se frena al productor en lugar de perder datos.
+
+    Durabilidad: lo encolado y aún sin confirmar se pierde si el proceso
+    muere (como mucho un lote, PERSIST_FLUSH_INTERVAL segundos de turnos).
+    """
+
+    _STOP = object()
+
+    def __init__(self, db, logger=None, max_queue=None, batch_size=None, flush_interval=None):
+        """
+        Inicializa el escritor (el hilo arranca al crear el objeto)
+
+        Args:
+            db: DatabaseManager sobre el que se confirman los lotes
+            logger: Logger opcional
+            max_queue (int): Tareas máximas en cola
+            batch_size (int): Tareas máximas por transacción
+            flush_interval (float): Segundos máximos que espera un lote
+        """
+        self.db = db
+        self.logger = logger
+        self.batch_size = batch_size or PERSIST_BATCH_SIZE
+        self.flush_interval = flush_interval if flush_interval is not None else PERSIST_FLUSH_INTERVAL
+
+        self._queue = queue.Queue(maxsize=max_queue or PERSIST_QUEUE_SIZE)
+        self._closed = False
+        self.stats = {'tasks': 0, 'batches': 0, 'errors': 0, 'max_batch': 0}
+
+        self._thread = threading.Thread(target=self._run, name="persistence-writer", daemon=True)
+        self._thread.start()
+
+    def submit(self, func, *args, **kwargs):
+        """
+        Encola una escritura
+
+        Args:
+            func (callable): Función a ejecutar en el hilo escritor
+        """
+        if self._closed:
+            raise RuntimeError("El escritor de persistencia está cerrado")
+        self._queue.put((func, args, kwargs))
+
+    def flush(self, timeout=None):
+        """
+        Espera a que se confirme todo lo encolado hasta ahora
+
+        Returns:
+            bool: True si se confirmó antes del tiempo límite
+        """
+        done = threading.Event()
+        self._queue.put(done)
+        return done.wait(timeout)
+
+    def close(self, timeout=10.0):
+        """Confirma lo pendiente y detiene el hilo"""
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(self._STOP)
+        self._thread.join(timeout)
+
+    def _run(self):
+        """Bucle del hilo: agrupa tareas y las confirma juntas"""
+        stop = False
+        while not stop:
+            batch = [self._queue.get()]
+            deadline = time.time() + self.flush_interval
+
+            # Completar el lote hasta el tamaño o el tiempo límite
+            while len(batch) < self.batch_size and not self._is_marker(batch[-1]):
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+
+            stop = self._execute(batch)
+
+    def _is_marker(self, item):
+        return item is self._STOP or isinstance(item, threading.Event)
+
+    def _execute(self, batch):
+        """Ejecuta un lote en una transacción; devuelve True al recibir la parada"""
+        stop = False
+        markers = []
+        tasks = 0
+
+        try:
+            with self.db.transaction():
+                for item in batch:
+                    if item is self._STOP:
+                        stop = True
+                        continue
+                    if isinstance(item, threading.Event):
+                        markers.append(item)
+                        continue
+
+                    func, args, kwargs = item
+                    tasks += 1
+                    try:
+                        with self.db.transaction():
+                            func(*args, **kwargs)
+                    except Exception as e:
+                        self.stats['errors'] += 1
+                        if self.logger:
+                            self.logger.log_error("PersistenceError", str(e), module="PersistenceWriter")
+        except Exception as e:
+            self.stats['errors'] += 1
+            if self.logger:
+                self.logger.log_error("PersistenceError", str(e), module="PersistenceWriter")
+
+        if tasks:
+            self.stats['tasks'] += tasks
+            self.stats['batches'] += 1
+            self.stats['max_batch'] = max(self.stats['max_batch'], tasks)
+
+        for marker in markers:
+            marker.set()
+
+        return stop
@@ -0,0 +1,198 @@
+"""
+Módulo de orquestación asíncrona: captura, transcripción, enrutado, voz y
+persistencia como etapas solapadas unidas por colas acotadas
+"""
+import asyncio
+import os
+import time
+from contextlib import nullcontext
+from config import DATA_DIR, PIPELINE_QUEUE_SIZE
+from .tracing import new_trace
+
+
+class PipelineTurn:
+    """Datos de un turno según avanza por las etapas"""
+
+    def __init__(self, turn_id, audio_file=None):
+        self.turn_id = turn_id
+        self.started = time.time()
+        self.audio_file = audio_file
+        self.user_text = None
+        self.response = None
+        self.response_type = None
+        self.model_used = None
+        self.command_jobs = []
+        self.context_future = None  # Búsqueda RAG lanzada al tener transcripción
+        self.deadline = None  # Cumplimiento del plazo de respuesta (turnos de IA)
+        self.trace = new_trace()
+
+
+class AsyncPipeline:
+    """
+    Orquestador asyncio del asistente.
+
+    Cada etapa es una tarea que lee de su cola de entrada, ejecuta el
+    trabajo bloqueante en un hilo (asyncio.to_thread) y escribe en la cola
+    de la siguiente etapa:
+
+        captura -> STT -> enrutado (comando o RAG + LLM) -> TTS -> persistencia
+
+    Las colas acotadas aplican contrapresión: si una etapa se retrasa, las
+    anteriores esperan en lugar de acumular turnos. Así, la grabación del
+    turno siguiente se solapa con la transcripción, la generación y la voz
+    del actual, y la persistencia nunca retrasa a nadie.
+
+    El fin de la entrada (la captura devuelve None) se propaga como
+    marcador y vacía el pipeline ordenadamente; `stop()` cancela todas las
+    etapas.
+    """
+
+    _END = object()
+
+    def __init__(self, assistant, queue_size=None):
+        """
+        Args:
+            assistant (JarvisAssistant): Asistente con sus módulos ya inicializados
+            queue_size (int): Turnos máximos en espera entre dos etapas
+        """
+        self.assistant = assistant
+        self.queue_size = queue_size or PIPELINE_QUEUE_SIZE
+        self.completed = 0
+        self.latencies = []  # Segundos desde el fin de la captura hasta la persistencia
+        self._tasks = []
+
+        # Un WAV por turno en vuelo para no sobrescribir audio aún sin transcribir
+        self._audio_slots = 2 * self.queue_size + 3
+
+    async def run(self):
+        """Ejecuta las etapas hasta agotar la entrada o ser cancelado"""
+        audio_q = asyncio.Queue(self.queue_size)
+        text_q = asyncio.Queue(self.queue_size)
+        speech_q = asyncio.Queue(self.queue_size)
+        persist_q = asyncio.Queue(self.queue_size)
+
+        self._tasks = [
+            asyncio.create_task(self._capture(audio_q), name="capture"),
+            asyncio.create_task(self._stage(audio_q, text_q, self._transcribe), name="stt"),
+            asyncio.create_task(self._stage(text_q, speech_q, self._route), name="routing"),
+            asyncio.create_task(self._stage(speech_q, persist_q, self._speak), name="tts"),
+            asyncio.create_task(self._stage(persist_q, None, self._persist), name="persistence"),
+        ]
+
+        try:
+            await asyncio.gather(*self._tasks)
+        finally:
+            for task in self._tasks:
+                task.cancel()
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    def stop(self):
+        """Cancela todas las etapas (los trabajos ya lanzados en hilos terminan solos)"""
+        for task in self._tasks:
+            task.cancel()
+
+    # === ETAPAS ===
+
+    async def _capture(self, out_q):
+        """Graba turnos mientras haya entrada; None indica fin"""
+        turn_id = 0
+        while True:
+            output_file = os.path.join(DATA_DIR, f"rec_{turn_id % self._audio_slots}.wav")
+            turn = PipelineTurn(turn_id)
+
+            with self._span(turn, "record"):
+                audio_file = await asyncio.to_thread(
+                    self.assistant.audio_recorder.record_while_pressed, output_file=output_file
+                )
+            if audio_file is None:
+                await out_q.put(self._END)
+                return
+
+            turn.started = time.time()
+            turn.audio_file = audio_file
+            await out_q.put(turn)  # Bloquea si la transcripción va retrasada
+            turn_id += 1
+
+    async def _stage(self, in_q, out_q, work):
+        """Bucle genérico de etapa: un turno cada vez, en orden"""
+        while True:
+            turn = await in_q.get()
+            if turn is self._END:
+                if out_q is not None:
+                    await out_q.put(self._END)
+                return
+
+            # La traza del turno viaja al hilo de trabajo (to_thread copia el contexto)
+            token = turn.trace.activate() if turn.trace else None
+            try:
+                keep = await work(turn)
+            except Exception as e:
+                self._report_error(turn, e)
+                continue
+            finally:
+                if token is not None:
+                    turn.trace.deactivate(token)
+
+            if keep and out_q is not None:
+                await out_q.put(turn)
+
+    async def _transcribe(self, turn):
+        with self._span(turn, "transcribe"):
+            turn.user_text = await asyncio.to_thread(
+                self.assistant.speech_to_text.transcribe, turn.audio_file
+            )
+        if not (turn.user_text and turn.user_text.strip()):
+            return False
+
+        # El contexto se busca ya, aunque el enrutado siga ocupado con el turno anterior
+        turn.context_future = self.assistant.prefetch_context(turn.user_text)
+        return True
+
+    async def _route(self, turn):
+        assistant = self.assistant
+        turn.response, turn.response_type = await asyncio.to_thread(
+            assistant.process_user_input, turn.user_text, turn.context_future
+        )
+        turn.model_used = assistant.ai_engine.last_model_used if turn.response_type == 'ai' else None
+        turn.command_jobs = assistant.command_executor.take_turn_jobs()
+        turn.deadline = assistant.responder.last_result if assistant.responder else None
+        return True
+
+    async def _speak(self, turn):
+        if turn.deadline and turn.deadline.get('spoken'):
+            return True  # El responder ya la dijo frase a frase
+        with self._span(turn, "speak"):
+            await asyncio.to_thread(self.assistant.speech.speak, turn.response)
+        return True
+
+    async def _persist(self, turn):
+        assistant = self.assistant
+        assistant.interaction_count += 1
+        self.completed += 1
+        duration = time.time() - turn.started
+        self.latencies.append(duration)
+
+        args = (turn.user_text, turn.response, turn.response_type,
+                duration, turn.model_used, turn.command_jobs, turn.trace, turn.deadline)
+
+        if assistant.persistence:
+            # submit solo bloquea si la cola del escritor está llena
+            await asyncio.to_thread(assistant.persistence.submit, assistant._persist_turn, *args)
+        else:
+            await asyncio.to_thread(self._persist_inline, args)
+        return True
+
+    @staticmethod
+    def _span(turn, stage):
+        """Mide una etapa del turno (sin traza, no mide nada)"""
+        return turn.trace.span(stage) if turn.trace else nullcontext()
+
+    def _persist_inline(self, args):
+        with self.assistant.db.transaction():
+            self.assistant._persist_turn(*args)
+
+    def _report_error(self, turn, error):
+        """Registra el fallo de un turno sin detener el pipeline"""
+        print(f"❌ Error en interacción: {error}")
+        self.assistant.logger.log_error("InteractionError", str(error), module="pipeline")
+        self.assistant.db.log_error("InteractionError", str(error), module="pipeline")
@@ -0,0 +1,141 @@
+"""
+Módulo de planificación de recordatorios: los avisa por voz a su hora
+sin consultar la base de datos periódicamente
+"""
+import heapq
+import threading
+import time
+from datetime import datetime, timedelta
+from config import REMINDER_LOAD_HORIZON
+from .time_parser import format_time, parse_time
+
+
+class ReminderScheduler:
+    """
+    Planificador de recordatorios con un montículo en memoria.
+
+    Solo se cargan los pendientes de la próxima ventana de
+    REMINDER_LOAD_HORIZON segundos, con una consulta por rango sobre el
+    índice (status, scheduled_time); al llegar al final de la ventana se
+    carga la siguiente. Los recordatorios nuevos dentro de la ventana se
+    añaden directamente al montículo.
+
+    Un único hilo duerme hasta el siguiente vencimiento (o hasta que un
+    recordatorio nuevo se adelanta a él) y entrega los vencidos a
+    `announce`. Los que vencieron con el asistente apagado se avisan al
+    arrancar.
+    """
+
+    def __init__(self, db, announce, logger=None, horizon=None):
+        """
+        Args:
+            db (DatabaseManager): Base de datos con la tabla reminders
+            announce (callable): Recibe el texto a decir (no debe bloquear)
+            logger: Logger opcional
+            horizon (float): Segundos de recordatorios cargados en memoria
+        """
+        self.db = db
+        self.announce = announce
+        self.logger = logger
+        self.horizon = horizon or REMINDER_LOAD_HORIZON
+
+        self._heap = []  # (timestamp, reminder_id, tarea)
+        self._queued = set()
+        self._loaded_until = None  # Fin de la ventana cargada (datetime)
+        self._cond = threading.Condition()
+        self._stopped = False
+        self._thread = None
+        self.fired = 0
+
+    def start(self):
+        """Carga la primera ventana (incluidos los vencidos) y arranca el hilo"""
+        with self._cond:
+            self._load_window()
+        self._thread = threading.Thread(target=self._run, name="reminder-scheduler", daemon=True)
+        self._thread.start()
+        return self
+
+    def add(self, reminder_id, task, when):
+        """
+        Programa un recordatorio recién creado
+
+        Args:
+            reminder_id (int): ID en la BD
+            task (str): Tarea
+            when (datetime): Hora del aviso
+        """
+        with self._cond:
+            # Más allá de la ventana cargada: se leerá de la BD a su tiempo
+            if self._loaded_until is not None and when.replace(microsecond=0) > self._loaded_until:
+                return
+            self._push(reminder_id, task, when)
+            self._cond.notify()
+
+    def stop(self):
+        """Detiene el hilo (los pendientes siguen en la BD)"""
+        with self._cond:
+            self._stopped = True
+            self._cond.notify()
+        if self._thread:
+            self._thread.join(timeout=2.0)
+
+    @property
+    def pending(self):
+        """Recordatorios en memoria aún sin avisar"""
+        with self._cond:
+            return len(self._heap)
+
+    def _run(self):
+        """Duerme hasta el próximo vencimiento o el final de la ventana"""
+        while True:
+            with self._cond:
+                if self._stopped:
+                    return
+
+                if datetime.now() >= self._loaded_until:
+                    self._load_window()
+
+                now = time.time()
+                due = []
+                while self._heap and self._heap[0][0] <= now:
+                    item = heapq.heappop(self._heap)
+                    self._queued.discard(item[1])
+                    due.append(item)
+
+                if not due:
+                    wake_at = self._loaded_until.timestamp()
+                    if self._heap:
+                        wake_at = min(wake_at, self._heap[0][0])
+                    self._cond.wait(timeout=max(wake_at - now, 0.0))
+                    continue
+
+            for _, reminder_id, task in due:
+                self._fire(reminder_id, task)
+
+    def _fire(self, reminder_id, task):
+        """Avisa un recordatorio y lo marca como completado"""
+        try:
+            self.announce(f"Recordatorio: {task}")
+            self.db.complete_reminder(reminder_id)
+            self.fired += 1
+            if self.logger:
+                self.logger.main_logger.info(f"⏰ Recordatorio avisado: {task}")
+        except Exception as e:
+            if self.logger:
+                self.logger.log_error("ReminderError", str(e), module="ReminderScheduler")
+
+    def _load_window(self):
+        """Añade al montículo los pendientes hasta el final de la siguiente ventana"""
+        # Segundos enteros, como scheduled_time en la BD
+        until = (datetime.now() + timedelta(seconds=self.horizon)).replace(microsecond=0)
+        after = format_time(self._loaded_until) if self._loaded_until else None
+
+        for row in self.db.get_scheduled_reminders(format_time(until), after=after):
+            self._push(row['reminder_id'], row['task'], parse_time(row['scheduled_time']))
+        self._loaded_until = until
+
+    def _push(self, reminder_id, task, when):
+        if reminder_id in self._queued:
+            return
+        self._queued.add(reminder_id)
+        heapq.heappush(self._heap, (when.timestamp(), reminder_id, task))
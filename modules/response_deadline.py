@@ -0,0 +1,220 @@
+"""
+Módulo de plazo de respuesta: si el LLM no produce su primera frase a
+tiempo, el asistente avisa y degrada la respuesta en lugar de quedarse mudo
+"""
+import itertools
+import re
+import threading
+import time
+from config import (
+    RESPONSE_DEADLINE, RESPONSE_HARD_DEADLINE, RESPONSE_CACHE_MAX_AGE, DEADLINE_ACKNOWLEDGEMENTS
+)
+
+
+# Fin de frase: signo de cierre seguido de espacio
+_SENTENCE_END = re.compile(r"[.!?…:;]\s")
+
+
+class DeadlineResponder:
+    """
+    Genera las respuestas de IA con un presupuesto de latencia por turno.
+
+    La generación corre en streaming en un hilo aparte y el turno espera la
+    primera frase como mucho hasta RESPONSE_DEADLINE (contado desde que
+    hay transcripción). Si no llega:
+
+    1. Se dice un acuse breve pre-sintetizado, para no dejar al usuario
+       en silencio.
+    2. Si ya se respondió hace poco a la misma pregunta (y no hay contexto
+       RAG), se usa esa respuesta y se cancela la generación.
+    3. Si no, se sigue esperando al streaming hasta RESPONSE_HARD_DEADLINE;
+       pasado este, se cancela y responde el modelo pequeño (si es otro).
+
+    La respuesta del streaming se dice frase a frase según llega, sin
+    esperar al final de la generación (`last_result['spoken']`); las de
+    respaldo (caché o modelo pequeño) las dice quien llama.
+
+    El resultado de cada turno queda en `last_result` (para la tabla
+    response_deadlines) y acumulado en `stats`.
+    """
+
+    def __init__(self, ai_engine, text_to_speech, db=None, budget=None,
+                 hard_budget=None, cache_max_age=None, acknowledgements=None, logger=None):
+        """
+        Args:
+            ai_engine (AIEngine): Motor que genera las respuestas
+            text_to_speech: Salida de voz (acuses y respuestas en streaming)
+            db (DatabaseManager): Fuente de respuestas ya dadas (opcional)
+            budget (float): Segundos hasta la primera frase
+            hard_budget (float): Segundos hasta abandonar el modelo lento
+            cache_max_age (float): Antigüedad máxima (s) de una respuesta reutilizada
+            acknowledgements (list): Frases de acuse
+            logger: Logger opcional
+        """
+        self.ai_engine = ai_engine
+        self.text_to_speech = text_to_speech
+        self.db = db
+        self.budget = budget if budget is not None else RESPONSE_DEADLINE
+        self.hard_budget = hard_budget if hard_budget is not None else RESPONSE_HARD_DEADLINE
+        self.logger = logger
+        self.cache_max_age = cache_max_age if cache_max_age is not None else RESPONSE_CACHE_MAX_AGE
+
+        acknowledgements = list(acknowledgements or DEADLINE_ACKNOWLEDGEMENTS)
+        self._acknowledgements = itertools.cycle(acknowledgements)
+        text_to_speech.prerender(acknowledgements)
+
+        self.last_result = None
+        self.stats = {'turns': 0, 'misses': 0, 'on_time': 0, 'streamed': 0,
+                      'cached': 0, 'small_model': 0, 'late': 0}
+
+    def respond(self, user_text, context=None, started=None):
+        """
+        Genera la respuesta respetando el plazo y la incorpora al historial
+
+        Args:
+            user_text (str): Texto del usuario
+            context (str): Contexto RAG opcional
+            started (float): time.perf_counter() del inicio del turno
+                (por defecto, ahora)
+
+        Returns:
+            str: Respuesta del asistente
+        """
+        started = started if started is not None else time.perf_counter()
+        engine = self.ai_engine
+        model = engine.select_model(user_text, has_context=bool(context))
+
+        changed = threading.Condition()  # Avisa de texto nuevo o del final
+        done = threading.Event()
+        cancel = threading.Event()
+        state = {'text': "", 'result': None, 'error': None}
+
+        def on_text(fragment):
+            with changed:
+                state['text'] += fragment
+                changed.notify()
+
+        def generate():
+            try:
+                state['result'] = engine.generate_detached(
+                    user_text, context=context, cancel_event=cancel,
+                    model=model, on_text=on_text
+                )
+            except Exception as e:
+                state['error'] = e
+            finally:
+                with changed:
+                    done.set()
+                    changed.notify()
+
+        print("🤖 Generando respuesta con IA...\n")
+        threading.Thread(target=generate, name="llm-deadline", daemon=True).start()
+
+        if self._wait_sentence(state, changed, done, self.budget, started):
+            return self._stream(state, changed, done, started, 'on_time', missed=False)
+
+        # Plazo incumplido: avisar y degradar
+        self.stats['misses'] += 1
+        if self.logger:
+            self.logger.main_logger.warning(
+                f"⏱️ Sin primera frase tras {self.budget:g}s (modelo {model})"
+            )
+        self.text_to_speech.speak_cached(next(self._acknowledgements))
+
+        # Solo preguntas sin contexto RAG y respuestas recientes ("¿qué tiempo hace hoy?")
+        cached = None
+        if self.db and not context:
+            cached = self.db.find_cached_response(user_text, max_age=self.cache_max_age)
+        if cached and not done.is_set():
+            cancel.set()
+            return self._commit_fallback(user_text, context, cached, "cache", 'cached', started)
+
+        if self._wait_sentence(state, changed, done, self.hard_budget, started):
+            return self._stream(state, changed, done, started, 'streamed', missed=True)
+
+        small_model = self._small_model(model)
+        if small_model:
+            cancel.set()
+            result = engine.generate_detached(user_text, context=context, model=small_model)
+            return self._commit_fallback(user_text, context, result["response"], small_model,
+                                         'small_model', started, result["response_time"])
+
+        return self._stream(state, changed, done, started, 'late', missed=True)
+
+    def _wait_sentence(self, state, changed, done, budget, started):
+        """Espera a la primera frase completa (o al final) como mucho hasta `budget`"""
+        with changed:
+            return changed.wait_for(
+                lambda: done.is_set() or _SENTENCE_END.search(state['text']),
+                timeout=self._remaining(budget, started)
+            )
+
+    def _stream(self, state, changed, done, started, outcome, missed):
+        """
+        Dice la respuesta del streaming original frase a frase según llega
+        y la incorpora al historial. El plazo cumplido se mide hasta que la
+        primera frase pasa a la voz, no hasta el final de la generación.
+        """
+        spoken, first = 0, None
+        while True:
+            with changed:
+                changed.wait_for(
+                    lambda: done.is_set() or _SENTENCE_END.search(state['text'], spoken)
+                )
+                text, finished = state['text'], done.is_set()
+            if finished and state['error'] is not None:
+                raise state['error']
+
+            end = len(text) if finished else spoken
+            if not finished:
+                for match in _SENTENCE_END.finditer(text, spoken):
+                    end = match.end()
+            sentence = text[spoken:end].strip()
+            spoken = end
+            if sentence:
+                if first is None:
+                    first = time.perf_counter() - started
+                self.text_to_speech.speak(sentence)
+            if finished:
+                break
+
+        if first is None:  # Respuesta vacía
+            first = time.perf_counter() - started
+        self._record(outcome, missed, first, spoken=True)
+        return self.ai_engine.commit_response(state['result'])
+
+    def _commit_fallback(self, user_text, context, response, model, outcome, started,
+                         response_time=0.0):
+        """Incorpora una respuesta de respaldo (caché o modelo pequeño)"""
+        self._record(outcome, True, time.perf_counter() - started)
+        return self.ai_engine.commit_response({
+            "user_message": user_text,
+            "context": context,
+            "response": response,
+            "model": model,
+            "response_time": response_time,
+            "eval_count": 0,
+            "cancelled": False,
+            "dry_run": False
+        })
+
+    def _record(self, outcome, missed, first_sentence, spoken=False):
+        self.stats['turns'] += 1
+        self.stats[outcome] += 1
+        self.last_result = {
+            'budget': self.budget,
+            'first_sentence': first_sentence,
+            'missed': missed,
+            'outcome': outcome,
+            'spoken': spoken  # La respuesta ya se dijo en streaming
+        }
+
+    def _small_model(self, model):
+        """Modelo pequeño del enrutador, si existe y no es el que ya falló"""
+        router = self.ai_engine.router
+        small = router.tiers.get("small") if router else None
+        return small if small and small != model else None
+
+    @staticmethod
+    def _remaining(budget, started):
+        return max(budget - (time.perf_counter() - started), 0.0)
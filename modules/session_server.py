@@ -0,0 +1,626 @@
+"""
+Módulo de servidor multisesión: atiende turnos de texto o audio de varios
+clientes por HTTP/WebSocket local compartiendo modelos y conexiones
+"""
+import base64
+import hashlib
+import json
+import os
+import queue
+import re
+import struct
+import tempfile
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+from config import (
+    SERVER_MAX_SESSIONS, SERVER_SESSION_IDLE_TIMEOUT, SERVER_MAX_ACTIVE_TURNS,
+    SERVER_ADMISSION_TIMEOUT, SERVER_SESSION_RATE, SERVER_SESSION_BURST,
+    SERVER_STT_WORKERS, SERVER_MAX_BODY
+)
+from .ai_engine import AIEngine
+
+
+class ServerError(Exception):
+    """Error de un turno con su código HTTP"""
+
+    def __init__(self, status, message, retry_after=None):
+        super().__init__(message)
+        self.status = status
+        self.retry_after = retry_after
+
+    def to_dict(self):
+        payload = {"error": str(self), "status": self.status}
+        if self.retry_after is not None:
+            payload["retry_after"] = round(self.retry_after, 2)
+        return payload
+
+
+class RateLimiter:
+    """Cubo de fichas: `rate` turnos por minuto con ráfagas de hasta `burst`"""
+
+    def __init__(self, rate=None, burst=None):
+        self.rate = (rate or SERVER_SESSION_RATE) / 60.0
+        self.burst = burst or SERVER_SESSION_BURST
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """
+        Consume una ficha
+
+        Returns:
+            float: 0 si se permite el turno; si no, segundos hasta la siguiente ficha
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return 0.0
+            return (1 - self._tokens) / self.rate
+
+
+class SpeechToTextPool:
+    """
+    Transcriptores compartidos entre sesiones.
+
+    Se crean bajo demanda (nadie carga Whisper si solo llegan turnos de
+    texto) hasta `size`; cada transcripción toma uno libre o espera. Si
+    `factory` devuelve siempre el mismo ForkedSpeechToText, el pool solo
+    acota la concurrencia y el modelo está cargado una única vez.
+    """
+
+    def __init__(self, factory, size=None):
+        """
+        Args:
+            factory (callable): Crea un transcriptor (SpeechToText o sustituto)
+            size (int): Transcriptores máximos
+        """
+        self.factory = factory
+        self.size = size or SERVER_STT_WORKERS
+        self._idle = queue.Queue()
+        self._created = 0
+        self._lock = threading.Lock()
+
+    def transcribe(self, audio_bytes):
+        """Transcribe un WAV recibido en memoria"""
+        stt = self._checkout()
+        fd, path = tempfile.mkstemp(suffix=".wav")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(audio_bytes)
+            return stt.transcribe(path)
+        finally:
+            os.remove(path)
+            self._idle.put(stt)
+
+    def _checkout(self):
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+
+        with self._lock:
+            create = self._created < self.size
+            if create:
+                self._created += 1
+        if create:
+            return self.factory()
+        return self._idle.get()
+
+
+class ClientSession:
+    """Estado de un cliente: historial propio, sesión en BD y límites"""
+
+    def __init__(self, db_session_id, ai_engine, limiter):
+        self.session_id = uuid.uuid4().hex
+        self.db_session_id = db_session_id
+        self.ai_engine = ai_engine
+        self.limiter = limiter
+        self.lock = threading.Lock()  # Un turno a la vez por sesión
+        self.last_activity = time.time()
+        self.stats = {'total_interactions': 0, 'total_commands': 0,
+                      'total_ai_responses': 0, 'average_duration': 0.0}
+
+    def to_dict(self):
+        return {
+            "session_id": self.session_id,
+            "turns": self.stats['total_interactions'],
+            "history_messages": self.ai_engine.get_conversation_length(),
+            "idle_seconds": round(time.time() - self.last_activity, 1)
+        }
+
+
+class SessionManager:
+    """
+    Sesiones de clientes y procesamiento de sus turnos.
+
+    Recursos compartidos: base de datos y escritor de persistencia, un único
+    OllamaClient (pool de conexiones), el pool de transcriptores y,
+    opcionalmente, el ejecutor de comandos. Cada sesión tiene su AIEngine
+    (historial propio) y su sesión en la tabla sessions.
+
+    Control de admisión: como mucho SERVER_MAX_ACTIVE_TURNS turnos a la vez
+    (el resto espera SERVER_ADMISSION_TIMEOUT y recibe 503) y
+    SERVER_MAX_SESSIONS sesiones abiertas; cada sesión tiene además su
+    límite de turnos por minuto (429).
+    """
+
+    def __init__(self, db, client, stt_pool, persistence, command_executor=None,
+                 logger=None, max_sessions=None, max_active_turns=None,
+                 admission_timeout=None, idle_timeout=None, session_rate=None,
+                 session_burst=None):
+        """
+        Args:
+            db (DatabaseManager): Base de datos compartida
+            client (OllamaClient): Cliente de Ollama compartido
+            stt_pool (SpeechToTextPool): Transcriptores compartidos
+            persistence (PersistenceWriter): Escritor en segundo plano
+            command_executor (CommandExecutor): Comandos (None = solo IA)
+            logger: Logger opcional
+            max_sessions (int): Sesiones abiertas a la vez
+            max_active_turns (int): Turnos procesándose a la vez
+            admission_timeout (float): Espera máxima por un hueco de turno
+            idle_timeout (float): Segundos sin turnos hasta cerrar una sesión
+            session_rate (float): Turnos por minuto permitidos a cada sesión
+            session_burst (int): Ráfaga máxima de turnos por sesión
+        """
+        self.db = db
+        self.client = client
+        self.stt_pool = stt_pool
+        self.persistence = persistence
+        self.command_executor = command_executor
+        self.logger = logger
+        self.max_sessions = max_sessions or SERVER_MAX_SESSIONS
+        self.admission_timeout = (admission_timeout if admission_timeout is not None
+                                  else SERVER_ADMISSION_TIMEOUT)
+        self.idle_timeout = idle_timeout or SERVER_SESSION_IDLE_TIMEOUT
+        self.session_rate = session_rate
+        self.session_burst = session_burst
+
+        self._sessions = {}
+        self._sessions_lock = threading.Lock()
+        self._admission = threading.BoundedSemaphore(max_active_turns or SERVER_MAX_ACTIVE_TURNS)
+        self._command_lock = threading.Lock()
+        self.active_turns = 0
+        self.stats = {'turns': 0, 'rejected_admission': 0, 'rejected_rate': 0,
+                      'rejected_busy': 0, 'errors': 0}
+        self._stats_lock = threading.Lock()
+
+    # === SESIONES ===
+
+    def create_session(self):
+        """Abre una sesión nueva (503 si se alcanzó el máximo)"""
+        self._expire_idle()
+        with self._sessions_lock:
+            if len(self._sessions) >= self.max_sessions:
+                raise ServerError(503, "Demasiadas sesiones abiertas", retry_after=5.0)
+
+            session = ClientSession(
+                self.db.create_session(),
+                AIEngine(client=self.client, logger=self.logger, warmup=False),
+                RateLimiter(self.session_rate, self.session_burst)
+            )
+            self._sessions[session.session_id] = session
+
+        if self.logger:
+            self.logger.main_logger.info(f"🌐 Sesión de cliente abierta: {session.session_id}")
+        return session
+
+    def get_session(self, session_id):
+        with self._sessions_lock:
+            session = self._sessions.get(session_id)
+        if session is None:
+            raise ServerError(404, "Sesión no encontrada")
+        return session
+
+    def close_session(self, session_id):
+        """Cierra la sesión y guarda sus estadísticas"""
+        with self._sessions_lock:
+            session = self._sessions.pop(session_id, None)
+        if session is None:
+            raise ServerError(404, "Sesión no encontrada")
+        self.db.end_session(session.db_session_id, session.stats)
+
+    def close(self):
+        """Cierra todas las sesiones (al apagar el servidor)"""
+        with self._sessions_lock:
+            session_ids = list(self._sessions)
+        for session_id in session_ids:
+            self.close_session(session_id)
+
+    def _expire_idle(self):
+        now = time.time()
+        with self._sessions_lock:
+            expired = [sid for sid, s in self._sessions.items()
+                       if now - s.last_activity > self.idle_timeout and not s.lock.locked()]
+        for session_id in expired:
+            try:
+                self.close_session(session_id)
+            except ServerError:
+                pass
+
+    def health(self):
+        with self._sessions_lock:
+            sessions = len(self._sessions)
+        return {"sessions": sessions, "active_turns": self.active_turns, **self.stats}
+
+    # === TURNOS ===
+
+    def run_turn(self, session, text=None, audio=None):
+        """
+        Procesa un turno de la sesión aplicando límites y admisión
+
+        Args:
+            session (ClientSession): Sesión del cliente
+            text (str): Texto del usuario
+            audio (bytes): WAV del usuario (alternativa a text)
+
+        Returns:
+            dict: Transcripción, respuesta, tipo, modelo y latencia
+        """
+        # Primero el turno en curso: un 409 no debe gastar un token del límite
+        if not session.lock.acquire(blocking=False):
+            self._count('rejected_busy')
+            raise ServerError(409, "La sesión ya tiene un turno en curso")
+        try:
+            retry_after = session.limiter.acquire()
+            if retry_after:
+                self._count('rejected_rate')
+                raise ServerError(429, "Demasiados turnos en esta sesión", retry_after=retry_after)
+
+            if not self._admission.acquire(timeout=self.admission_timeout):
+                self._count('rejected_admission')
+                raise ServerError(503, "Servidor ocupado", retry_after=1.0)
+            try:
+                self._track_active(1)
+                return self._process(session, text, audio)
+            except ServerError:
+                raise
+            except Exception as e:
+                self._count('errors')
+                if self.logger:
+                    self.logger.log_error("ServerTurnError", str(e), module="SessionManager")
+                raise ServerError(500, f"Error procesando el turno: {e}")
+            finally:
+                self._track_active(-1)
+                self._admission.release()
+        finally:
+            session.last_activity = time.time()
+            session.lock.release()
+
+    def _process(self, session, text, audio):
+        start = time.time()
+
+        user_text = self.stt_pool.transcribe(audio) if audio is not None else text
+        if not user_text or not user_text.strip():
+            raise ServerError(422, "No se recibió texto ni audio inteligible")
+
+        response, response_type, command_jobs = None, "command", []
+        if self.command_executor:
+            with self._command_lock:
+                response = self.command_executor.execute(user_text)
+                command_jobs = self.command_executor.take_turn_jobs()
+
+        if not response:
+            response_type = "ai"
+            contexts = self.db.search_context(user_text, limit=3)
+            context = "\n".join(ctx['content'] for ctx in contexts) if contexts else None
+            response = session.ai_engine.generate_response(user_text, context=context)
+
+        duration = time.time() - start
+        model_used = session.ai_engine.last_model_used if response_type == "ai" else None
+        self._update_stats(session, response_type, duration)
+        self.persistence.submit(self._persist_turn, session.db_session_id, user_text,
+                                response, response_type, duration, model_used, command_jobs)
+
+        return {
+            "session_id": session.session_id,
+            "user_text": user_text,
+            "response": response,
+            "response_type": response_type,
+            "model": model_used,
+            "latency": round(duration, 4)
+        }
+
+    def _persist_turn(self, db_session_id, user_text, response, response_type,
+                      duration, model_used, command_jobs):
+        """Como JarvisAssistant._persist_turn, sin confirmar (lo hace el escritor)"""
+        interaction_id = self.db.save_interaction(
+            session_id=db_session_id, user_input=user_text, response=response,
+            response_type=response_type, duration=duration, model_used=model_used,
+            commit=False
+        )
+        if command_jobs:
+            self.command_executor.bind_interaction(interaction_id, command_jobs)
+
+        if response_type == 'ai' and len(user_text) > 20:
+            self.db.save_context(
+                interaction_id=interaction_id,
+                content=f"Usuario: {user_text}\nAsistente: {response}",
+                importance=0.7 if len(response) > 100 else 0.5,
+                commit=False
+            )
+
+        if self.logger:
+            self.logger.log_interaction(user_text, response, response_type, duration)
+
+    def _update_stats(self, session, response_type, duration):
+        stats = session.stats
+        count = stats['total_interactions']
+        stats['average_duration'] = (stats['average_duration'] * count + duration) / (count + 1)
+        stats['total_interactions'] = count + 1
+        stats['total_commands' if response_type == 'command' else 'total_ai_responses'] += 1
+        self._count('turns')
+
+    def _count(self, key):
+        with self._stats_lock:
+            self.stats[key] += 1
+
+    def _track_active(self, delta):
+        with self._stats_lock:
+            self.active_turns += delta
+
+
+# === HTTP / WEBSOCKET ===
+
+WEBSOCKET_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+
+_SESSION_PATH = re.compile(r"^/sessions/(?P<id>[0-9a-f]{32})(?P<rest>/turns|/ws)?$")
+
+
+class JarvisRequestHandler(BaseHTTPRequestHandler):
+    """
+    API local:
+
+        POST   /sessions                 -> abre sesión ({"session_id"})
+        GET    /sessions/<id>            -> estado de la sesión
+        DELETE /sessions/<id>            -> cierra la sesión
+        POST   /sessions/<id>/turns      -> turno: JSON {"text"} o cuerpo audio/wav
+        GET    /sessions/<id>/ws         -> WebSocket: mensajes de texto JSON
+                                            {"text"} o binarios con un WAV
+        GET    /health                   -> sesiones, turnos activos y rechazos
+    """
+
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        """Silencia el log por petición de BaseHTTPRequestHandler"""
+        pass
+
+    @property
+    def manager(self):
+        return self.server.manager
+
+    def do_GET(self):
+        if self.path == "/health":
+            self._send_json(self.manager.health())
+            return
+
+        def show(session, rest):
+            if rest == "/ws":
+                self._websocket(session)
+            elif rest:
+                raise ServerError(404, "Ruta no encontrada")
+            else:
+                self._send_json(session.to_dict())
+
+        self._dispatch(show)
+
+    def do_POST(self):
+        if self.path == "/sessions":
+            def create():
+                self._read_body()
+                self._send_json(self.manager.create_session().to_dict(), status=201)
+
+            self._guard(create)
+            return
+
+        def turn(session, rest):
+            if rest != "/turns":
+                raise ServerError(404, "Ruta no encontrada")
+            body = self._read_body()
+            if self.headers.get("Content-Type", "").startswith("audio/"):
+                result = self.manager.run_turn(session, audio=body)
+            else:
+                result = self.manager.run_turn(session, text=self._parse_text(body))
+            self._send_json(result)
+
+        self._dispatch(turn)
+
+    def do_DELETE(self):
+        def close(session, rest):
+            if rest:
+                raise ServerError(404, "Ruta no encontrada")
+            self.manager.close_session(session.session_id)
+            self._send_json({"closed": session.session_id})
+
+        self._dispatch(close)
+
+    # === UTILIDADES HTTP ===
+
+    def _dispatch(self, handler):
+        """Resuelve /sessions/<id>[/...] y traduce ServerError a respuestas"""
+        def run():
+            match = _SESSION_PATH.match(self.path)
+            if not match:
+                raise ServerError(404, "Ruta no encontrada")
+            handler(self.manager.get_session(match.group('id')), match.group('rest'))
+
+        self._guard(run)
+
+    def _guard(self, func):
+        try:
+            func()
+        except ServerError as e:
+            headers = {"Retry-After": str(max(int(e.retry_after + 0.999), 1))} if e.retry_after else {}
+            self._send_json(e.to_dict(), status=e.status, headers=headers)
+
+    def _read_body(self):
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+        except ValueError:
+            length = -1
+        if length < 0:
+            self.close_connection = True  # El cuerpo no se puede delimitar
+            raise ServerError(400, "Content-Length no válido")
+        if length > SERVER_MAX_BODY:
+            self.close_connection = True
+            raise ServerError(413, "Turno demasiado grande")
+        return self.rfile.read(length) if length else b""
+
+    @staticmethod
+    def _parse_json(body):
+        try:
+            message = json.loads(body or b"{}")
+        except ValueError:  # JSONDecodeError o bytes que no son UTF-8
+            raise ServerError(400, "JSON no válido")
+        if not isinstance(message, dict):
+            raise ServerError(400, "Se esperaba un objeto JSON")
+        return message
+
+    @classmethod
+    def _parse_text(cls, body):
+        """Campo "text" de un turno en JSON (400 si no es una cadena)"""
+        text = cls._parse_json(body).get("text")
+        if text is not None and not isinstance(text, str):
+            raise ServerError(400, "El campo text debe ser una cadena")
+        return text
+
+    def _send_json(self, payload, status=200, headers=None):
+        data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    # === WEBSOCKET (RFC 6455, sin extensiones) ===
+
+    def _websocket(self, session):
+        """Atiende turnos por WebSocket hasta que el cliente cierra"""
+        key = self.headers.get("Sec-WebSocket-Key")
+        if not key or self.headers.get("Upgrade", "").lower() != "websocket":
+            raise ServerError(400, "Se esperaba una conexión WebSocket")
+
+        accept = base64.b64encode(hashlib.sha1((key + WEBSOCKET_GUID).encode()).digest()).decode()
+        self.send_response(101)
+        self.send_header("Upgrade", "websocket")
+        self.send_header("Connection", "Upgrade")
+        self.send_header("Sec-WebSocket-Accept", accept)
+        self.end_headers()
+        self.close_connection = True
+
+        while True:
+            opcode, payload = self._ws_receive()
+            if opcode is None or opcode == 0x8:
+                self._ws_send(0x8, b"")
+                return
+
+            try:
+                if opcode == 0x2:
+                    result = self.manager.run_turn(session, audio=payload)
+                else:
+                    result = self.manager.run_turn(session, text=self._parse_text(payload))
+            except ServerError as e:
+                result = e.to_dict()
+            self._ws_send(0x1, json.dumps(result, ensure_ascii=False).encode("utf-8"))
+
+    def _ws_receive(self):
+        """
+        Lee un mensaje completo (une fragmentos y contesta pings)
+
+        Returns:
+            tuple: (opcode, bytes) u (None, None) si se cerró la conexión
+        """
+        message_opcode, parts, size = None, [], 0
+        while True:
+            header = self.rfile.read(2)
+            if len(header) < 2:
+                return None, None
+
+            fin, opcode = header[0] & 0x80, header[0] & 0x0F
+            masked, length = header[1] & 0x80, header[1] & 0x7F
+            if length == 126:
+                length = struct.unpack(">H", self.rfile.read(2))[0]
+            elif length == 127:
+                length = struct.unpack(">Q", self.rfile.read(8))[0]
+
+            size += length
+            if size > SERVER_MAX_BODY:
+                self._ws_send(0x8, struct.pack(">H", 1009))
+                return None, None
+
+            mask = self.rfile.read(4) if masked else None
+            payload = self.rfile.read(length)
+            if mask:
+                # Desenmascarado vectorizado (los WAV ocupan megas)
+                data = np.frombuffer(payload, dtype=np.uint8)
+                payload = (data ^ np.resize(np.frombuffer(mask, dtype=np.uint8), length)).tobytes()
+
+            if opcode == 0x9:  # ping
+                self._ws_send(0xA, payload)
+                continue
+            if opcode == 0xA:  # pong
+                continue
+            if opcode == 0x8:
+                return 0x8, payload
+
+            if opcode != 0x0:
+                message_opcode = opcode
+            parts.append(payload)
+            if fin:
+                return message_opcode, b"".join(parts)
+
+    def _ws_send(self, opcode, payload):
+        length = len(payload)
+        if length < 126:
+            header = struct.pack(">BB", 0x80 | opcode, length)
+        elif length < 65536:
+            header = struct.pack(">BBH", 0x80 | opcode, 126, length)
+        else:
+            header = struct.pack(">BBQ", 0x80 | opcode, 127, length)
+        self.wfile.write(header + payload)
+        self.wfile.flush()
+
+
+class JarvisServer(ThreadingHTTPServer):
+    """Servidor HTTP/WebSocket multisesión (un hilo por conexión)"""
+
+    daemon_threads = True
+
+    def __init__(self, manager, host="127.0.0.1", port=0):
+        """
+        Args:
+            manager (SessionManager): Sesiones y procesamiento de turnos
+            host (str): Interfaz de escucha
+            port (int): Puerto (0 = elegir uno libre)
+        """
+        super().__init__((host, port), JarvisRequestHandler)
+        self.manager = manager
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        """Arranca el servidor en un hilo daemon y devuelve self"""
+        self._thread = threading.Thread(target=self.serve_forever, name="jarvis-server", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """Detiene el servidor y libera el puerto"""
+        self.shutdown()
+        self.server_close()
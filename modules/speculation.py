@@ -0,0 +1,289 @@
+"""
+Módulo de generación especulativa: arranca el LLM sobre transcripciones
+parciales estables mientras el usuario todavía está hablando
+"""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from difflib import SequenceMatcher
+from config import (
+    SPECULATION_STABLE_PARTIALS, SPECULATION_MATCH_THRESHOLD,
+    SPECULATION_MIN_WORDS
+)
+from .text_utils import canonical_text
+
+
+def similarity(text_a, text_b):
+    """
+    Calcula la similitud entre dos transcripciones
+
+    Args:
+        text_a (str): Primer texto
+        text_b (str): Segundo texto
+
+    Returns:
+        float: Ratio de similitud entre 0 y 1
+    """
+    return SequenceMatcher(None, canonical_text(text_a), canonical_text(text_b)).ratio()
+
+
+class SpeculativeGenerator:
+    """Lanza y resuelve generaciones de IA sobre transcripciones parciales"""
+
+    def __init__(self, speech_to_text, ai_engine, command_executor=None,
+                 context_provider=None, logger=None,
+                 stable_partials=None, match_threshold=None):
+        """
+        Inicializa el generador especulativo
+
+        Args:
+            speech_to_text (SpeechToText): Motor de transcripción
+            ai_engine (AIEngine): Motor de IA
+            command_executor (CommandExecutor): Para no especular sobre comandos
+            context_provider (callable): Devuelve el contexto RAG para un texto
+            logger: Logger opcional
+            stable_partials (int): Parciales iguales seguidos para considerar
+                estable una transcripción
+            match_threshold (float): Similitud mínima entre el texto
+                especulado y la transcripción final para aprovecharlo
+        """
+        self.speech_to_text = speech_to_text
+        self.ai_engine = ai_engine
+        self.command_executor = command_executor
+        self.context_provider = context_provider
+        self.logger = logger
+        self.stable_partials = stable_partials or SPECULATION_STABLE_PARTIALS
+        self.match_threshold = match_threshold or SPECULATION_MATCH_THRESHOLD
+
+        # Un hilo para transcripciones parciales y otro para el LLM
+        self._stt_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="spec-stt")
+        self._llm_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="spec-llm")
+        self._lock = threading.Lock()
+
+        self._partial_future = None
+        self._last_partial = None
+        self._stable_count = 0
+        self._current = None
+        self._recording = False
+
+        self.stats = {
+            "started": 0,          # Especulaciones lanzadas
+            "hits": 0,             # Aprovechadas con la transcripción final
+            "misses": 0,           # Descartadas por diferir del texto final
+            "discarded": 0,        # Descartadas por reinicio o comando
+            "overlap_seconds": 0.0,  # Tiempo de LLM solapado con la transcripción
+            "wasted_seconds": 0.0,   # Tiempo de LLM tirado a la basura
+            "wasted_tokens": 0       # Tokens generados y descartados
+        }
+
+    # === CICLO DE UN TURNO ===
+
+    def begin_turn(self):
+        """Prepara el estado para una nueva grabación"""
+        self.discard()
+        with self._lock:
+            self._last_partial = None
+            self._stable_count = 0
+            self._recording = True
+
+    def on_partial_audio(self, audio):
+        """
+        Recibe el audio acumulado durante la grabación (no bloquea)
+
+        Args:
+            audio (np.ndarray): Muestras grabadas hasta el momento
+        """
+        # Si la parcial anterior aún no terminó, se descarta este fragmento
+        if self._partial_future and not self._partial_future.done():
+            return
+
+        self._partial_future = self._stt_executor.submit(self._process_partial, audio)
+
+    def end_recording(self):
+        """Indica que terminó la grabación: no se lanzan más parciales"""
+        with self._lock:
+            self._recording = False
+
+    def resolve(self, final_text):
+        """
+        Compara la transcripción final con la especulación en curso
+
+        Args:
+            final_text (str): Transcripción final
+
+        Returns:
+            dict or None: Resultado de generate_detached si se aprovecha
+        """
+        self.end_recording()
+
+        with self._lock:
+            current = self._current
+            self._current = None
+
+        if current is None:
+            return None
+
+        score = similarity(current["text"], final_text)
+        if score < self.match_threshold:
+            self._drop(current, "misses")
+            self._log(f"🎲 Especulación descartada (similitud {score:.2f}): '{current['text']}'")
+            return None
+
+        # La especulación coincide: esperar a que termine la generación
+        resolve_time = time.time()
+        try:
+            result = current["future"].result()
+        except Exception as e:
+            self._log(f"⚠️ Error en la generación especulativa: {e}")
+            return None
+
+        if result is None or result["cancelled"]:
+            return None
+
+        overlap = min(result["response_time"], resolve_time - current["started_at"])
+        with self._lock:
+            self.stats["hits"] += 1
+            self.stats["overlap_seconds"] += max(overlap, 0.0)
+
+        self._log(f"🎯 Especulación aprovechada (similitud {score:.2f}, {overlap:.2f}s solapados)")
+        return result
+
+    def discard(self):
+        """Cancela la especulación en curso (p. ej. si ganó un comando)"""
+        with self._lock:
+            current = self._current
+            self._current = None
+
+        if current is not None:
+            self._drop(current, "discarded")
+
+    # === ESTADÍSTICAS ===
+
+    def get_stats(self):
+        """
+        Obtiene los contadores de especulación
+
+        Returns:
+            dict: Contadores con tasa de acierto calculada
+        """
+        with self._lock:
+            stats = dict(self.stats)
+
+        resolved = stats["hits"] + stats["misses"] + stats["discarded"]
+        stats["hit_rate"] = stats["hits"] / resolved if resolved else 0.0
+        return stats
+
+    def shutdown(self):
+        """Cancela lo pendiente y detiene los hilos de trabajo"""
+        self.discard()
+        self._stt_executor.shutdown(wait=False, cancel_futures=True)
+        self._llm_executor.shutdown(wait=False, cancel_futures=True)
+
+    # === MÉTODOS INTERNOS ===
+
+    def _process_partial(self, audio):
+        """Transcribe un parcial y lanza especulación si es estable"""
+        with self._lock:
+            if not self._recording:
+                return
+
+        try:
+            text = self.speech_to_text.transcribe_partial(audio)
+        except Exception as e:
+            self._log(f"⚠️ Error en transcripción parcial: {e}")
+            return
+        canonical = canonical_text(text)
+
+        with self._lock:
+            if not self._recording:
+                return
+
+            if canonical and canonical == self._last_partial:
+                self._stable_count += 1
+            else:
+                self._last_partial = canonical
+                self._stable_count = 1
+
+            stable = self._stable_count >= self.stable_partials
+            current = self._current
+
+        if not stable or len(canonical.split()) < SPECULATION_MIN_WORDS:
+            return
+
+        # Ya hay una especulación equivalente en marcha
+        if current is not None and similarity(current["text"], text) >= self.match_threshold:
+            return
+
+        # Los comandos se resuelven localmente: no merece la pena especular
+        if self.command_executor and self.command_executor.match(text):
+            return
+
+        self.discard()
+        self._start(text)
+
+    def _start(self, text):
+        """Lanza una generación especulativa en segundo plano"""
+        cancel_event = threading.Event()
+        speculation = {
+            "text": text,
+            "cancel_event": cancel_event,
+            "started_at": time.time(),
+            "dropped": False
+        }
+
+        with self._lock:
+            # La grabación pudo terminar mientras se transcribía el parcial
+            if not self._recording:
+                return
+
+            speculation["future"] = self._llm_executor.submit(self._run, speculation)
+            self._current = speculation
+            self.stats["started"] += 1
+
+        self._log(f"🎲 Especulación iniciada: '{text}'")
+
+    def _run(self, speculation):
+        """Ejecuta la generación especulativa (hilo del LLM)"""
+        if speculation["cancel_event"].is_set():
+            return None
+
+        text = speculation["text"]
+        context = self.context_provider(text) if self.context_provider else None
+
+        result = self.ai_engine.generate_detached(
+            text, context=context,
+            cancel_event=speculation["cancel_event"],
+            dry_run=True
+        )
+
+        # Si se descartó mientras generaba, contabilizar el trabajo perdido
+        with self._lock:
+            speculation["result"] = result
+            if speculation["dropped"]:
+                self._add_waste(result)
+
+        return result
+
+    def _drop(self, speculation, reason):
+        """Cancela una especulación y contabiliza el desperdicio"""
+        speculation["cancel_event"].set()
+
+        with self._lock:
+            speculation["dropped"] = True
+            self.stats[reason] += 1
+
+            # Si ya había terminado, el desperdicio se conoce ahora
+            if speculation.get("result") is not None:
+                self._add_waste(speculation["result"])
+
+    def _add_waste(self, result):
+        """Suma tiempo y tokens de una generación descartada (con lock tomado)"""
+        if result is None:
+            return
+        self.stats["wasted_seconds"] += result["response_time"]
+        self.stats["wasted_tokens"] += result["eval_count"]
+
+    def _log(self, message):
+        """Registra un evento de especulación"""
+        if self.logger:
+            self.logger.main_logger.info(message)
@@ -1,29 +1,35 @@
 """
 Módulo para transcripción de audio a texto usando Whisper
 """
-import whisper
+import threading
+import numpy as np
 from config import WHISPER_MODEL
 
 
 class SpeechToText:
     """Clase para convertir audio a texto"""
     
-    def __init__(self, model_name=None, logger=None):
+    def __init__(self, model_name=None, logger=None, device=None):
         """
         Inicializa el modelo de Whisper
         
         Args:
             model_name (str): Nombre del modelo ('tiny', 'base', 'small', 'medium', 'large')
             logger: Logger opcional
+            device (str): 'cpu' o 'cuda' (por defecto, el que elija Whisper)
         """
         import time
+        import whisper  # Importación diferida: modules se puede usar sin Whisper (modo headless)
         
         self.model_name = model_name or WHISPER_MODEL
         self.logger = logger
         
+        # El modelo no admite transcripciones concurrentes
+        self._lock = threading.Lock()
+        
         print(f"Cargando modelo Whisper '{self.model_name}'...")
         start_time = time.time()
-        self.model = whisper.load_model(self.model_name)
+        self.model = whisper.load_model(self.model_name, device=device)
         load_time = time.time() - start_time
         
         print(f"✅ Modelo '{self.model_name}' cargado correctamente.\n")
@@ -42,11 +48,33 @@ class SpeechToText:
             str: Texto transcrito
         """
         print("🧠 Transcribiendo audio...")
-        result = self.model.transcribe(audio_path)
+        with self._lock:
+            result = self.model.transcribe(audio_path)
         texto = result["text"].strip()
         print(f"\n🗒️ Transcripción:\n{texto}\n")
         return texto
     
+    def transcribe_partial(self, audio):
+        """
+        Transcribe rápidamente el audio grabado hasta el momento
+        
+        Args:
+            audio (np.ndarray): Muestras int16 a 16 kHz
+            
+        Returns:
+            str: Texto parcial transcrito
+        """
+        # Whisper espera float32 normalizado en [-1, 1]
+        samples = audio.flatten().astype(np.float32) / 32768.0
+        
+        with self._lock:
+            result = self.model.transcribe(
+                samples,
+                temperature=0.0,
+                condition_on_previous_text=False
+            )
+        return result["text"].strip()
+    
     def transcribe_with_details(self, audio_path):
         """
         Transcribe con información detallada (segmentos, timestamps, idioma)
@@ -58,7 +86,8 @@ class SpeechToText:
             dict: Resultado completo de Whisper
         """
         print("🧠 Transcribiendo audio con detalles...")
-        result = self.model.transcribe(audio_path)
+        with self._lock:
+            result = self.model.transcribe(audio_path)
         return result
     
     def change_model(self, model_name):
@@ -68,6 +97,8 @@ class SpeechToText:
         Args:
             model_name (str): Nombre del nuevo modelo
         """
+        import whisper
+        
         self.model_name = model_name
         print(f"Cambiando a modelo '{model_name}'...")
         self.model = whisper.load_model(self.model_name)
@@ -0,0 +1,240 @@
+"""
+Módulo de transcripción en procesos hijos: varios workers de Whisper que
+comparten una única copia del modelo en memoria (copy-on-write tras fork)
+"""
+import gc
+import multiprocessing
+import os
+import queue
+import signal
+import threading
+from config import STT_WORKER_THREADS
+from .speech_to_text import SpeechToText
+
+
+# Métodos de SpeechToText que se pueden pedir a un worker
+_WORKER_METHODS = ('transcribe', 'transcribe_partial')
+
+
+class _Worker:
+    """Proceso hijo y el extremo del padre de su tubería"""
+
+    def __init__(self, index, process, conn):
+        self.index = index
+        self.process = process
+        self.conn = conn
+
+
+class ForkedSpeechToText:
+    """
+    Sustituto de SpeechToText que transcribe en N procesos hijos.
+
+    El padre carga el modelo una sola vez (en CPU: CUDA no sobrevive a un
+    fork) y crea los workers con fork, de modo que todos leen las mismas
+    páginas de pesos sin copiarlas. Antes del fork se hace gc.freeze():
+    los objetos existentes pasan a la generación permanente y el recolector
+    de los hijos no escribe en sus cabeceras, lo que duplicaría las
+    páginas que toca. Los tensores de pesos viven en bloques propios de
+    torch, así que los cambios de contadores de referencias solo ensucian
+    los objetos Python pequeños que los envuelven.
+
+    El padre nunca transcribe (el pool de hilos de torch/OpenMP no es
+    seguro tras un fork) y debe crearse antes de arrancar otros hilos.
+    Las llamadas son seguras entre hilos: cada una toma un worker libre.
+    """
+
+    def __init__(self, workers=2, model_name=None, logger=None, factory=None,
+                 threads_per_worker=None):
+        """
+        Args:
+            workers (int): Procesos hijos
+            model_name (str): Modelo de Whisper
+            logger: Logger opcional
+            factory (callable): Crea el transcriptor del padre (por
+                defecto, SpeechToText en CPU)
+            threads_per_worker (int): Hilos de torch por worker
+        """
+        if not hasattr(os, "fork"):
+            raise RuntimeError("ForkedSpeechToText necesita os.fork (Linux o macOS)")
+
+        self.logger = logger
+        self.threads_per_worker = threads_per_worker or STT_WORKER_THREADS
+        self.transcriber = (factory() if factory
+                            else SpeechToText(model_name, logger=logger, device="cpu"))
+        self.model_name = getattr(self.transcriber, "model_name", model_name)
+
+        # Congelar lo cargado hasta ahora: los hijos no lo recorrerán al recolectar
+        gc.collect()
+        gc.freeze()
+
+        context = multiprocessing.get_context("fork")
+        self._workers = []
+        self._idle = queue.Queue()
+        self._lock = threading.Lock()
+        for index in range(workers):
+            parent_conn, child_conn = context.Pipe()
+            process = context.Process(
+                target=_worker_main,
+                args=(self.transcriber, child_conn, self.threads_per_worker),
+                name=f"stt-worker-{index}",
+                daemon=True
+            )
+            process.start()
+            child_conn.close()
+            worker = _Worker(index, process, parent_conn)
+            self._workers.append(worker)
+            self._idle.put(worker)
+
+        print(f"🧵 {workers} workers de transcripción compartiendo el modelo '{self.model_name}'\n")
+        if self.logger:
+            self.logger.main_logger.info(
+                f"🧵 Workers STT: {[w.process.pid for w in self._workers]}"
+            )
+
+    @property
+    def alive(self):
+        """Workers disponibles (los que murieron se retiran)"""
+        with self._lock:
+            return len(self._workers)
+
+    def transcribe(self, audio_path):
+        """Transcribe un archivo de audio en un worker libre"""
+        return self._call('transcribe', audio_path)
+
+    def transcribe_partial(self, audio):
+        """Transcribe muestras int16 a 16 kHz en un worker libre"""
+        return self._call('transcribe_partial', audio)
+
+    def memory_report(self):
+        """
+        Memoria del padre y de cada worker según /proc/<pid>/smaps_rollup
+
+        Returns:
+            list: Diccionarios con role, pid y rss, pss, unique (privada) y
+                shared (compartida) en MB
+        """
+        with self._lock:
+            processes = [("padre", os.getpid())] + [
+                (f"worker {w.index}", w.process.pid) for w in self._workers
+            ]
+        return [dict(role=role, pid=pid, **read_memory(pid)) for role, pid in processes]
+
+    def print_memory_report(self):
+        """Imprime la memoria única y compartida de cada proceso"""
+        report = self.memory_report()
+        print("\n" + "=" * 64)
+        print(f"🧠 MEMORIA DE LOS WORKERS STT (modelo '{self.model_name}', MB)")
+        print("=" * 64)
+        print(f"{'Proceso':12} {'pid':>8} {'RSS':>9} {'PSS':>9} {'única':>9} {'compartida':>11}")
+        print("-" * 64)
+        for row in report:
+            print(f"{row['role']:12} {row['pid']:8} {row['rss']:9.1f} {row['pss']:9.1f} "
+                  f"{row['unique']:9.1f} {row['shared']:11.1f}")
+        print("-" * 64)
+        total_pss = sum(row['pss'] for row in report)
+        total_rss = sum(row['rss'] for row in report)
+        print(f"Total real (suma de PSS): {total_pss:.1f} MB · "
+              f"suma de RSS (sin compartir): {total_rss:.1f} MB")
+        print("=" * 64 + "\n")
+        return report
+
+    def close(self, timeout=5.0):
+        """Pide a los workers que terminen y los espera"""
+        with self._lock:
+            workers, self._workers = self._workers, []
+        for worker in workers:
+            try:
+                worker.conn.send(None)
+            except (BrokenPipeError, OSError):
+                pass
+        for worker in workers:
+            worker.process.join(timeout)
+            if worker.process.is_alive():
+                worker.process.terminate()
+            worker.conn.close()
+
+    def _call(self, method, payload):
+        worker = self._checkout()
+        try:
+            worker.conn.send((method, payload))
+            ok, result = worker.conn.recv()
+        except (EOFError, BrokenPipeError, OSError):
+            self._retire(worker)
+            raise RuntimeError(f"El worker STT {worker.index} terminó inesperadamente")
+
+        self._idle.put(worker)
+        if not ok:
+            raise RuntimeError(f"Error en el worker STT {worker.index}: {result}")
+        return result
+
+    def _checkout(self):
+        while True:
+            if not self.alive:
+                raise RuntimeError("No quedan workers de transcripción")
+            try:
+                return self._idle.get(timeout=1.0)
+            except queue.Empty:
+                continue
+
+    def _retire(self, worker):
+        """Retira un worker muerto (no se recrea: el padre ya tiene otros hilos)"""
+        with self._lock:
+            if worker in self._workers:
+                self._workers.remove(worker)
+        worker.conn.close()
+        if self.logger:
+            self.logger.log_error("STTWorkerError", f"Worker {worker.index} retirado",
+                                  module="ForkedSpeechToText")
+
+
+def _worker_main(transcriber, conn, threads):
+    """Bucle del proceso hijo: atiende peticiones hasta recibir None"""
+    signal.signal(signal.SIGINT, signal.SIG_IGN)  # Ctrl+C lo gestiona el padre
+    if threads:
+        try:
+            import torch
+            torch.set_num_threads(threads)
+        except ImportError:
+            pass
+
+    while True:
+        try:
+            request = conn.recv()
+        except EOFError:
+            break
+        if request is None:
+            break
+
+        method, payload = request
+        try:
+            if method not in _WORKER_METHODS:
+                raise ValueError(f"Método no permitido: {method}")
+            conn.send((True, getattr(transcriber, method)(payload)))
+        except Exception as e:
+            conn.send((False, f"{type(e).__name__}: {e}"))
+    conn.close()
+
+
+def read_memory(pid):
+    """
+    Memoria de un proceso en MB (Linux)
+
+    unique = Private_Clean + Private_Dirty (lo que se liberaría al matarlo)
+    shared = Shared_Clean + Shared_Dirty (páginas también mapeadas por otros)
+    """
+    fields = {}
+    try:
+        with open(f"/proc/{pid}/smaps_rollup") as f:
+            for line in f:
+                parts = line.split()
+                if len(parts) == 3 and parts[2] == "kB":
+                    fields[parts[0].rstrip(":")] = int(parts[1]) / 1024
+    except OSError:
+        pass
+
+    return {
+        "rss": fields.get("Rss", 0.0),
+        "pss": fields.get("Pss", 0.0),
+        "unique": fields.get("Private_Clean", 0.0) + fields.get("Private_Dirty", 0.0),
+        "shared": fields.get("Shared_Clean", 0.0) + fields.get("Shared_Dirty", 0.0)
+    }
@@ -1,9 +1,13 @@
 """
 Módulo para síntesis de voz (Text-to-Speech)
 """
+import os
+import queue
 import subprocess
 import sys
-from config import TTS_RATE, TTS_VOLUME
+import threading
+import zlib
+from config import TTS_RATE, TTS_VOLUME, TTS_CACHE_DIR
 
 
 class TextToSpeech:
@@ -59,6 +63,67 @@ engine.say({repr(texto)})
 engine.runAndWait()
 """])
     
+    def prerender(self, phrases, background=True):
+        """
+        Sintetiza frases fijas a WAV para reproducirlas al instante después
+        (las que ya existen en la caché no se vuelven a generar)
+        
+        Args:
+            phrases (list): Frases a sintetizar
+            background (bool): Si ejecutar en un hilo aparte
+        """
+        pending = [(p, self._cache_path(p)) for p in phrases
+                   if not os.path.exists(self._cache_path(p))]
+        if not pending:
+            return
+        
+        def render():
+            os.makedirs(TTS_CACHE_DIR, exist_ok=True)
+            subprocess.run([sys.executable, "-c", f"""
+import pyttsx3
+engine = pyttsx3.init()
+engine.setProperty('rate', {self.rate})
+engine.setProperty('volume', {self.volume})
+for texto, path in {pending!r}:
+    engine.save_to_file(texto, path)
+engine.runAndWait()
+"""])
+        
+        if background:
+            threading.Thread(target=render, name="tts-prerender", daemon=True).start()
+        else:
+            render()
+    
+    def speak_cached(self, texto):
+        """
+        Reproduce una frase pre-sintetizada con prerender (sin arrancar el
+        motor TTS); si no está en la caché, la sintetiza como speak
+        
+        Args:
+            texto (str): Frase a reproducir
+        """
+        path = self._cache_path(texto)
+        if not os.path.exists(path):
+            self.speak(texto)
+            return
+        
+        try:
+            import sounddevice as sd
+            from scipy.io.wavfile import read
+            
+            samplerate, audio = read(path)
+            sd.play(audio, samplerate)
+            sd.wait()
+        except Exception as e:
+            if self.logger:
+                self.logger.main_logger.warning(f"⚠️ No se pudo reproducir {path}: {e}")
+            self.speak(texto)
+    
+    def _cache_path(self, texto):
+        """WAV de la caché para la frase con la voz actual"""
+        key = zlib.crc32(f"{self.rate}|{self.volume}|{texto}".encode("utf-8"))
+        return os.path.join(TTS_CACHE_DIR, f"{key:08x}.wav")
+    
     def set_voice_properties(self, rate=None, volume=None):
         """
         Cambia propiedades de la voz
@@ -73,4 +138,70 @@ engine.runAndWait()
         
         if volume is not None:
             self.volume = volume
-            print(f"Volumen actualizado a: {volume}")
\ No newline at end of file
+            print(f"Volumen actualizado a: {volume}")
+
+
+class SpeechQueue:
+    """
+    Salida de voz única: las respuestas de cada turno y los avisos en
+    segundo plano (recordatorios) se reproducen de uno en uno y en orden,
+    sin solaparse.
+    
+    Ofrece la misma interfaz que TextToSpeech (speak, speak_cached,
+    prerender), así que puede sustituirlo donde se habla.
+    """
+    
+    _STOP = object()
+    
+    def __init__(self, text_to_speech):
+        """
+        Args:
+            text_to_speech: Motor de voz (TextToSpeech o un sustituto sin audio)
+        """
+        self.text_to_speech = text_to_speech
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="speech-queue", daemon=True)
+        self._thread.start()
+    
+    def speak(self, texto):
+        """Reproduce el texto en su turno y espera a que termine"""
+        self._wait(self._enqueue(self.text_to_speech.speak, texto))
+    
+    def speak_cached(self, texto):
+        """Como speak, con una frase pre-sintetizada"""
+        self._wait(self._enqueue(self.text_to_speech.speak_cached, texto))
+    
+    def announce(self, texto):
+        """Encola un aviso sin esperar a que se reproduzca"""
+        self._enqueue(self.text_to_speech.speak, texto)
+    
+    def prerender(self, phrases, background=True):
+        self.text_to_speech.prerender(phrases, background=background)
+    
+    def close(self, timeout=5.0):
+        """Reproduce lo pendiente y detiene el hilo"""
+        self._queue.put(self._STOP)
+        self._thread.join(timeout)
+    
+    def _enqueue(self, func, texto):
+        job = {'func': func, 'text': texto, 'done': threading.Event(), 'error': None}
+        self._queue.put(job)
+        return job
+    
+    @staticmethod
+    def _wait(job):
+        job['done'].wait()
+        if job['error'] is not None:
+            raise job['error']
+    
+    def _run(self):
+        while True:
+            job = self._queue.get()
+            if job is self._STOP:
+                return
+            try:
+                job['func'](job['text'])
+            except Exception as e:
+                job['error'] = e
+            finally:
+                job['done'].set()
@@ -0,0 +1,165 @@
+"""
+Utilidades de normalización de texto en español
+"""
+import re
+import unicodedata
+
+
+# Palabras vacías que no aportan al comparar frases cortas
+FILLER_WORDS = frozenset({
+    'el', 'la', 'los', 'las', 'un', 'una', 'unos', 'unas', 'lo', 'al', 'del',
+    'de', 'y', 'a', 'en', 'me', 'mi', 'por', 'favor', 'porfa', 'oye', 'jarvis'
+})
+
+
+# Palabras vacías del español (sin acentos) que no sirven para buscar: artículos,
+# pronombres, preposiciones, conjunciones, adverbios comunes y formas de los
+# verbos auxiliares, más las muletillas de quien habla con el asistente
+STOPWORDS = frozenset({
+    # Artículos, determinantes y pronombres
+    'el', 'la', 'los', 'las', 'lo', 'un', 'una', 'unos', 'unas', 'al', 'del',
+    'yo', 'tu', 'ti', 'ella', 'ellas', 'ello', 'ellos', 'usted', 'ustedes',
+    'nosotros', 'nosotras', 'vosotros', 'vosotras', 'me', 'te', 'se', 'nos', 'os',
+    'le', 'les', 'mi', 'mis', 'tus', 'su', 'sus', 'conmigo', 'contigo', 'mio', 'mia',
+    'mios', 'mias', 'tuyo', 'tuya', 'suyo', 'suya', 'nuestro', 'nuestra',
+    'nuestros', 'nuestras', 'vuestro', 'vuestra', 'este', 'esta', 'estos', 'estas',
+    'esto', 'ese', 'esa', 'esos', 'esas', 'eso', 'aquel', 'aquella', 'aquellos',
+    'aquellas', 'aquello', 'que', 'quien', 'quienes', 'cual', 'cuales', 'cuyo',
+    'cuya', 'algo', 'alguien', 'algun', 'alguna', 'algunas', 'alguno', 'algunos',
+    'nada', 'nadie', 'ningun', 'ninguna', 'ninguno', 'otro', 'otra', 'otros',
+    'otras', 'mismo', 'misma', 'mismos', 'mismas', 'todo', 'toda', 'todos', 'todas',
+    'cada', 'varios', 'varias', 'tanto', 'tanta', 'tantos', 'tantas', 'mucho',
+    'mucha', 'muchos', 'muchas', 'poco', 'poca', 'pocos', 'pocas', 'dos',
+    # Preposiciones y conjunciones
+    'a', 'ante', 'bajo', 'con', 'contra', 'de', 'desde', 'durante', 'en', 'entre',
+    'hacia', 'hasta', 'mediante', 'para', 'por', 'segun', 'sin', 'sobre', 'tras',
+    'y', 'e', 'o', 'u', 'ni', 'pero', 'sino', 'porque', 'pues', 'aunque', 'si',
+    'como', 'cuando', 'donde', 'mientras', 'cuanto', 'cuanta', 'cuantos', 'cuantas',
+    # Adverbios comunes
+    'no', 'ya', 'aun', 'asi', 'aqui', 'ahi', 'alli', 'bien', 'mal', 'mas', 'menos',
+    'muy', 'tan', 'tambien', 'tampoco', 'solo', 'siempre', 'nunca', 'antes',
+    'despues', 'luego', 'entonces', 'ahora', 'todavia', 'casi', 'quiza', 'quizas',
+    # Formas de ser, estar, haber, tener, hacer, poder e ir
+    'ser', 'soy', 'eres', 'es', 'somos', 'sois', 'son', 'era', 'eras', 'eramos',
+    'eran', 'fue', 'fui', 'fuiste', 'fueron', 'sea', 'seas', 'sean', 'sido', 'siendo',
+    'estar', 'estoy', 'estamos', 'estan', 'estaba', 'estabas', 'estaban', 'estuvo',
+    'esten', 'estado', 'estando',
+    'haber', 'he', 'has', 'ha', 'hemos', 'han', 'hay', 'habia', 'habian', 'hubo',
+    'haya', 'hayan', 'habido',
+    'tener', 'tengo', 'tienes', 'tiene', 'tenemos', 'tienen', 'tenia', 'tuve',
+    'hacer', 'hago', 'haces', 'hace', 'hacemos', 'hacen', 'hizo', 'hecho',
+    'poder', 'puedo', 'puedes', 'puede', 'podemos', 'pueden', 'podria', 'podrias',
+    'ir', 'voy', 'vas', 'va', 'vamos', 'van', 'iba',
+    # Muletillas de la conversación con el asistente
+    'hola', 'oye', 'jarvis', 'favor', 'porfa', 'dime', 'dices', 'dijiste', 'quiero',
+    'quieres', 'sabes', 'gracias', 'vale', 'usuario', 'asistente'
+})
+
+
+def normalize_text(text):
+    """
+    Pasa a minúsculas y elimina acentos para comparar expresiones
+
+    Args:
+        text (str): Texto original
+
+    Returns:
+        str: Texto normalizado
+    """
+    text = unicodedata.normalize("NFKD", text.lower())
+    return "".join(c for c in text if not unicodedata.combining(c))
+
+
+def canonical_text(text):
+    """
+    Normaliza un texto y elimina signos de puntuación y espacios repetidos
+
+    Args:
+        text (str): Texto original
+
+    Returns:
+        str: Texto sin acentos, signos ni espacios duplicados
+    """
+    text = re.sub(r"[^\w\s]", " ", normalize_text(text))
+    return " ".join(text.split())
+
+
+def content_words(text):
+    """
+    Obtiene las palabras de un texto sin acentos ni palabras de relleno
+
+    Args:
+        text (str): Texto original
+
+    Returns:
+        list: Palabras significativas en orden
+    """
+    return [w for w in canonical_text(text).split() if w not in FILLER_WORDS]
+
+
+def search_terms(text):
+    """
+    Obtiene los términos de búsqueda de una frase (sin acentos, sin
+    palabras vacías ni repetidas)
+
+    Args:
+        text (str): Consulta del usuario
+
+    Returns:
+        list: Términos en orden de aparición
+    """
+    terms = []
+    for word in canonical_text(text).split():
+        if len(word) > 1 and word not in STOPWORDS and word not in terms:
+            terms.append(word)
+    return terms
+
+
+def stem(word):
+    """
+    Raíz ligera de una palabra ya normalizada: quita el plural y la vocal
+    final de género (canciones -> cancion, musicas -> music, luces -> luz)
+
+    No es un lematizador: solo busca que singular, plural, masculino y
+    femenino compartan clave. Las palabras de 4 letras o menos no se tocan.
+
+    Args:
+        word (str): Palabra en minúsculas y sin acentos
+
+    Returns:
+        str: Raíz
+    """
+    if len(word) <= 4:
+        return word
+    if word.endswith("iones"):
+        return word[:-2]
+    if word.endswith("ces") and word[-4] in "aeiou":
+        return word[:-3] + "z"  # luces -> luz, lapices -> lapiz (dulces sigue abajo)
+    if word.endswith("es") and word[-3] in "lnrdzj":
+        word = word[:-2]
+    elif word.endswith("s"):
+        word = word[:-1]
+    if len(word) > 4 and word[-1] in "aoe":
+        word = word[:-1]
+    return word
+
+
+def extract_keywords(text, limit=None):
+    """
+    Palabras clave normalizadas de un texto: raíces (stem) de sus términos
+    de búsqueda de 3 letras o más, sin números ni repeticiones
+
+    Args:
+        text (str): Texto original
+        limit (int): Palabras clave máximas (las primeras en aparecer)
+
+    Returns:
+        list: Raíces en orden de aparición
+    """
+    keywords = []
+    for term in search_terms(text):
+        if len(term) > 2 and not term.isdigit():
+            root = stem(term)
+            if root not in keywords:
+                keywords.append(root)
+    return keywords[:limit] if limit else keywords
@@ -0,0 +1,217 @@
+"""
+Interpretación de expresiones temporales en español para recordatorios
+("en 10 minutos", "mañana a las 8 y media", "el viernes por la tarde"...)
+"""
+import re
+import unicodedata
+from datetime import datetime, timedelta
+from config import REMINDER_DEFAULT_HOUR
+from .text_utils import normalize_text
+
+
+NUMBER_WORDS = {
+    'un': 1, 'una': 1, 'uno': 1, 'dos': 2, 'tres': 3, 'cuatro': 4, 'cinco': 5,
+    'seis': 6, 'siete': 7, 'ocho': 8, 'nueve': 9, 'diez': 10, 'once': 11,
+    'doce': 12, 'quince': 15, 'veinte': 20, 'treinta': 30, 'cuarenta': 40,
+    'cincuenta': 50
+}
+
+UNIT_SECONDS = {'segundo': 1, 'minuto': 60, 'hora': 3600, 'dia': 86400, 'semana': 604800}
+
+WEEKDAYS = {
+    'lunes': 0, 'martes': 1, 'miercoles': 2, 'jueves': 3,
+    'viernes': 4, 'sabado': 5, 'domingo': 6
+}
+
+# Hora por defecto de cada franja ("por la tarde" sin hora concreta)
+PERIOD_HOURS = {'madrugada': 4, 'manana': 9, 'mediodia': 12, 'tarde': 17, 'noche': 21}
+
+_NUMBER = r"\d{1,2}|" + "|".join(sorted(NUMBER_WORDS, key=len, reverse=True))
+_UNITS = r"(?P<unit>segundos?|minutos?|horas?|dias?|semanas?)"
+
+# Los patrones se aplican sobre el texto sin acentos, que conserva las
+# posiciones del original (una letra acentuada sigue siendo un carácter)
+RELATIVE_RE = re.compile(
+    r"\b(?:en|dentro de)\s+(?:(?P<quarter>un cuarto de hora)|(?P<half>media hora)|"
+    rf"(?P<n>{_NUMBER})\s+{_UNITS}(?P<and_half>\s+y\s+media)?)"
+)
+DAY_RE = re.compile(r"\b(?P<day>pasado manana|(?<!la )manana|hoy|esta (?:tarde|noche))\b")
+WEEKDAY_RE = re.compile(
+    r"\b(?:el\s+)?(?:proximo\s+)?(?P<weekday>" + "|".join(WEEKDAYS) + r")(?:\s+que viene)?\b"
+)
+CLOCK_RE = re.compile(
+    rf"\ba\s+las?\s+(?P<hour>{_NUMBER})(?::(?P<minute>\d{{2}}))?"
+    rf"(?:\s+y\s+(?P<plus>media|cuarto|{_NUMBER}))?"
+    rf"(?:\s+menos\s+(?P<minus>cuarto|{_NUMBER}))?"
+    r"(?:\s+(?:de|por|en)\s+la\s+(?P<period>manana|tarde|noche|madrugada))?"
+)
+NOON_RE = re.compile(r"\ba\s+(?P<noon>mediodia|medianoche)\b")
+PERIOD_RE = re.compile(r"\b(?:por|en|a)\s+la\s+(?P<period>manana|tarde|noche|madrugada)\b")
+
+# Fórmulas con las que se pide el recordatorio (se quitan de la tarea)
+TRIGGER_RE = re.compile(
+    r"^\s*(?:(?:oye\s+)?jarvis\s*,?\s*)?"
+    r"(?:recuerdame|recordatorio(?:\s+(?:de|para))?|no\s+(?:me\s+)?olvides|tengo\s+que)"
+    r"(?:\s+que)?\s*",
+)
+
+
+def parse_reminder(text, now=None):
+    """
+    Separa la tarea y la fecha de un recordatorio dictado
+
+    Args:
+        text (str): Frase del usuario
+        now (datetime): Momento de referencia (por defecto, ahora)
+
+    Returns:
+        tuple: (tarea, datetime o None si no hay expresión temporal o
+            es de hoy y ya pasó)
+    """
+    now = now or datetime.now()
+    text = unicodedata.normalize("NFC", text).strip()
+    normalized = normalize_text(text)
+    spans = []
+
+    when = None
+    match = RELATIVE_RE.search(normalized)
+    if match:
+        spans.append(match.span())
+        when = now + _relative_delta(match)
+    else:
+        when = _absolute_time(normalized, now, spans)
+
+    return _task_text(text, normalized, spans), when
+
+
+def format_time(when):
+    """Formato de scheduled_time en la BD (hora local, ordenable como texto)"""
+    return when.strftime("%Y-%m-%d %H:%M:%S")
+
+
+def parse_time(value):
+    """Inverso de format_time"""
+    return datetime.strptime(value[:19], "%Y-%m-%d %H:%M:%S")
+
+
+def _number(word):
+    return int(word) if word.isdigit() else NUMBER_WORDS[word]
+
+
+def _relative_delta(match):
+    """Desplazamiento de "en 10 minutos", "dentro de una hora y media"..."""
+    if match.group('quarter'):
+        return timedelta(minutes=15)
+    if match.group('half'):
+        return timedelta(minutes=30)
+
+    unit = UNIT_SECONDS[match.group('unit').rstrip('s')]
+    amount = _number(match.group('n')) + (0.5 if match.group('and_half') else 0)
+    return timedelta(seconds=amount * unit)
+
+
+def _absolute_time(normalized, now, spans):
+    """Día (hoy, mañana, el lunes...) y hora (a las 8, por la tarde...)"""
+    day_offset = None
+    period = None
+
+    match = DAY_RE.search(normalized)
+    if match:
+        spans.append(match.span())
+        day = match.group('day')
+        day_offset = {'hoy': 0, 'manana': 1, 'pasado manana': 2}.get(day, 0)
+        if day.startswith('esta '):
+            period = day.split()[1]
+    else:
+        match = WEEKDAY_RE.search(normalized)
+        if match:
+            spans.append(match.span())
+            day_offset = (WEEKDAYS[match.group('weekday')] - now.weekday()) % 7 or 7
+
+    hour, minute = None, 0
+    match = CLOCK_RE.search(normalized)
+    if match:
+        clock = _clock(match)
+        if clock is None:
+            return None  # "a las 8:75", "a las 99": se guarda sin hora
+        spans.append(match.span())
+        hour, minute = clock
+        period = match.group('period') or period
+        if period == 'noche' and (hour == 12 or hour < 6):
+            # "las 12 de la noche" y "la 1 de la noche" son del día siguiente
+            hour += 12 if hour == 12 else 24
+        elif period in ('tarde', 'noche') and hour < 12:
+            hour += 12
+    else:
+        match = NOON_RE.search(normalized)
+        if match:
+            spans.append(match.span())
+            if match.group('noon') == 'mediodia':
+                hour = 12
+            else:
+                hour = 0
+                day_offset = (day_offset or 0) + 1
+        else:
+            match = PERIOD_RE.search(normalized)
+            if match:
+                spans.append(match.span())
+                period = match.group('period')
+            if period:
+                hour = PERIOD_HOURS[period]
+
+    if day_offset is None and hour is None:
+        return None
+
+    if hour is None:
+        hour = REMINDER_DEFAULT_HOUR
+    when = (now + timedelta(days=(day_offset or 0) + hour // 24)).replace(
+        hour=hour % 24, minute=minute, second=0, microsecond=0
+    )
+
+    # "a las 5" (sin día o con "hoy") ya pasado es la próxima vez que sean las 5:
+    # primero por la tarde y, sin día explícito, si no mañana
+    if when <= now and day_offset in (None, 0):
+        if period is None and hour < 12 and when + timedelta(hours=12) > now:
+            when += timedelta(hours=12)
+        elif day_offset is None:
+            when += timedelta(days=1)
+        else:
+            return None  # "hoy a las 8" ya pasado: no se programa una hora vencida
+    return when
+
+
+def _clock(match):
+    """
+    Hora y minuto de "a las 8", "a las 8:15", "a las 9 menos cuarto"...
+    (None si la hora no existe: más de 24 o minutos de 60 en adelante)
+    """
+    hour = _number(match.group('hour'))
+    minute = int(match.group('minute') or 0)
+
+    plus = match.group('plus')
+    if plus:
+        minute += {'media': 30, 'cuarto': 15}.get(plus) or _number(plus)
+
+    minus = match.group('minus')
+    if minus:
+        minute -= {'cuarto': 15}.get(minus) or _number(minus)
+        if minute < 0:
+            hour, minute = hour - 1, minute + 60
+
+    if hour > 24 or minute >= 60:
+        return None
+    return hour, minute
+
+
+def _task_text(text, normalized, spans):
+    """Quita del original la fórmula de petición y las expresiones temporales"""
+    for start, end in sorted(spans, reverse=True):
+        text = text[:start] + " " + text[end:]
+        normalized = normalized[:start] + " " + normalized[end:]
+
+    trigger = TRIGGER_RE.match(normalized)
+    if trigger:
+        text = text[trigger.end():]
+
+    task = " ".join(text.split()).strip(" ,.;:¡!¿?")
+    return task or " ".join(text.split())
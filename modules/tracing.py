@@ -0,0 +1,84 @@
+"""
+Módulo de trazas por etapa: mide cuánto tarda cada fase de un turno
+(grabación, transcripción, comandos, RAG, LLM, voz, persistencia)
+"""
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+from config import ENABLE_TRACING
+
+
+# Traza del turno en curso. Es una variable de contexto para que los turnos
+# solapados del pipeline asíncrono (asyncio.to_thread copia el contexto)
+# no mezclen sus etapas
+_current_trace = contextvars.ContextVar("jarvis_trace", default=None)
+
+
+class TurnTrace:
+    """Etapas medidas de un turno"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.spans = []  # (etapa, inicio relativo al turno, duración) en segundos
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def span(self, stage):
+        """Mide el bloque como la etapa `stage`"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            end = time.perf_counter()
+            with self._lock:
+                self.spans.append((stage, start - self.started, end - start))
+
+    def activate(self):
+        """Hace de esta la traza actual del contexto"""
+        return _current_trace.set(self)
+
+    @staticmethod
+    def deactivate(token):
+        _current_trace.reset(token)
+
+
+def new_trace():
+    """
+    Crea la traza de un turno sin activarla
+
+    Returns:
+        TurnTrace or None: None si las trazas están desactivadas
+    """
+    return TurnTrace() if ENABLE_TRACING else None
+
+
+def start_turn():
+    """Crea la traza de un turno y la activa en el contexto actual"""
+    trace = new_trace()
+    if trace is not None:
+        trace.activate()
+    return trace
+
+
+def current_trace():
+    """Traza activa en el contexto actual (o None)"""
+    return _current_trace.get()
+
+
+@contextmanager
+def span(stage):
+    """
+    Mide un bloque dentro de la traza activa; sin traza no hace nada
+
+    Uso:
+        with span("transcribe"):
+            text = stt.transcribe(audio)
+    """
+    trace = _current_trace.get()
+    if trace is None:
+        yield
+        return
+
+    with trace.span(stage):
+        yield
@@ -0,0 +1,353 @@
+"""
+Módulo de búsqueda semántica: embeddings del contexto RAG en una matriz
+NumPy de solo anexado, leída por mmap, con el mapa de filas en SQLite
+"""
+import os
+import struct
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+
+from config import (
+    EMBEDDING_MODEL, VECTOR_DTYPE, VECTOR_BATCH_SIZE, VECTOR_MAX_CHARS,
+    VECTOR_FLUSH_INTERVAL, VECTOR_POLL_INTERVAL, VECTOR_RETRY_INTERVAL,
+    VECTOR_SEARCH_BLOCK, VECTOR_MIN_SIMILARITY, SEARCH_CANDIDATES
+)
+
+
+# Cabecera del archivo: firma, versión, bytes por componente, dimensión y modelo
+HEADER = struct.Struct("<4sHHI52s")
+MAGIC = b"JVEC"
+VERSION = 1
+
+DTYPES = {2: np.float16, 4: np.float32}
+
+
+class VectorStore:
+    """
+    Embeddings de conversation_context para buscar por significado.
+
+    Los vectores se guardan normalizados (norma 1) como filas de un archivo
+    al que solo se anexa; la tabla context_vectors de SQLite dice qué
+    contexto ocupa cada fila. La búsqueda lee la matriz por mmap (el
+    sistema operativo la cachea y la comparte entre procesos) y calcula la
+    similitud coseno de todas las filas con un único producto
+    matriz-vector; en float16 se convierte por bloques de
+    VECTOR_SEARCH_BLOCK filas, porque NumPy no multiplica float16 con BLAS.
+
+    Un hilo en segundo plano convierte los contextos nuevos por lotes de
+    VECTOR_BATCH_SIZE (una llamada a embed por lote). No necesita que le
+    pasen los contextos: busca en la base los posteriores al último
+    convertido, de modo que al arrancar también completa los antiguos
+    (backfill) y un fallo de Ollama solo retrasa la conversión.
+
+    Coherencia ante caídas: primero se anexa al archivo y después se
+    registra en SQLite. Al abrir, las filas del archivo sin registrar se
+    truncan y las registradas que faltan en el archivo se olvidan (se
+    vuelven a convertir).
+    """
+
+    def __init__(self, db, path=None, embedder=None, client=None, model=None,
+                 dtype=None, logger=None, batch_size=None, flush_interval=None,
+                 poll_interval=None, start=True):
+        """
+        Args:
+            db: DatabaseManager con conversation_context y context_vectors
+            path (str): Archivo de vectores (por defecto, junto a la base: .vectors)
+            embedder (callable): Lista de textos -> lista de vectores (por
+                defecto, OllamaClient.embed con EMBEDDING_MODEL)
+            client: OllamaClient para el embedder por defecto
+            model (str): Nombre del modelo (se guarda en la cabecera)
+            dtype (str): "float32" o "float16" (solo al crear el archivo)
+            logger: Logger opcional
+            batch_size (int): Contextos por llamada a embed
+            flush_interval (float): Segundos que se espera para agrupar
+            poll_interval (float): Revisión periódica de contextos nuevos
+            start (bool): Arrancar el hilo de conversión
+        """
+        if path is None:
+            if db.db_path == ":memory:":
+                raise ValueError("VectorStore necesita una ruta con una base en memoria")
+            path = Path(db.db_path).with_suffix(".vectors")
+
+        self.db = db
+        self.path = str(path)
+        self.logger = logger
+        self.model = model or EMBEDDING_MODEL
+        self.batch_size = batch_size or VECTOR_BATCH_SIZE
+        self.flush_interval = flush_interval if flush_interval is not None else VECTOR_FLUSH_INTERVAL
+        self.poll_interval = poll_interval or VECTOR_POLL_INTERVAL
+
+        if embedder is None:
+            if client is None:
+                from .ollama_client import OllamaClient
+                client = OllamaClient(logger=logger)
+            embedder = lambda texts: client.embed(self.model, texts)  # noqa: E731
+        self.embedder = embedder
+
+        self.dtype = np.dtype(dtype or VECTOR_DTYPE)
+        if self.dtype.itemsize not in DTYPES:
+            raise ValueError(f"Tipo de vector no soportado: {self.dtype}")
+        self.dimensions = 0  # Se fija con el primer embedding (o la cabecera)
+        self.enabled = True
+
+        self._lock = threading.Lock()  # Matriz, mapa de filas y archivo
+        self._index_lock = threading.Lock()  # Una sola conversión a la vez
+        self._id_buffer = np.empty(1024, dtype=np.int64)  # context_id de cada fila (con holgura)
+        self._count = 0
+        self._matrix = None
+        self._retry_at = 0.0  # Hasta cuándo se omite la búsqueda tras un fallo
+        self.stats = {'embedded': 0, 'batches': 0, 'errors': 0, 'searches': 0}
+
+        self._open()
+
+        self._wake = threading.Event()
+        self._stopping = False
+        self._thread = None
+        if start and self.enabled:
+            self._thread = threading.Thread(target=self._run, name="vector-indexer", daemon=True)
+            self._thread.start()
+
+    @property
+    def rows(self):
+        """Vectores almacenados"""
+        return self._count
+
+    @property
+    def _ids(self):
+        return self._id_buffer[:self._count]
+
+    # === CONVERSIÓN ===
+
+    def notify(self):
+        """Avisa al hilo de que hay contextos nuevos (los agrupa durante flush_interval)"""
+        self._wake.set()
+
+    def backfill(self, progress=None):
+        """
+        Convierte ahora todos los contextos pendientes
+
+        Args:
+            progress (callable): Recibe las filas totales tras cada lote
+
+        Returns:
+            int: Contextos convertidos
+        """
+        total = 0
+        while True:
+            added = self._index_batch()
+            total += added
+            if progress and added:
+                progress(self.rows)
+            if added < self.batch_size:
+                return total
+
+    def add(self, context_ids, vectors):
+        """
+        Anexa embeddings ya calculados
+
+        Args:
+            context_ids (list): Contextos, en orden creciente y posteriores a los guardados
+            vectors: Matriz (n, dimensiones) o lista de vectores
+        """
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if vectors.ndim != 2 or len(vectors) != len(context_ids):
+            raise ValueError("Se esperaba un vector por contexto")
+
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        vectors = (vectors / np.where(norms == 0, 1.0, norms)).astype(self.dtype)
+
+        with self._lock:
+            if not self.dimensions:
+                self._write_header(vectors.shape[1])
+            elif vectors.shape[1] != self.dimensions:
+                raise ValueError(
+                    f"Dimensión {vectors.shape[1]} distinta de la del archivo ({self.dimensions})"
+                )
+
+            first_row = self.rows
+            with open(self.path, "ab") as f:
+                f.write(vectors.tobytes())
+            self.db.save_vector_ids(first_row, list(context_ids))
+            self._append_ids(context_ids)
+
+    def _append_ids(self, context_ids):
+        """Anexa al mapa en memoria (duplicando la capacidad: O(1) amortizado)"""
+        needed = self._count + len(context_ids)
+        if needed > len(self._id_buffer):
+            grown = np.empty(max(needed, 2 * len(self._id_buffer)), dtype=np.int64)
+            grown[:self._count] = self._ids
+            self._id_buffer = grown
+        self._id_buffer[self._count:needed] = context_ids
+        self._count = needed
+
+    def _index_batch(self):
+        """Convierte el siguiente lote de contextos; devuelve cuántos"""
+        with self._index_lock:
+            after_id = int(self._ids[-1]) if self.rows else 0
+            contexts = self.db.get_contexts_to_embed(after_id, self.batch_size)
+            if not contexts:
+                return 0
+
+            vectors = self.embedder([c['content'][:VECTOR_MAX_CHARS] for c in contexts])
+            self.add([c['context_id'] for c in contexts], vectors)
+            self.stats['embedded'] += len(contexts)
+            self.stats['batches'] += 1
+            return len(contexts)
+
+    def _run(self):
+        """Hilo de conversión: completa los pendientes y espera avisos o el sondeo"""
+        failing = False
+        while not self._stopping:
+            try:
+                while not self._stopping and self._index_batch() == self.batch_size:
+                    pass
+                failing = False
+            except Exception as e:
+                self.stats['errors'] += 1
+                if not failing and self.logger:  # Un aviso por racha de fallos
+                    self.logger.log_error("EmbeddingError", str(e), module="VectorStore")
+                failing = True
+
+            self._wake.wait(self.poll_interval)
+            if self._stopping:
+                break
+            if self._wake.is_set():
+                # Agrupar los contextos que llegan seguidos (y dar tiempo a su commit)
+                time.sleep(self.flush_interval)
+                self._wake.clear()
+
+    def close(self, timeout=5.0):
+        """Detiene el hilo (lo pendiente se convierte en el próximo arranque)"""
+        self._stopping = True
+        self._wake.set()
+        if self._thread:
+            self._thread.join(timeout)
+        with self._lock:
+            self._matrix = None
+
+    # === BÚSQUEDA ===
+
+    def search(self, query, k=None, min_similarity=None):
+        """
+        Contextos más parecidos por significado a una consulta
+
+        Args:
+            query (str): Texto de la consulta
+            k (int): Resultados máximos (por defecto, SEARCH_CANDIDATES)
+            min_similarity (float): Similitud coseno mínima
+
+        Returns:
+            list: Pares (context_id, similitud), de más a menos parecido
+                (vacía si no hay vectores o el modelo de embeddings falla)
+        """
+        if not self.enabled or not self.rows or time.time() < self._retry_at:
+            return []
+
+        try:
+            query_vector = np.asarray(self.embedder([query[:VECTOR_MAX_CHARS]])[0], dtype=np.float32)
+        except Exception as e:
+            # Sin embeddings se sigue buscando por palabras; se reintenta más tarde
+            self._retry_at = time.time() + VECTOR_RETRY_INTERVAL
+            if self.logger:
+                self.logger.log_error("EmbeddingError", str(e), module="VectorStore")
+            return []
+
+        return self.search_vector(query_vector, k, min_similarity)
+
+    def search_vector(self, vector, k=None, min_similarity=None):
+        """search() con el embedding de la consulta ya calculado"""
+        k = k or SEARCH_CANDIDATES
+        min_similarity = VECTOR_MIN_SIMILARITY if min_similarity is None else min_similarity
+
+        vector = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        if norm == 0 or len(vector) != self.dimensions:
+            return []
+        vector /= norm
+
+        with self._lock:
+            if not self.rows:
+                return []
+            matrix, ids = self._mapped(), self._ids
+        self.stats['searches'] += 1
+
+        if matrix.dtype == np.float32:
+            scores = matrix @ vector
+        else:
+            scores = np.concatenate([
+                matrix[i:i + VECTOR_SEARCH_BLOCK].astype(np.float32) @ vector
+                for i in range(0, len(matrix), VECTOR_SEARCH_BLOCK)
+            ])
+
+        k = min(k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(int(ids[i]), float(scores[i])) for i in top if scores[i] >= min_similarity]
+
+    # === ARCHIVO ===
+
+    def rebuild(self):
+        """Borra todos los vectores (se vuelven a convertir desde cero)"""
+        with self._index_lock, self._lock:
+            self.db.trim_vector_ids(0)
+            self._count = 0
+            self._matrix = None
+            self.dimensions = 0
+            if os.path.exists(self.path):
+                os.remove(self.path)
+            self.enabled = True
+
+    def _mapped(self):
+        """Matriz (filas, dimensiones) por mmap, reabierta si el archivo creció"""
+        if self._matrix is None or len(self._matrix) != self.rows:
+            self._matrix = np.memmap(self.path, dtype=self.dtype, mode="r", offset=HEADER.size,
+                                     shape=(self.rows, self.dimensions))
+        return self._matrix
+
+    def _write_header(self, dimensions):
+        with open(self.path, "wb") as f:
+            f.write(HEADER.pack(MAGIC, VERSION, self.dtype.itemsize, dimensions,
+                                self.model.encode("utf-8")[:52]))
+        self.dimensions = dimensions
+
+    def _open(self):
+        """Lee la cabecera y reconcilia el archivo con el mapa de SQLite"""
+        ids = self.db.get_vector_ids()
+
+        if not os.path.exists(self.path) or os.path.getsize(self.path) < HEADER.size:
+            if ids:
+                self.db.trim_vector_ids(0)
+            return
+
+        with open(self.path, "rb") as f:
+            magic, version, itemsize, dimensions, model = HEADER.unpack(f.read(HEADER.size))
+        if magic != MAGIC or version != VERSION or itemsize not in DTYPES:
+            raise ValueError(f"{self.path} no es un archivo de vectores de JARVIS")
+
+        model = model.rstrip(b"\0").decode("utf-8")
+        if model != self.model:
+            # Vectores de otro modelo: no son comparables con las consultas nuevas
+            self.enabled = False
+            print(f"⚠️ Los vectores de {self.path} son de '{model}' (configurado: "
+                  f"'{self.model}'); búsqueda semántica desactivada hasta reconstruirlos")
+            if self.logger:
+                self.logger.main_logger.warning(f"⚠️ Modelo de embeddings distinto: {model}")
+            return
+
+        self.dtype = np.dtype(DTYPES[itemsize])
+        self.dimensions = dimensions
+        row_bytes = dimensions * itemsize
+        file_rows = (os.path.getsize(self.path) - HEADER.size) // row_bytes
+
+        rows = min(file_rows, len(ids))
+        if len(ids) > rows:
+            self.db.trim_vector_ids(rows)  # Registradas pero perdidas del archivo
+        if os.path.getsize(self.path) != HEADER.size + rows * row_bytes:
+            os.truncate(self.path, HEADER.size + rows * row_bytes)  # Anexadas sin registrar
+        self._append_ids(ids[:rows])
+
+        if self.logger:
+            self.logger.main_logger.info(f"🧭 Vectores cargados: {rows} ({self.model}, {self.dtype})")
@@ -0,0 +1,89 @@
+"""
+Asistente JARVIS - Modo servidor multisesión
+Atiende a varios clientes locales por HTTP/WebSocket compartiendo Whisper,
+el cliente de Ollama y la base de datos (ver modules/session_server.py)
+"""
+import argparse
+import os
+from modules import (
+    SpeechToText,
+    ForkedSpeechToText,
+    AIEngine,
+    OllamaClient,
+    CommandExecutor,
+    JarvisLogger,
+    DatabaseManager,
+    PersistenceWriter,
+    VectorStore,
+    SessionManager,
+    SpeechToTextPool,
+    JarvisServer
+)
+from config import (
+    SERVER_HOST, SERVER_PORT, SERVER_STT_WORKERS, SERVER_STT_FORK, SERVER_ALLOW_COMMANDS,
+    ENABLE_VECTOR_SEARCH
+)
+
+
+def main():
+    """Función principal del servidor"""
+    parser = argparse.ArgumentParser(description="Servidor multisesión de JARVIS")
+    parser.add_argument("--host", default=SERVER_HOST, help="interfaz de escucha")
+    parser.add_argument("--port", type=int, default=SERVER_PORT, help="puerto")
+    parser.add_argument("--stt-workers", type=int, default=SERVER_STT_WORKERS,
+                        help="transcriptores Whisper compartidos")
+    args = parser.parse_args()
+
+    logger = JarvisLogger()
+
+    # Los workers se crean con fork antes de arrancar cualquier otro hilo
+    if SERVER_STT_FORK and hasattr(os, "fork"):
+        forked_stt = ForkedSpeechToText(workers=args.stt_workers, logger=logger)
+        stt_pool = SpeechToTextPool(lambda: forked_stt, size=args.stt_workers)
+    else:
+        forked_stt = None
+        stt_pool = SpeechToTextPool(lambda: SpeechToText(logger=logger), size=args.stt_workers)
+
+    db = DatabaseManager(logger=logger)
+    client = OllamaClient(logger=logger)
+    AIEngine(client=client, logger=logger)  # Precarga los modelos en Ollama
+    persistence = PersistenceWriter(db, logger=logger)
+    vector_store = None
+    if ENABLE_VECTOR_SEARCH:
+        vector_store = db.vector_store = VectorStore(db, client=client, logger=logger)
+
+    # Los comandos actúan sobre la máquina del servidor: desactivados por defecto
+    command_executor = CommandExecutor(logger=logger, db=db) if SERVER_ALLOW_COMMANDS else None
+
+    manager = SessionManager(
+        db=db,
+        client=client,
+        stt_pool=stt_pool,
+        persistence=persistence,
+        command_executor=command_executor,
+        logger=logger
+    )
+    server = JarvisServer(manager, host=args.host, port=args.port)
+
+    print(f"🌐 Servidor JARVIS escuchando en {server.url}")
+    print("   Ctrl+C para detener\n")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n👋 Deteniendo servidor...")
+    finally:
+        server.server_close()
+        manager.close()
+        persistence.close()
+        if vector_store:
+            vector_store.close()
+        if command_executor:
+            command_executor.close()
+        client.close()
+        db.close()
+        if forked_stt:
+            forked_stt.close()
+
+
+if __name__ == "__main__":
+    main()